@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+离线端到端基准测试
+启动本地Confluence替身服务，驱动ConfluencePageCreator创建N个页面，
+统计各步骤p50/p95/p99延迟和吞吐量，结果写入JSON文件便于版本间对比
+"""
+
+import argparse
+import asyncio
+import json
+import platform
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Any
+
+import yaml
+
+from mock_confluence import MockConfluenceServer
+from confluence_page_creator.request_filter import DEFAULT_PROFILE, PROFILES
+
+
+SKILL_FILE = Path(__file__).resolve().parent / 'skill.yaml'
+BENCH_USERNAME = 'bench@example.com'
+BENCH_TOKEN = 'bench-token'
+
+
+def percentile(values: List[float], q: float) -> float:
+    """线性插值百分位数，q取0~100"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * q / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def summarize(samples: Dict[str, List[float]]) -> Dict[str, Dict[str, float]]:
+    """将各项耗时样本汇总为p50/p95/p99（毫秒）"""
+    summary = {}
+    for name, values in samples.items():
+        summary[name] = {
+            'count': len(values),
+            'p50': round(percentile(values, 50) * 1000, 2),
+            'p95': round(percentile(values, 95) * 1000, 2),
+            'p99': round(percentile(values, 99) * 1000, 2),
+            'mean': round(sum(values) / len(values) * 1000, 2)
+        }
+    return summary
+
+
+def skill_version() -> str:
+    with open(SKILL_FILE, 'r', encoding='utf-8') as f:
+        return str(yaml.safe_load(f).get('version', 'unknown'))
+
+
+async def run_benchmark(pages: int = 20, backend: str = 'ui', mode: str = 'single',
+                        concurrency: int = 4, headless: bool = True, browser: str = 'chromium',
+                        request_filter: Any = DEFAULT_PROFILE, asset_latency: float = 0.05) -> Dict[str, Any]:
+    """对本地替身服务执行基准测试，返回结果字典
+
+    request_filter同配置项（规则集名称或false），asset_latency为替身服务上每个图片、字体的模拟延迟（秒）
+    """
+    from confluence_page_creator.main import ConfluencePageCreator
+    from confluence_page_creator.batch import BatchRunner
+
+    with tempfile.TemporaryDirectory() as cache_dir, \
+            MockConfluenceServer(username=BENCH_USERNAME, api_token=BENCH_TOKEN,
+                                 asset_latency=asset_latency) as server:
+        base_config = {
+            'confluence_url': server.url,
+            'space_key': 'BENCH',
+            'username': BENCH_USERNAME,
+            'api_token': BENCH_TOKEN,
+            'page_template': 'technical-doc',
+            'backend': backend,
+            'browser': browser,
+            'headless': headless,
+            'auto_confirm': True,
+            'page_index': False,
+            'request_filter': request_filter,
+            'session_cache_dir': cache_dir,
+            'selector_cache_path': str(Path(cache_dir) / 'selectors.json'),
+            # 替身服务的页面不写入用户的页面元数据缓存
+            'metadata_cache_path': str(Path(cache_dir) / 'metadata.db')
+        }
+        jobs = [{'page_title': f'基准测试页面 {i + 1}', 'job_id': str(i + 1)} for i in range(pages)]
+
+        started = time.monotonic()
+        batch_error = ''
+        if mode == 'batch':
+            summary = await BatchRunner({
+                'concurrency': concurrency,
+                'defaults': base_config,
+                'jobs': jobs
+            }).run()
+            results = summary['jobs']
+            if not summary['success'] and len(results) < pages:
+                # 批量执行整体失败（如浏览器无法启动）时没有作业结果，错误只在汇总消息中
+                batch_error = summary['message']
+        else:
+            results = []
+            for job in jobs:
+                results.append(await ConfluencePageCreator({**base_config, **job}).execute())
+        elapsed = time.monotonic() - started
+
+    # 收集各步骤、各类等待及单页总耗时样本
+    samples: Dict[str, List[float]] = {}
+    for result in results:
+        if not result['success']:
+            continue
+        for step, seconds in result['steps'].items():
+            samples.setdefault(step, []).append(seconds)
+        for wait, seconds in result['timing'].get('waits', {}).items():
+            samples.setdefault(f'wait:{wait}', []).append(seconds)
+        samples.setdefault('page_total', []).append(result['timing']['total'])
+
+    succeeded = sum(1 for result in results if result['success'])
+    blocked = sum(result.get('request_filter', {}).get('blocked', 0) for result in results)
+    return {
+        'version': skill_version(),
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'params': {
+            'pages': pages,
+            'backend': backend,
+            'mode': mode,
+            'concurrency': concurrency,
+            'browser': browser,
+            'request_filter': request_filter,
+            'asset_latency': asset_latency
+        },
+        'succeeded': succeeded,
+        'failed': pages - succeeded,
+        'failures': [result['message'] for result in results if not result['success']] +
+                    ([batch_error] if batch_error else []),
+        'elapsed': round(elapsed, 3),
+        'pages_per_second': round(succeeded / elapsed, 3) if elapsed > 0 else 0.0,
+        'requests_blocked': blocked,
+        'latency_ms': summarize(samples)
+    }
+
+
+async def compare_request_filter(request_filter: Any = DEFAULT_PROFILE, **kwargs) -> Dict[str, Any]:
+    """分别关闭和开启请求过滤执行基准测试，报告各项耗时p50的变化（毫秒，负数表示开启后更快）"""
+    without_filter = await run_benchmark(request_filter=False, **kwargs)
+    with_filter = await run_benchmark(request_filter=request_filter, **kwargs)
+    return {
+        'without_filter': without_filter,
+        'with_filter': with_filter,
+        'load_time_change_ms': load_time_change(without_filter, with_filter)
+    }
+
+
+def load_time_change(baseline: Dict[str, Any], candidate: Dict[str, Any]) -> Dict[str, float]:
+    """两次基准测试中共有耗时项的p50差值（毫秒）"""
+    return {
+        name: round(stats['p50'] - baseline['latency_ms'][name]['p50'], 2)
+        for name, stats in candidate['latency_ms'].items()
+        if name in baseline['latency_ms']
+    }
+
+
+def main():
+    """命令行入口"""
+    parser = argparse.ArgumentParser(description='Confluence页面创建器离线基准测试')
+    parser.add_argument('--pages', type=int, default=20, help='创建的页面数')
+    parser.add_argument('--backend', choices=['ui', 'api'], default='ui', help='发布后端')
+    parser.add_argument('--mode', choices=['single', 'batch'], default='single',
+                        help='single为逐页独立执行，batch为共享会话的批量模式')
+    parser.add_argument('--concurrency', type=int, default=4, help='批量模式并发数')
+    parser.add_argument('--browser', default='chromium', help='浏览器类型')
+    parser.add_argument('--headed', action='store_true', help='显示浏览器窗口')
+    parser.add_argument('--request-filter', choices=list(PROFILES) + ['off'], default=DEFAULT_PROFILE,
+                        help='请求过滤规则集，off为关闭')
+    parser.add_argument('--compare-request-filter', action='store_true',
+                        help='分别关闭和开启请求过滤各执行一次，报告加载耗时的变化')
+    parser.add_argument('--asset-latency', type=float, default=0.05, help='替身服务上每个图片、字体的模拟延迟（秒）')
+    parser.add_argument('--output', default='benchmark-results.json', help='结果输出文件')
+    args = parser.parse_args()
+
+    options = {
+        'pages': args.pages,
+        'backend': args.backend,
+        'mode': args.mode,
+        'concurrency': args.concurrency,
+        'headless': not args.headed,
+        'browser': args.browser,
+        'asset_latency': args.asset_latency
+    }
+    request_filter = False if args.request_filter == 'off' else args.request_filter
+    if args.compare_request_filter:
+        comparison = asyncio.run(compare_request_filter(request_filter or DEFAULT_PROFILE, **options))
+        report = comparison['with_filter']
+        report['request_filter_comparison'] = {
+            'without_filter': comparison['without_filter'],
+            'load_time_change_ms': comparison['load_time_change_ms']
+        }
+    else:
+        report = asyncio.run(run_benchmark(request_filter=request_filter, **options))
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    print("\n" + "="*60)
+    print("📊 基准测试结果")
+    print("="*60)
+    print(f"✅ 成功: {report['succeeded']}  ❌ 失败: {report['failed']}")
+    if report['failures']:
+        print(f"⚠️  失败原因: {report['failures'][0]}")
+    print(f"🚀 吞吐量: {report['pages_per_second']} 页/秒")
+    print("-" * 40)
+    print(f"{'步骤':<28}{'p50':>10}{'p95':>10}{'p99':>10}")
+    for name, stats in report['latency_ms'].items():
+        print(f"{name:<28}{stats['p50']:>10}{stats['p95']:>10}{stats['p99']:>10}")
+    print("-" * 40)
+    if 'request_filter_comparison' in report:
+        print(f"🧹 开启请求过滤后p50变化（拦截 {report['requests_blocked']} 个请求）:")
+        for name, change in report['request_filter_comparison']['load_time_change_ms'].items():
+            print(f"  {name:<26}{change:>+10}")
+        print("-" * 40)
+    print(f"📝 结果已写入: {args.output}")
+    print("="*60)
+
+    if 'request_filter_comparison' in report and report['request_filter_comparison']['without_filter']['failed']:
+        return 1
+    return 0 if report['failed'] == 0 and report['succeeded'] > 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,7 @@
+"""
+Confluence页面创建器
+按模板生成文档内容，通过Playwright界面操作或REST API在Confluence中创建和更新页面。
+各子模块按需导入，导入本包不会加载Playwright
+"""
+
+__version__ = '1.0.0'
@@ -0,0 +1,8 @@
+"""python -m confluence_page_creator 等同于 confluence-creator 命令"""
+
+import sys
+
+from .cli import main
+
+
+sys.exit(main())
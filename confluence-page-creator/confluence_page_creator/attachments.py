@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+附件上传
+页面发布后通过REST API上传配置中的附件：multipart请求体按块从磁盘流式读取（不把整个文件载入内存），
+多个附件并发上传，附件备注中记录SHA-256，校验和未变化的附件跳过上传
+"""
+
+import asyncio
+import hashlib
+import mimetypes
+import os
+import re
+import time
+import uuid
+from typing import Callable, Dict, Iterator, List, Optional, Any
+
+from .retry import RetryPolicy
+
+
+DEFAULT_CONCURRENCY = 3
+CHUNK_SIZE = 1024 * 1024
+# 超过该大小的附件每上传10%记录一次进度
+PROGRESS_MIN_SIZE = 8 * 1024 * 1024
+
+CHECKSUM_RE = re.compile(r'sha256:([0-9a-f]{64})')
+
+
+def parse_attachments(config: Dict[str, Any]) -> List[Dict[str, str]]:
+    """规范化attachments配置：每项为文件路径，或包含path、可选name和comment的字典"""
+    attachments = []
+    names = set()
+    for item in config.get('attachments') or []:
+        spec = {'path': item} if isinstance(item, str) else item
+        if not isinstance(spec, dict) or not spec.get('path'):
+            raise ValueError(f"附件配置无效: {item}")
+
+        path = os.path.expanduser(str(spec['path']))
+        if not os.path.isfile(path):
+            raise ValueError(f"附件文件不存在: {path}")
+
+        name = spec.get('name') or os.path.basename(path)
+        if name in names:
+            raise ValueError(f"附件名称重复: {name}")
+        names.add(name)
+        attachments.append({'path': path, 'name': name, 'comment': spec.get('comment', '')})
+    return attachments
+
+
+def file_checksum(path: str) -> str:
+    """分块计算文件的SHA-256"""
+    digest = hashlib.sha256()
+    buffer = bytearray(CHUNK_SIZE)
+    view = memoryview(buffer)
+    with open(path, 'rb') as f:
+        while True:
+            size = f.readinto(buffer)
+            if not size:
+                return digest.hexdigest()
+            digest.update(view[:size])
+
+
+class MultipartFile:
+    """流式multipart/form-data请求体
+
+    长度已知（requests据此发送Content-Length而不是分块编码），迭代时复用同一缓冲区逐块读取文件
+    """
+
+    def __init__(self, path: str, filename: str, fields: Dict[str, str],
+                 on_progress: Optional[Callable[[int, int], None]] = None):
+        self.path = path
+        self.boundary = uuid.uuid4().hex
+        self.file_size = os.path.getsize(path)
+        self.on_progress = on_progress
+        self.sent = 0
+
+        content_type = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        quoted = filename.replace('\\', '\\\\').replace('"', '\\"')
+        head = ''.join(
+            f'--{self.boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'
+            for name, value in fields.items()
+        )
+        head += (f'--{self.boundary}\r\nContent-Disposition: form-data; name="file"; filename="{quoted}"\r\n'
+                 f'Content-Type: {content_type}\r\n\r\n')
+        self._head = head.encode('utf-8')
+        self._tail = f'\r\n--{self.boundary}--\r\n'.encode('utf-8')
+
+    @property
+    def content_type(self) -> str:
+        return f'multipart/form-data; boundary={self.boundary}'
+
+    def __len__(self) -> int:
+        return len(self._head) + self.file_size + len(self._tail)
+
+    def __iter__(self) -> Iterator[bytes]:
+        yield self._head
+        buffer = bytearray(CHUNK_SIZE)
+        view = memoryview(buffer)
+        with open(self.path, 'rb') as f:
+            while True:
+                size = f.readinto(buffer)
+                if not size:
+                    break
+                # 调用方发送完当前块后才会读取下一块，可以复用缓冲区
+                yield view[:size]
+                self.sent += size
+                if self.on_progress:
+                    self.on_progress(self.sent, self.file_size)
+        yield self._tail
+
+
+class AttachmentUploader:
+    """按并发上限上传一个页面的附件，返回进度与吞吐量报告"""
+
+    def __init__(self, client, page_id: str, concurrency: int = DEFAULT_CONCURRENCY,
+                 retry_policy: Optional[RetryPolicy] = None, logger=None):
+        self.client = client
+        self.page_id = page_id
+        self.retry_policy = retry_policy or RetryPolicy(max_attempts=1)
+        self.logger = logger
+        self._semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def upload_all(self, attachments: List[Dict[str, str]]) -> Dict[str, Any]:
+        started = time.monotonic()
+        loop = asyncio.get_running_loop()
+        existing = {item['title']: item for item in
+                    await loop.run_in_executor(None, self.client.list_attachments, self.page_id)}
+
+        files = await asyncio.gather(*[self._upload(spec, existing.get(spec['name'])) for spec in attachments])
+
+        elapsed = time.monotonic() - started
+        uploaded_bytes = sum(item['size'] for item in files if item['status'] == 'uploaded')
+        return {
+            'files': list(files),
+            'uploaded': sum(1 for item in files if item['status'] == 'uploaded'),
+            'unchanged': sum(1 for item in files if item['status'] == 'unchanged'),
+            'failed': sum(1 for item in files if item['status'] == 'failed'),
+            'bytes_uploaded': uploaded_bytes,
+            'elapsed': round(elapsed, 3),
+            'throughput_mb_s': round(uploaded_bytes / 1024 / 1024 / elapsed, 2) if elapsed > 0 else 0.0
+        }
+
+    async def _upload(self, spec: Dict[str, str], current: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        report = {'name': spec['name'], 'size': os.path.getsize(spec['path']), 'status': 'failed',
+                  'elapsed': 0.0, 'throughput_mb_s': 0.0, 'error': ''}
+        loop = asyncio.get_running_loop()
+
+        # 计算校验和与上传都读取整个文件，一并受并发上限约束
+        async with self._semaphore:
+            started = time.monotonic()
+            try:
+                checksum = await loop.run_in_executor(None, file_checksum, spec['path'])
+                current_comment = (current or {}).get('metadata', {}).get('comment', '')
+                match = CHECKSUM_RE.search(current_comment)
+                if match and match.group(1) == checksum:
+                    report['status'] = 'unchanged'
+                    return report
+
+                comment = f"{spec['comment']} sha256:{checksum}".strip()
+                attachment_id = current['id'] if current else None
+                await self.retry_policy.run(lambda: loop.run_in_executor(
+                    None, self._send, spec, comment, attachment_id
+                ))
+                report['status'] = 'uploaded'
+            except Exception as e:
+                report['error'] = str(e)[:200]
+                if self.logger:
+                    self.logger.warning(f"附件上传失败 {spec['name']}: {e}")
+            finally:
+                elapsed = time.monotonic() - started
+                report['elapsed'] = round(elapsed, 3)
+                if report['status'] == 'uploaded' and elapsed > 0:
+                    report['throughput_mb_s'] = round(report['size'] / 1024 / 1024 / elapsed, 2)
+
+        if self.logger and report['status'] == 'uploaded':
+            self.logger.info(f"附件已上传: {spec['name']} ({report['size'] / 1024 / 1024:.1f} MB, "
+                             f"{report['throughput_mb_s']} MB/s)")
+        return report
+
+    def _send(self, spec: Dict[str, str], comment: str, attachment_id: Optional[str]):
+        """在线程中上传单个附件，每次重试都重新打开文件"""
+        body = MultipartFile(spec['path'], spec['name'], {'comment': comment, 'minorEdit': 'true'},
+                             on_progress=self._progress_logger(spec['name']))
+        return self.client.upload_attachment(self.page_id, body, attachment_id)
+
+    def _progress_logger(self, name: str) -> Optional[Callable[[int, int], None]]:
+        if not self.logger:
+            return None
+        started = time.monotonic()
+        reported = {'step': 0}
+
+        def on_progress(sent: int, total: int):
+            if total < PROGRESS_MIN_SIZE:
+                return
+            step = sent * 10 // total
+            if step > reported['step']:
+                reported['step'] = step
+                rate = sent / 1024 / 1024 / max(time.monotonic() - started, 1e-6)
+                self.logger.info(f"上传中 {name}: {step * 10}% ({rate:.1f} MB/s)")
+
+        return on_progress
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+页面发布后端
+ConfluencePageCreator通过后端接口完成页面发布，可选Playwright界面驱动或REST API
+"""
+
+import asyncio
+import re
+from typing import Dict, Optional, Any, TYPE_CHECKING
+
+from .page_index import page_key
+from .storage_format import markdown_to_storage
+from .section_diff import diff_sections
+from .tracing import Tracer, traced_step, retry_attempt
+
+if TYPE_CHECKING:
+    from .main import ConfluencePageCreator
+
+
+class PageBackend:
+    """页面发布后端接口"""
+
+    name = ''
+
+    def __init__(self, creator: 'ConfluencePageCreator'):
+        self.creator = creator
+
+    @property
+    def tracer(self) -> Tracer:
+        return self.creator.tracer
+
+    async def prepare(self):
+        """发布前的准备工作（启动浏览器、建立HTTP会话等）"""
+        raise NotImplementedError
+
+    async def publish(self) -> Dict[str, str]:
+        """发布已生成的内容，返回包含page_id和page_url的字典"""
+        raise NotImplementedError
+
+    async def close(self):
+        """释放后端资源"""
+        raise NotImplementedError
+
+
+class PlaywrightBackend(PageBackend):
+    """通过Playwright操作Confluence网页界面创建页面"""
+
+    name = 'ui'
+
+    async def prepare(self):
+        creator = self.creator
+        # 已挂载共享会话时跳过浏览器初始化（重试时复用已启动的浏览器）
+        if not creator._shared_session:
+            await creator.setup_browser_and_auth()
+        await creator.navigate_to_parent_page()
+        await creator.click_create_button()
+
+    async def publish(self) -> Dict[str, str]:
+        creator = self.creator
+        # 重试时编辑器状态未知，重新打开创建页面
+        if retry_attempt.get():
+            await creator.navigate_to_parent_page()
+            await creator.click_create_button()
+        await creator.fill_page_content()
+        await creator.save_and_publish()
+
+        # 优先使用发布响应中的页面ID，否则从URL中提取
+        current_url = creator.page.url
+        page_id = creator.published_page_id
+        match = re.search(r'/pages/(\d+)', current_url)
+        if not page_id and match:
+            page_id = match.group(1)
+        if not page_id:
+            raise Exception(f"发布后无法确定页面ID: {current_url}")
+
+        return {'page_id': page_id, 'page_url': current_url}
+
+    async def close(self):
+        await self.creator.cleanup_resources()
+
+
+class RestApiBackend(PageBackend):
+    """通过Confluence REST API单次请求创建页面，或按章节增量更新已有页面"""
+
+    name = 'api'
+
+    def __init__(self, creator: 'ConfluencePageCreator'):
+        super().__init__(creator)
+        self._owns_client = False
+
+    @traced_step('initialize')
+    async def prepare(self):
+        from .confluence_api import ConfluenceRestClient
+
+        creator = self.creator
+        # 批量模式下复用共享的连接池客户端
+        if creator.api_client is None:
+            creator.api_client = ConfluenceRestClient.from_config(creator.config)
+            self._owns_client = True
+
+    @traced_step('save_page')
+    async def publish(self) -> Dict[str, str]:
+        creator = self.creator
+        config = creator.config
+        content = creator.generated_content
+        storage_body = markdown_to_storage(content['content'])
+
+        loop = asyncio.get_running_loop()
+        if config.get('update_existing'):
+            existing = await loop.run_in_executor(None, self._find_existing)
+            if existing:
+                return await loop.run_in_executor(None, self._update_existing, existing, storage_body)
+        elif retry_attempt.get():
+            # 上次请求可能已在服务端创建成功（如响应超时），重试前先按标题查找
+            page = await loop.run_in_executor(None, lambda: creator.api_client.find_page(
+                config['space_key'], content['title']
+            ))
+            if page:
+                creator.logger.info(f"页面已在上次尝试中创建: {page['id']}")
+                return self._created(page)
+
+        page = await loop.run_in_executor(None, lambda: creator.api_client.create_page(
+            config['space_key'],
+            content['title'],
+            storage_body,
+            parent_id=config.get('parent_page_id') or None,
+            labels=content.get('tags')
+        ))
+        if config.get('update_existing'):
+            creator.update_report = {'action': 'created'}
+
+        creator.logger.info(f"页面已通过API创建: {page['id']}")
+        return self._created(page)
+
+    def _created(self, page: Dict[str, Any]) -> Dict[str, str]:
+        return {
+            'page_id': str(page['id']),
+            'page_url': self.creator.api_client.page_url(page),
+            'version': page.get('version', {}).get('number', 1),
+            'action': 'created'
+        }
+
+    def _find_existing(self) -> Optional[Dict[str, Any]]:
+        """查找要更新的页面：优先使用页面索引中记录的页面ID，否则按空间和标题查找"""
+        from .confluence_api import ConfluenceApiError
+
+        creator = self.creator
+        if creator.previous_publish:
+            try:
+                return creator.api_client.get_page(creator.previous_publish['page_id'])
+            except ConfluenceApiError as e:
+                # 页面已被删除时删除失效的索引记录，按标题重新查找
+                if e.status_code != 404:
+                    raise
+                index = creator._page_index()
+                if index:
+                    index.remove(page_key(creator.config))
+                creator.previous_publish = None
+        return creator.api_client.find_page(creator.config['space_key'], creator.generated_content['title'])
+
+    def _update_existing(self, page: Dict[str, Any], storage_body: str) -> Dict[str, Any]:
+        """按章节比较现有正文，只替换变化的章节；没有变化时不更新（不产生新版本）"""
+        creator = self.creator
+        diff = diff_sections(
+            page['body']['storage']['value'],
+            storage_body,
+            markdown_to_storage(creator.stable_content)
+        )
+        version = page['version']['number']
+        action = 'unchanged'
+
+        if diff.has_changes:
+            page = creator.api_client.update_page(page['id'], creator.generated_content['title'],
+                                                  diff.body, version + 1)
+            version = page['version']['number']
+            action = 'updated'
+            creator.logger.info(f"页面已增量更新: {page['id']}（变化章节 {len(diff.changed)}，"
+                                f"新增 {len(diff.added)}，删除 {len(diff.removed)}）")
+        else:
+            creator.logger.info(f"页面内容未变化，未更新: {page['id']}")
+
+        creator.update_report = {'action': action, 'version': version, **diff.to_dict()}
+        return {
+            'page_id': str(page['id']),
+            'page_url': creator.api_client.page_url(page),
+            'version': version,
+            'action': action
+        }
+
+    @traced_step('cleanup')
+    async def close(self):
+        if self._owns_client and self.creator.api_client:
+            self.creator.api_client.close()
+            self.creator.api_client = None
+
+
+BACKENDS = {
+    PlaywrightBackend.name: PlaywrightBackend,
+    RestApiBackend.name: RestApiBackend,
+}
+
+
+def create_backend(creator: 'ConfluencePageCreator') -> PageBackend:
+    """根据配置中的backend字段创建发布后端"""
+    backend_name = creator.config.get('backend', PlaywrightBackend.name)
+    if backend_name not in BACKENDS:
+        raise ValueError(f"不支持的后端: {backend_name}，可选: {', '.join(BACKENDS)}")
+    return BACKENDS[backend_name](creator)
@@ -0,0 +1,374 @@
+#!/usr/bin/env python3
+"""
+Confluence批量页面创建
+共享一个浏览器会话（只启动和登录一次），在有界Page池上并发处理清单中的页面作业；
+需要人工审核的作业逐个审核，审核期间浏览器会话照常启动，审核通过的作业随即进入浏览器阶段；
+挂载执行日志时，中断后恢复运行会跳过已完成的作业并复用已审核的内容
+"""
+
+import asyncio
+import os
+import tempfile
+import time
+import logging
+from typing import Dict, List, Optional, Any
+
+import yaml
+
+from .main import ConfluencePageCreator, launch_browser
+from .journal import RunJournal, journal_path_for
+from .content_source import shard_manifest
+from .traffic import get_controller
+from .recycling import RecyclePolicy, ResourceManager
+
+
+DEFAULT_CONCURRENCY = 4
+# 同一清单的作业共享一个浏览器会话（或API客户端）和流量控制器，这些配置必须一致
+SESSION_KEYS = ('confluence_url', 'username', 'backend')
+# 共享会话在资源管理器中的标识
+SESSION_LANE = 'session'
+
+
+def load_manifest(manifest_file: str) -> Dict[str, Any]:
+    """读取并校验批量清单文件"""
+    if not os.path.exists(manifest_file):
+        raise ValueError(f"清单文件不存在: {manifest_file}")
+
+    with open(manifest_file, 'r', encoding='utf-8') as f:
+        manifest = yaml.safe_load(f) or {}
+
+    # 页面树清单（tree）由TreeRunner展开为作业
+    if 'tree' in manifest:
+        if not isinstance(manifest['tree'], list) or not manifest['tree']:
+            raise ValueError("页面树清单的tree必须为非空列表")
+        return manifest
+
+    if not isinstance(manifest.get('jobs'), list) or not manifest['jobs']:
+        raise ValueError("清单缺少作业列表: jobs")
+
+    return manifest
+
+
+def build_job_configs(manifest: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """合并清单默认值与每个作业的配置"""
+    defaults = manifest.get('defaults', {}) or {}
+    job_configs = []
+
+    for index, job in enumerate(manifest['jobs']):
+        config = {**defaults, **(job or {})}
+        config.setdefault('job_id', str(config.pop('id', index + 1)))
+        # 批量模式无人值守，默认跳过交互确认
+        config.setdefault('auto_confirm', True)
+        job_configs.append(config)
+
+    def session_identity(config: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            'confluence_url': str(config.get('confluence_url') or '').rstrip('/'),
+            'username': config.get('username'),
+            'backend': config.get('backend', 'ui')
+        }
+
+    first = session_identity(job_configs[0])
+    for config in job_configs[1:]:
+        identity = session_identity(config)
+        differing = [key for key in SESSION_KEYS if identity[key] != first[key]]
+        if differing:
+            raise ValueError(f"作业 {config['job_id']} 的 {', '.join(differing)} 与作业 {job_configs[0]['job_id']} 不同，"
+                             f"同一清单的作业共享一个会话，请拆分为多个清单")
+
+    return job_configs
+
+
+class BatchRunner:
+    """批量执行器：一次初始化浏览器与登录，多个作业并发复用同一BrowserContext"""
+
+    def __init__(self, manifest: Dict[str, Any], journal: Optional[RunJournal] = None):
+        self.job_configs = build_job_configs(manifest)
+        self.journal = journal
+        self.concurrency = max(1, int(manifest.get('concurrency', DEFAULT_CONCURRENCY)))
+        self.backend = self.job_configs[0].get('backend', 'ui')
+        self.session_creator: ConfluencePageCreator = None
+        self.api_client = None
+        self.recycler: Optional[ResourceManager] = None
+        # 终端同一时间只能审核一个作业；锁在run()中创建，使其绑定执行时的事件循环（Python 3.8/3.9）
+        self._review_lock: Optional[asyncio.Lock] = None
+
+        logging.basicConfig(
+            level=logging.INFO,
+            format='%(asctime)s - %(levelname)s - %(message)s'
+        )
+        self.logger = logging.getLogger(__name__)
+
+    async def _open_session(self):
+        """启动浏览器并登录，创建有界Page池"""
+        pool_size = min(self.concurrency, len(self.job_configs))
+        page_pool: asyncio.Queue = asyncio.Queue()
+
+        if self.backend == 'api':
+            # API后端无需浏览器，所有作业共享一个连接池客户端，池中为并发槽位
+            from .confluence_api import ConfluenceRestClient
+            self.api_client = ConfluenceRestClient.from_config(self.job_configs[0], pool_size=pool_size)
+            for _ in range(pool_size):
+                page_pool.put_nowait(None)
+            self.logger.info(f"API会话就绪，并发数: {pool_size}")
+            return page_pool
+
+        self.session_creator = ConfluencePageCreator({**self.job_configs[0], 'job_id': 'session'})
+        await self.session_creator.setup_browser_and_auth()
+        # 导航一次以完成登录，登录态保存在共享的BrowserContext中
+        await self.session_creator.navigate_to_parent_page()
+
+        # 页面、上下文和浏览器达到作业数上限或内存超出预算时由资源管理器回收
+        session = self.session_creator
+        self.recycler = ResourceManager(RecyclePolicy.from_config(session.config),
+                                        launch=lambda: launch_browser(session.playwright, session.config))
+        self.recycler.adopt(SESSION_LANE, session.browser, session.context, session.create_context,
+                            page_timeout=session.config.get('timeout', 30000), pages=[session.page])
+        await page_pool.put(session.page)
+
+        for _ in range(pool_size - 1):
+            await page_pool.put(await self.recycler.open_page(SESSION_LANE))
+
+        self.logger.info(f"共享会话就绪，Page池大小: {pool_size}")
+        return page_pool
+
+    async def _review_job(self, creator: ConfluencePageCreator) -> bool:
+        """审核阶段：生成内容并逐个交给用户审核，不占用Page池中的页面"""
+        # 上次运行中已审核过的内容不再重复审核
+        if creator.approved is not None:
+            return creator.approved
+        await creator.generate_page_content()
+        # 页面索引按父页面区分，先解析标题路径指定的父页面；解析失败时照常审核，由工作流中的解析步骤报告错误
+        try:
+            await creator.resolve_parent()
+        except Exception as e:
+            self.logger.warning(f"作业 {creator.config['job_id']} 解析父页面失败: {e}")
+        else:
+            # 内容未变化的作业无需审核，执行时直接跳过
+            if creator.find_unchanged():
+                return True
+        async with self._review_lock:
+            return await creator.review()
+
+    async def _run_job(self, config: Dict[str, Any], session: asyncio.Future) -> Dict[str, Any]:
+        """审核通过后从Page池借出一个页面执行单个作业"""
+        job_id = config['job_id']
+        started = time.monotonic()
+
+        finished = self.journal.completed_result(job_id) if self.journal else None
+        if finished:
+            self.logger.info(f"作业 {job_id} 已在上次运行中完成，跳过")
+            return {**finished, 'job_id': job_id, 'resumed': True, 'elapsed': 0.0}
+
+        try:
+            creator = ConfluencePageCreator(config)
+        except ValueError as e:
+            return {
+                'job_id': job_id,
+                'success': False,
+                'page_url': '',
+                'page_id': '',
+                'message': f'配置无效: {e}',
+                'elapsed': 0.0
+            }
+
+        if self.journal:
+            creator.attach_journal(self.journal)
+
+        if not config.get('auto_confirm') and not await self._review_job(creator):
+            self.logger.info(f"作业 {job_id} 已被用户取消")
+            result = {
+                'job_id': job_id,
+                'success': False,
+                'page_url': '',
+                'page_id': '',
+                'message': '用户取消操作',
+                'elapsed': round(time.monotonic() - started, 3)
+            }
+            if self.journal:
+                await asyncio.wrap_future(self.journal.job_done(job_id, result))
+            return result
+
+        page_pool = await session
+        page = await page_pool.get()
+        try:
+            if page is None:
+                creator.attach_api_client(self.api_client)
+            else:
+                page = await self.recycler.checkout(SESSION_LANE, page)
+                creator.attach_session(self.recycler.browser_of(page), self.recycler.context_of(page), page,
+                                       selector_resolver=self.session_creator.selector_resolver,
+                                       request_filter=self.session_creator.request_filter)
+            result = await creator.execute()
+        finally:
+            if page is not None:
+                # 达到上限的页面在归还时换成新页面
+                page = await self.recycler.checkin(page)
+            page_pool.put_nowait(page)
+
+        result['job_id'] = job_id
+        result['elapsed'] = round(time.monotonic() - started, 3)
+        self.logger.info(f"作业 {job_id} 完成: {result['message']} ({result['elapsed']}s)")
+        return result
+
+    async def _run_jobs(self, session: Optional[asyncio.Future]) -> List[Dict[str, Any]]:
+        """并发执行全部作业（并发数受Page池限制），结果按清单顺序返回"""
+        jobs = [asyncio.ensure_future(self._run_job(config, session)) for config in self.job_configs]
+        try:
+            return list(await asyncio.gather(*jobs))
+        except BaseException:
+            for job in jobs:
+                job.cancel()
+            await asyncio.gather(*jobs, return_exceptions=True)
+            raise
+
+    async def run(self) -> Dict[str, Any]:
+        """执行全部作业，返回逐作业结果和总吞吐量"""
+        started = time.monotonic()
+        self._review_lock = asyncio.Lock()
+        summary = {
+            'success': False,
+            'total': len(self.job_configs),
+            'succeeded': 0,
+            'failed': 0,
+            'skipped': 0,
+            'resumed': 0,
+            'elapsed': 0.0,
+            'pages_per_second': 0.0,
+            'jobs': [],
+            'selector_cache': {},
+            'request_filter': {},
+            'traffic': {},
+            'recycle': {},
+            'message': ''
+        }
+
+        # 浏览器会话在后台启动，与内容生成和审核并行；全部作业已完成时不启动
+        pending = [config for config in self.job_configs
+                   if not (self.journal and self.journal.completed_result(config['job_id']))]
+        session = asyncio.ensure_future(self._open_session()) if pending else None
+        try:
+            summary['jobs'] = await self._run_jobs(session)
+        except Exception as e:
+            self.logger.error(f"批量执行失败: {str(e)}")
+            summary['message'] = f'批量执行失败: {str(e)}'
+        finally:
+            if session:
+                if not session.done():
+                    session.cancel()
+                await asyncio.gather(session, return_exceptions=True)
+            if self.recycler:
+                summary['recycle'] = self.recycler.stats()
+                await self.recycler.close()
+            if self.session_creator:
+                await self.session_creator.cleanup_resources()
+            if self.api_client:
+                self.api_client.close()
+
+        if self.session_creator:
+            summary['selector_cache'] = self.session_creator.selector_resolver.stats()
+            if self.session_creator.request_filter:
+                summary['request_filter'] = self.session_creator.request_filter.stats()
+        traffic = get_controller(self.job_configs[0])
+        if traffic:
+            summary['traffic'] = traffic.stats()
+
+        elapsed = time.monotonic() - started
+        summary['succeeded'] = sum(1 for r in summary['jobs'] if r['success'])
+        summary['failed'] = summary['total'] - summary['succeeded']
+        summary['skipped'] = sum(1 for r in summary['jobs'] if r.get('skipped'))
+        summary['resumed'] = sum(1 for r in summary['jobs'] if r.get('resumed'))
+        summary['elapsed'] = round(elapsed, 3)
+        if elapsed > 0:
+            summary['pages_per_second'] = round(summary['succeeded'] / elapsed, 3)
+        summary['success'] = bool(summary['jobs']) and summary['failed'] == 0
+        if not summary['message']:
+            summary['message'] = f"完成 {summary['succeeded']}/{summary['total']} 个页面"
+
+        return summary
+
+
+async def run_batch(manifest_file: str, resume: bool = False, journal_path: Optional[str] = None,
+                    workers: Optional[int] = None) -> int:
+    """批量模式入口，打印汇总结果并返回退出码；resume为True时从执行日志恢复
+
+    清单中workers（或参数workers）大于1时按多进程分片执行，清单为页面树（tree）时父页面先于子页面创建
+    """
+    try:
+        manifest = load_manifest(manifest_file)
+    except Exception as e:
+        print(f"读取清单文件失败: {e}")
+        return 1
+
+    if workers:
+        manifest['workers'] = workers
+    journal_path = journal_path or journal_path_for(manifest_file)
+
+    is_tree = 'tree' in manifest
+    if is_tree and int(manifest.get('workers', 1)) > 1:
+        print("页面树清单不支持多进程分片（子页面依赖父页面ID）")
+        return 1
+
+    if int(manifest.get('workers', 1)) > 1:
+        # 拆分出的子页面依赖父页面ID，与页面树一样无法分配到多个进程，多进程分片时内容文件整篇发布
+        from .shard import ShardedRunner
+        summary = await ShardedRunner(manifest, journal_path=journal_path, resume=resume).run()
+    else:
+        journal = RunJournal(journal_path, resume=resume)
+        try:
+            with tempfile.TemporaryDirectory(prefix='confluence-shards-') as shard_dir:
+                # 内容文件超过content_shard_size的作业与单页面创建一样拆分为父页面和子页面
+                try:
+                    manifest = shard_manifest(manifest, shard_dir)
+                except ValueError as e:
+                    print(f"读取内容文件失败: {e}")
+                    return 1
+                if 'tree' in manifest:
+                    from .tree import TreeRunner
+                    runner = TreeRunner(manifest, journal=journal)
+                else:
+                    runner = BatchRunner(manifest, journal=journal)
+                summary = await runner.run()
+        finally:
+            journal.close()
+
+    print_summary(summary)
+    return 0 if summary['success'] else 1
+
+
+def print_summary(summary: Dict[str, Any]):
+    """打印批量执行汇总"""
+    print("\n" + "="*60)
+    print("🎉 批量执行结果")
+    print("="*60)
+    for job in summary['jobs']:
+        status = '⏭️' if job.get('skipped') or job.get('resumed') else '✅' if job['success'] else '❌'
+        indent = '  ' * job.get('depth', 0)
+        print(f"{indent}{status} [{job['job_id']}] {job['message']} {job['page_url']} ({job['elapsed']}s)")
+    print("-" * 40)
+    print(f"📝 消息: {summary['message']}")
+    if summary['skipped']:
+        print(f"⏭️  内容未变化跳过: {summary['skipped']} 个")
+    if summary['resumed']:
+        print(f"♻️  上次运行已完成: {summary['resumed']} 个")
+    print(f"⏱️  总耗时: {summary['elapsed']}s")
+    if summary.get('workers'):
+        print(f"🧩 分片: {summary['workers']} 个进程 × 每进程 {summary['pages_per_worker']} 个页面")
+    print(f"🚀 吞吐量: {summary['pages_per_second']} 页/秒")
+    if summary['selector_cache']:
+        cache_stats = summary['selector_cache']
+        print(f"🎯 选择器缓存: 命中 {cache_stats['hits']} / 未命中 {cache_stats['misses']}")
+    if summary['request_filter']:
+        filter_stats = summary['request_filter']
+        print(f"🚫 请求过滤: 拦截 {filter_stats['blocked']} 个请求，"
+              f"约节省 {filter_stats['bytes_saved_estimate'] / 1024:.0f} KB")
+    if summary.get('traffic'):
+        traffic = summary['traffic']
+        print(f"🚦 流量控制: {traffic['requests']} 个请求，限流 {traffic['throttled']} 次，"
+              f"并发上限 {traffic['concurrency_limit']}，排队 {traffic['waited']}s")
+    if summary.get('recycle'):
+        recycle = summary['recycle']
+        memory = f"，浏览器内存峰值 {recycle['peak_rss_mb']}MB" if recycle['peak_rss_mb'] else ''
+        print(f"♻️  资源回收: 页面 {recycle['pages_recycled']} 次，上下文 {recycle['contexts_recycled']} 次，"
+              f"浏览器 {recycle['browsers_recycled']} 次{memory}")
+    print("="*60)
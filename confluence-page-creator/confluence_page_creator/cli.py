@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+命令行入口（confluence-creator）
+render/validate 只加载模板与配置相关的模块，create/batch 才导入Playwright等重量级依赖
+"""
+
+import argparse
+import asyncio
+import sys
+from typing import List, Optional
+
+
+def cmd_render(args) -> int:
+    """渲染模板并输出，不需要Confluence地址和认证信息"""
+    from .main import load_config, render_page
+
+    config = load_config(args.config_file)
+    if args.title:
+        config['page_title'] = args.title
+    if args.template:
+        config['page_template'] = args.template
+
+    page = render_page(config)
+    if args.format == 'storage':
+        from .storage_format import markdown_to_storage
+        output = markdown_to_storage(page['content'])
+    else:
+        output = page['content']
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output)
+        print(f"📝 已写入: {args.output}")
+    else:
+        print(output)
+    return 0
+
+
+def cmd_validate(args) -> int:
+    """校验配置文件"""
+    from .main import load_config, validate_config
+
+    config = load_config(args.config_file)
+    validate_config(config)
+    print(f"✅ 配置有效: {args.config_file}（模板: {config.get('page_template', 'meeting-notes')}，"
+          f"后端: {config.get('backend', 'ui')}）")
+    return 0
+
+
+def cmd_create(args) -> int:
+    """创建单个页面"""
+    from .main import load_config, run_single
+    from .journal import RunJournal, journal_path_for
+
+    config = load_config(args.config_file)
+    if args.yes:
+        config['auto_confirm'] = True
+    if args.content:
+        config['content_file'] = args.content
+
+    journal = RunJournal(args.journal or journal_path_for(args.config_file), resume=args.resume)
+    try:
+        return asyncio.run(run_single(config, journal=journal))
+    finally:
+        journal.close()
+
+
+def cmd_batch(args) -> int:
+    """按清单批量创建页面"""
+    from .batch import run_batch
+
+    return asyncio.run(run_batch(args.manifest_file, resume=args.resume, journal_path=args.journal,
+                                 workers=args.workers))
+
+
+def cmd_cache_clear(args) -> int:
+    """清除页面元数据缓存（父页面被移动或改名后使用），--page同时删除该页面的发布索引记录"""
+    from .main import load_config
+    from .page_metadata import get_metadata_cache, split_title_path
+    from .page_index import get_index, page_key
+
+    config = load_config(args.config_file)
+    if not config.get('confluence_url'):
+        raise ValueError("缺少必需参数: confluence_url")
+    space_key = None if args.all_spaces else config.get('space_key')
+    if not args.all_spaces and not space_key:
+        raise ValueError("缺少必需参数: space_key")
+    if args.page and not (config.get('space_key') and config.get('page_title')):
+        raise ValueError("--page 需要配置 space_key 和 page_title")
+
+    confluence_url = config['confluence_url'].rstrip('/')
+    metadata = get_metadata_cache(config.get('metadata_cache_path'))
+    if args.page:
+        # 父页面按标题路径指定时，索引键中的父页面ID从清除前的元数据缓存中取得
+        if config.get('parent_page_path') and not config.get('parent_page_id'):
+            config['parent_page_id'] = metadata.lookup_path(
+                confluence_url, config['space_key'], split_title_path(str(config['parent_page_path'])), float('inf'))
+            if not config['parent_page_id']:
+                raise ValueError(f"元数据缓存中没有父页面 {config['parent_page_path']}，请在配置中指定 parent_page_id")
+        get_index(config.get('page_index_path')).remove(page_key(config))
+        print(f"🧹 已删除页面索引记录: {config['page_title']}，下次运行将重新发布")
+
+    metadata.invalidate(confluence_url, space_key)
+    print(f"🧹 已清除元数据缓存: {config['confluence_url']}" + (f"（空间 {space_key}）" if space_key else ''))
+    return 0
+
+
+def add_journal_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument('--resume', action='store_true',
+                        help='从执行日志恢复：跳过已完成的作业，复用已审核的内容')
+    parser.add_argument('--journal', help='执行日志路径（默认 ~/.cache/confluence-page-creator/journals/）')
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog='confluence-creator', description='Confluence页面创建器')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    render_parser = subparsers.add_parser('render', help='渲染页面内容（不启动浏览器）')
+    render_parser.add_argument('config_file')
+    render_parser.add_argument('--format', choices=['markdown', 'storage'], default='markdown',
+                               help='输出Markdown或Confluence storage格式')
+    render_parser.add_argument('--title', help='覆盖page_title')
+    render_parser.add_argument('--template', help='覆盖page_template')
+    render_parser.add_argument('-o', '--output', help='输出文件（默认标准输出）')
+    render_parser.set_defaults(handler=cmd_render)
+
+    validate_parser = subparsers.add_parser('validate', help='校验配置文件')
+    validate_parser.add_argument('config_file')
+    validate_parser.set_defaults(handler=cmd_validate)
+
+    create_parser = subparsers.add_parser('create', help='创建页面')
+    create_parser.add_argument('config_file')
+    create_parser.add_argument('-y', '--yes', action='store_true', help='跳过交互确认')
+    create_parser.add_argument('-c', '--content', help='页面内容的Markdown文件（覆盖content_file，- 表示标准输入）')
+    add_journal_arguments(create_parser)
+    create_parser.set_defaults(handler=cmd_create)
+
+    batch_parser = subparsers.add_parser('batch', help='按清单批量创建页面')
+    batch_parser.add_argument('manifest_file')
+    batch_parser.add_argument('-w', '--workers', type=int, help='工作进程数（覆盖清单中的workers，大于1时多进程分片）')
+    add_journal_arguments(batch_parser)
+    batch_parser.set_defaults(handler=cmd_batch)
+
+    cache_parser = subparsers.add_parser('cache-clear', help='清除页面元数据缓存')
+    cache_parser.add_argument('config_file')
+    cache_parser.add_argument('--all-spaces', action='store_true', help='清除该站点全部空间的缓存')
+    cache_parser.add_argument('--page', action='store_true',
+                              help='同时删除该页面的发布索引记录（页面被手动删除或需要强制重新发布时使用）')
+    cache_parser.set_defaults(handler=cmd_cache_clear)
+
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """console_scripts入口"""
+    args = build_parser().parse_args(argv)
+    try:
+        return args.handler(args)
+    except ValueError as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Confluence REST API客户端
+基于连接池和keep-alive的requests会话，供API后端及其他功能复用
+"""
+
+from typing import Dict, List, Optional, Any
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .traffic import TrafficController, get_controller, parse_retry_after
+
+
+class ConfluenceApiError(Exception):
+    """Confluence REST API返回错误"""
+
+    def __init__(self, status_code: int, message: str, retry_after: Optional[float] = None):
+        super().__init__(f"Confluence API错误 {status_code}: {message}")
+        self.status_code = status_code
+        # 响应中Retry-After要求的等待秒数（限流时）
+        self.retry_after = retry_after
+
+
+class ConfluenceRestClient:
+    """Confluence REST API客户端（同步，线程安全的连接池）"""
+
+    def __init__(self, base_url: str, username: str, api_token: str,
+                 pool_size: int = 10, timeout: float = 30.0, traffic: Optional[TrafficController] = None):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        # 站点共享的流量控制器，所有请求经其限速和限制并发
+        self.traffic = traffic
+
+        # 复用TCP连接，避免每次请求重新握手
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.auth = (username, api_token)
+        self.session.headers.update({
+            'Accept': 'application/json',
+            'Connection': 'keep-alive'
+        })
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any], pool_size: int = 10) -> 'ConfluenceRestClient':
+        """根据技能配置创建客户端"""
+        return cls(
+            config['confluence_url'],
+            config['username'],
+            config['api_token'],
+            pool_size=pool_size,
+            timeout=config.get('timeout', 30000) / 1000,
+            traffic=get_controller(config)
+        )
+
+    def _request(self, method: str, path: str, sample_latency: bool = True, **kwargs) -> Dict[str, Any]:
+        """发送请求并解析JSON响应；sample_latency为False时耗时不计入流量控制的平滑延迟"""
+        kwargs.setdefault('timeout', self.timeout)
+        if self.traffic:
+            with self.traffic.request() as outcome:
+                outcome['sample_latency'] = sample_latency
+                response = self.session.request(method, f"{self.base_url}{path}", **kwargs)
+                outcome['status'] = response.status_code
+                outcome['retry_after'] = parse_retry_after(response.headers.get('Retry-After'))
+        else:
+            response = self.session.request(method, f"{self.base_url}{path}", **kwargs)
+
+        if response.status_code >= 400:
+            raise ConfluenceApiError(response.status_code, response.text[:200],
+                                     parse_retry_after(response.headers.get('Retry-After')))
+
+        if not response.content:
+            return {}
+        return response.json()
+
+    def create_page(self, space_key: str, title: str, storage_body: str,
+                    parent_id: Optional[str] = None, labels: Optional[List[str]] = None) -> Dict[str, Any]:
+        """通过单次POST以storage格式创建页面"""
+        payload: Dict[str, Any] = {
+            'type': 'page',
+            'title': title,
+            'space': {'key': space_key},
+            'body': {
+                'storage': {
+                    'value': storage_body,
+                    'representation': 'storage'
+                }
+            }
+        }
+
+        if parent_id:
+            payload['ancestors'] = [{'id': str(parent_id)}]
+
+        if labels:
+            payload['metadata'] = {
+                'labels': [{'prefix': 'global', 'name': label} for label in labels]
+            }
+
+        return self._request('POST', '/rest/api/content', json=payload)
+
+    def get_page(self, page_id: str, expand: str = 'body.storage,version') -> Dict[str, Any]:
+        """获取页面详情"""
+        return self._request('GET', f'/rest/api/content/{page_id}', params={'expand': expand})
+
+    def find_page(self, space_key: str, title: str,
+                  expand: str = 'body.storage,version') -> Optional[Dict[str, Any]]:
+        """按空间和标题查找页面，不存在时返回None"""
+        data = self._request('GET', '/rest/api/content', params={
+            'spaceKey': space_key,
+            'title': title,
+            'type': 'page',
+            'expand': expand
+        })
+        results = data.get('results', [])
+        return results[0] if results else None
+
+    def update_page(self, page_id: str, title: str, storage_body: str, version: int) -> Dict[str, Any]:
+        """以storage格式更新页面正文，version为新版本号（当前版本+1）；标签保持不变"""
+        payload = {
+            'id': str(page_id),
+            'type': 'page',
+            'title': title,
+            'version': {'number': version},
+            'body': {
+                'storage': {
+                    'value': storage_body,
+                    'representation': 'storage'
+                }
+            }
+        }
+        return self._request('PUT', f'/rest/api/content/{page_id}', json=payload)
+
+    def list_attachments(self, page_id: str, page_size: int = 200) -> List[Dict[str, Any]]:
+        """列出页面的全部附件（含版本和备注）"""
+        attachments: List[Dict[str, Any]] = []
+        while True:
+            data = self._request('GET', f'/rest/api/content/{page_id}/child/attachment', params={
+                'expand': 'version,metadata',
+                'start': len(attachments),
+                'limit': page_size
+            })
+            results = data.get('results', [])
+            attachments.extend(results)
+            if len(results) < page_size:
+                return attachments
+
+    def upload_attachment(self, page_id: str, body, attachment_id: Optional[str] = None) -> Dict[str, Any]:
+        """上传附件，body为带长度的流式multipart请求体；attachment_id不为空时上传为该附件的新版本"""
+        path = f'/rest/api/content/{page_id}/child/attachment'
+        if attachment_id:
+            path += f'/{attachment_id}/data'
+        # 流式上传的耗时取决于文件大小和带宽，不作为拥塞信号，否则大附件会让并发上限不断下降
+        data = self._request('POST', path, sample_latency=False, data=body, headers={
+            'Content-Type': body.content_type,
+            'X-Atlassian-Token': 'no-check'
+        })
+        # 新建附件的响应为结果列表，上传新版本的响应为附件本身
+        return data['results'][0] if 'results' in data else data
+
+    def page_url(self, page: Dict[str, Any]) -> str:
+        """根据API响应拼接页面的Web地址"""
+        links = page.get('_links', {})
+        if links.get('webui'):
+            return f"{links.get('base', self.base_url)}{links['webui']}"
+        return f"{self.base_url}/pages/{page['id']}"
+
+    def close(self):
+        """关闭连接池"""
+        self.session.close()
@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""
+页面内容来源
+content_file指定的Markdown文件或标准输入（-）按需读取，预览只读取显示的行；
+超过content_shard_size的文档在标题处流式拆分为父页面和子页面，每次只在内存中保留一个章节，
+各页面大小有界，编辑器填写和发布耗时不随源文档长度增长
+"""
+
+import atexit
+import os
+import re
+import shutil
+import sys
+import tempfile
+import threading
+from typing import Dict, Iterator, List, Optional, Any, Tuple
+
+STDIN = '-'
+CHUNK_SIZE = 1024 * 1024
+# 默认在一级和二级标题处拆分
+DEFAULT_SHARD_HEADING_LEVEL = 2
+
+HEADING_RE = re.compile(r'^(#{1,6})\s+(.+?)\s*#*\s*$')
+FENCE_RE = re.compile(r'^\s*(```|~~~)')
+
+
+def iter_lines(text: str) -> Iterator[str]:
+    """逐行产出字符串中的行（不含换行符），不一次性拆分整个字符串"""
+    start = 0
+    while start < len(text):
+        end = text.find('\n', start)
+        if end < 0:
+            yield text[start:]
+            return
+        yield text[start:end]
+        start = end + 1
+
+
+def preview_lines(text: str, limit: int) -> Tuple[List[str], int]:
+    """返回前limit行及其后剩余的行数（剩余行只计数，不拆分）"""
+    lines = []
+    position = 0
+    for line in iter_lines(text):
+        if len(lines) == limit:
+            break
+        lines.append(line)
+        position += len(line) + 1
+    remaining = 0
+    if position < len(text):
+        remaining = text.count('\n', position) + (0 if text.endswith('\n') else 1)
+    return lines, remaining
+
+
+class ContentSource:
+    """按需读取的内容文件；标准输入只能读取一次，先分块转存到临时文件"""
+
+    def __init__(self, path: str):
+        self._spooled = path == STDIN
+        if self._spooled:
+            fd, path = tempfile.mkstemp(prefix='confluence-stdin-', suffix='.md')
+            with os.fdopen(fd, 'wb') as f:
+                shutil.copyfileobj(sys.stdin.buffer, f, CHUNK_SIZE)
+        path = os.path.expanduser(path)
+        if not os.path.isfile(path):
+            raise ValueError(f"内容文件不存在: {path}")
+        self.path = path
+
+    @property
+    def size(self) -> int:
+        return os.path.getsize(self.path)
+
+    def lines(self) -> Iterator[str]:
+        """逐行读取（保留换行符）"""
+        with open(self.path, 'r', encoding='utf-8', newline='') as f:
+            yield from f
+
+    def read(self) -> str:
+        with open(self.path, 'r', encoding='utf-8', newline='') as f:
+            return f.read()
+
+    def close(self):
+        if self._spooled and os.path.exists(self.path):
+            os.unlink(self.path)
+
+
+_stdin_source: Optional[ContentSource] = None
+_stdin_lock = threading.Lock()
+
+
+def open_content(path: str) -> ContentSource:
+    """打开内容来源；标准输入在进程内只读取一次，之后复用转存的临时文件"""
+    global _stdin_source
+    if path != STDIN:
+        return ContentSource(path)
+    with _stdin_lock:
+        if _stdin_source is None:
+            _stdin_source = ContentSource(STDIN)
+            atexit.register(_stdin_source.close)
+        return _stdin_source
+
+
+def split_sections(lines: Iterator[str], heading_level: int) -> Iterator[Tuple[int, Optional[str], List[str]]]:
+    """按不高于heading_level级的标题切分章节，产出(标题级别, 标题, 章节行)；首个标题之前的内容级别为0、标题为None
+
+    代码块中的 # 不视为标题
+    """
+    level, heading = 0, None
+    section: List[str] = []
+    in_fence = False
+    for line in lines:
+        if FENCE_RE.match(line):
+            in_fence = not in_fence
+        match = None if in_fence else HEADING_RE.match(line.rstrip('\r\n'))
+        if match and len(match.group(1)) <= heading_level:
+            if section or heading is not None:
+                yield level, heading, section
+            level, heading, section = len(match.group(1)), match.group(2), []
+        section.append(line)
+    if section or heading is not None:
+        yield level, heading, section
+
+
+def shard_document(source: ContentSource, shard_size: int, directory: str,
+                   heading_level: int = DEFAULT_SHARD_HEADING_LEVEL) -> Tuple[str, List[Dict[str, Any]]]:
+    """把文档拆分为前言和若干分片文件
+
+    前言为第一个拆分标题之前的内容（文档以一级标题开头时包括该标题下、下一个拆分标题之前的内容）；
+    相邻的小章节合并到同一分片，直到再加入一个章节会超过shard_size；单个章节超过shard_size时独占一个分片。
+    返回(前言, [{'heading', 'path', 'size'}])
+    """
+    preamble = ''
+    shards: List[Dict[str, Any]] = []
+    current: Optional[Dict[str, Any]] = None
+    output = None
+
+    try:
+        for position, (level, heading, section) in enumerate(split_sections(source.lines(), heading_level)):
+            text = ''.join(section)
+            # 开头的内容和位于文档开头的一级标题（文档标题）归入父页面
+            if heading is None or (level == 1 and position == 0):
+                preamble = text
+                continue
+
+            size = len(text.encode('utf-8'))
+            if current is None or current['size'] + size > shard_size:
+                if output:
+                    output.close()
+                path = os.path.join(directory, f"shard-{len(shards) + 1:04d}.md")
+                current = {'heading': heading, 'path': path, 'size': 0}
+                shards.append(current)
+                output = open(path, 'w', encoding='utf-8', newline='')
+            output.write(text)
+            current['size'] += size
+    finally:
+        if output:
+            output.close()
+
+    return preamble, shards
+
+
+# 只属于原页面的配置：拆分后只保留在父页面上，子页面不继承（否则每个子页面都会重复上传附件）
+PAGE_ONLY_KEYS = ('attachments', 'parent_page_id', 'parent_page_path')
+
+
+def shard_job(config: Dict[str, Any], directory: str) -> Optional[Dict[str, Any]]:
+    """内容文件超过content_shard_size时拆分为页面树节点（父页面为前言和目录，children为各分片），否则返回None
+
+    返回的节点只包含拆分产生的键（content_file、children），由调用方与原作业的配置合并
+    """
+    shard_size = int(config.get('content_shard_size') or 0)
+    if not config.get('content_file') or shard_size <= 0:
+        return None
+
+    source = open_content(config['content_file'])
+    if source.size <= shard_size:
+        return None
+
+    heading_level = int(config.get('content_shard_heading_level', DEFAULT_SHARD_HEADING_LEVEL))
+    preamble, shards = shard_document(source, shard_size, directory, heading_level)
+    if len(shards) < 2:
+        # 没有可拆分的标题，整篇发布
+        return None
+
+    titles: List[str] = []
+    seen: Dict[str, int] = {}
+    for shard in shards:
+        title = f"{config['page_title']} - {shard['heading']}"
+        # 同一空间内页面标题必须唯一
+        seen[title] = seen.get(title, 0) + 1
+        titles.append(title if seen[title] == 1 else f"{title} ({seen[title]})")
+
+    parent_file = os.path.join(directory, 'parent.md')
+    with open(parent_file, 'w', encoding='utf-8') as f:
+        f.write(preamble.rstrip('\n') + '\n\n' if preamble.strip() else '')
+        f.write('## 目录\n\n' + ''.join(f"- {title}\n" for title in titles))
+
+    return {
+        'content_file': parent_file,
+        # 清单defaults中的附件也不应由子页面继承，显式置空
+        'children': [{'page_title': title, 'content_file': shard['path'], 'attachments': []}
+                     for title, shard in zip(titles, shards)]
+    }
+
+
+def build_shard_tree(config: Dict[str, Any], directory: str) -> Optional[Dict[str, Any]]:
+    """单页面创建：内容文件需要拆分时返回页面树清单，否则返回None"""
+    node = shard_job(config, directory)
+    if node is None:
+        return None
+
+    defaults = {key: value for key, value in config.items()
+                if key not in ('content_file', 'content_shard_size', 'page_title', 'job_id') + PAGE_ONLY_KEYS}
+    # 批量执行默认跳过审核，这里保持单页面创建的审核行为
+    defaults['auto_confirm'] = bool(config.get('auto_confirm', False))
+    root = {key: config[key] for key in PAGE_ONLY_KEYS if key in config}
+    root.update(id=str(config.get('job_id') or 'main'), page_title=config['page_title'], **node)
+    return {'defaults': defaults, 'tree': [root]}
+
+
+def shard_manifest(manifest: Dict[str, Any], directory: str) -> Dict[str, Any]:
+    """批量清单：把内容文件需要拆分的作业（或页面树节点）展开为父页面和子页面
+
+    有作业被拆分时，作业清单转换为页面树清单（作业ID不变，执行日志照常恢复）；没有需要拆分的作业时原样返回
+    """
+    defaults = manifest.get('defaults', {}) or {}
+    expanded = False
+
+    def expand(nodes: List[Dict[str, Any]], prefix: str) -> List[Dict[str, Any]]:
+        nonlocal expanded
+        result = []
+        for position, node in enumerate(nodes, start=1):
+            node = dict(node or {})
+            # 与build_job_configs和flatten_tree的默认编号一致
+            node.setdefault('id', f"{prefix}{position}")
+            children = expand(node.get('children') or [], f"{node['id']}.")
+            shard_dir = os.path.join(directory, str(node['id']))
+            os.makedirs(shard_dir, exist_ok=True)
+            sharded = shard_job({**defaults, **node}, shard_dir)
+            if sharded:
+                expanded = True
+                node['content_file'] = sharded['content_file']
+                # 显式编号，避免与节点原有子页面的默认编号冲突
+                parts = [{**child, 'id': f"{node['id']}.part{i}"}
+                         for i, child in enumerate(sharded['children'], start=1)]
+                children = parts + children
+            if children:
+                node['children'] = children
+            result.append(node)
+        return result
+
+    if 'tree' in manifest:
+        tree = expand(manifest['tree'], '')
+        return {**manifest, 'tree': tree} if expanded else manifest
+
+    tree = expand(manifest['jobs'], '')
+    if not expanded:
+        return manifest
+    return {**{key: value for key, value in manifest.items() if key != 'jobs'}, 'tree': tree}
@@ -0,0 +1,394 @@
+#!/usr/bin/env python3
+"""
+常驻浏览器工作进程
+保持Playwright、浏览器和已登录的上下文常驻，通过Unix域套接字接收页面作业，
+每个作业只需承担页面本身的操作耗时
+
+协议：每个请求和响应都是一行JSON
+  {"op": "submit", "config": {...}}  -> {"ok": true, "result": {...}}
+  {"op": "health"}                    -> {"ok": true, "status": "ok", ...}
+  {"op": "stats"}                     -> {"ok": true, "queue_depth": 0, ...}
+  {"op": "shutdown"}                  -> {"ok": true}
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import sys
+import time
+import logging
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Any, Tuple
+
+import yaml
+
+
+DEFAULT_SOCKET_PATH = os.environ.get(
+    'CONFLUENCE_CREATOR_SOCKET',
+    str(Path.home() / '.cache' / 'confluence-page-creator' / 'daemon.sock')
+)
+DEFAULT_WORKERS = 4
+DEFAULT_MAX_QUEUE = 100
+# 无作业超过该时长（秒）后自动退出，0表示不自动退出
+DEFAULT_IDLE_TIMEOUT = 900
+# 配置中的文件和目录路径；常驻进程的工作目录与客户端不同，只接受绝对路径
+PATH_KEYS = ('content_file', 'template_dir', 'workflow', 'page_index_path', 'metadata_cache_path',
+             'selector_cache_path', 'session_cache_dir', 'trace_sink')
+
+
+def _config_paths(config: Dict[str, Any]) -> Iterator[Tuple[str, str, Any, Any]]:
+    """遍历配置中的路径：(名称, 路径, 所在字典或列表, 键或下标)，"-"（标准输入/输出）除外"""
+    for key in PATH_KEYS:
+        value = config.get(key)
+        if isinstance(value, str) and value and value != '-':
+            yield key, value, config, key
+    for index, item in enumerate(config.get('attachments') or []):
+        if isinstance(item, str) and item:
+            yield f'attachments[{index}]', item, config['attachments'], index
+        elif isinstance(item, dict) and isinstance(item.get('path'), str) and item['path']:
+            yield f'attachments[{index}]', item['path'], item, 'path'
+
+
+def resolve_config_paths(config: Dict[str, Any], base_dir: str) -> Dict[str, Any]:
+    """把配置中的相对路径转换为相对于base_dir（配置文件所在目录）的绝对路径，返回新配置"""
+    config = {**config}
+    if isinstance(config.get('attachments'), list):
+        config['attachments'] = [dict(item) if isinstance(item, dict) else item for item in config['attachments']]
+    for _, path, container, key in list(_config_paths(config)):
+        path = os.path.expanduser(path)
+        container[key] = path if os.path.isabs(path) else os.path.abspath(os.path.join(base_dir, path))
+    return config
+
+
+def relative_config_paths(config: Dict[str, Any]) -> List[str]:
+    """配置中的相对路径名称（常驻进程拒绝这类作业）"""
+    return [name for name, path, _, _ in _config_paths(config) if not os.path.isabs(os.path.expanduser(path))]
+
+
+class CreatorDaemon:
+    """常驻工作进程：共享浏览器，按confluence_url和username保留已登录的上下文"""
+
+    def __init__(self, socket_path: str = DEFAULT_SOCKET_PATH, workers: int = DEFAULT_WORKERS,
+                 idle_timeout: float = DEFAULT_IDLE_TIMEOUT, max_queue: int = DEFAULT_MAX_QUEUE):
+        self.socket_path = socket_path
+        self.workers = max(1, workers)
+        self.idle_timeout = idle_timeout
+        self.max_queue = max_queue
+
+        # 事件、锁和队列在serve()中创建：Python 3.8/3.9中它们绑定创建时的事件循环，而__init__可能在asyncio.run()之前调用
+        self.started: Optional[asyncio.Event] = None
+        self._stopping: Optional[asyncio.Event] = None
+        self._queue: Optional[asyncio.Queue] = None
+
+        self._playwright = None
+        # (浏览器类型, headless) -> 管理该浏览器及其上下文的ResourceManager
+        self._recyclers: Dict[Tuple[str, bool], Any] = {}
+        # (confluence_url, username) -> 持有已登录上下文的ConfluencePageCreator
+        self._sessions: Dict[Tuple[str, str], Any] = {}
+        self._api_clients: Dict[Tuple[str, str], Any] = {}
+        self._session_lock: Optional[asyncio.Lock] = None
+
+        self._started_at = time.monotonic()
+        self._last_activity = self._started_at
+        self._in_flight = 0
+        self._completed = 0
+        self._failed = 0
+
+        logging.basicConfig(
+            level=logging.INFO,
+            format='%(asctime)s - %(levelname)s - %(message)s'
+        )
+        self.logger = logging.getLogger(__name__)
+
+    async def serve(self):
+        """启动服务，直到收到shutdown请求或空闲超时"""
+        self.started = asyncio.Event()
+        self._stopping = asyncio.Event()
+        self._session_lock = asyncio.Lock()
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+
+        Path(self.socket_path).parent.mkdir(parents=True, exist_ok=True)
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        server = await asyncio.start_unix_server(self._handle_client, path=self.socket_path)
+        os.chmod(self.socket_path, 0o600)
+
+        tasks = [asyncio.ensure_future(self._worker()) for _ in range(self.workers)]
+        if self.idle_timeout:
+            tasks.append(asyncio.ensure_future(self._idle_watchdog()))
+
+        self.logger.info(f"常驻进程已启动: {self.socket_path}（工作协程: {self.workers}）")
+        self.started.set()
+
+        try:
+            await self._stopping.wait()
+        finally:
+            server.close()
+            await server.wait_closed()
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            await self._close_resources()
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+            self.logger.info("常驻进程已退出")
+
+    async def wait_started(self):
+        """等待服务就绪（可在serve()开始执行前调用）"""
+        while self.started is None:
+            await asyncio.sleep(0.01)
+        await self.started.wait()
+
+    def stop(self):
+        if self._stopping:
+            self._stopping.set()
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        return {
+            'queue_depth': self._queue.qsize() if self._queue else 0,
+            'in_flight': self._in_flight,
+            'jobs_completed': self._completed,
+            'jobs_failed': self._failed,
+            'sessions': len(self._sessions),
+            'browsers': len(self._recyclers),
+            'recycle': {'_'.join(map(str, key)): recycler.stats() for key, recycler in self._recyclers.items()},
+            'uptime': round(now - self._started_at, 3),
+            'idle_for': round(now - self._last_activity, 3) if not self._in_flight else 0.0
+        }
+
+    async def _handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """处理一个客户端连接（一行请求，一行响应）"""
+        try:
+            line = await reader.readline()
+            try:
+                request = json.loads(line)
+                response = await self._dispatch(request)
+            except Exception as e:
+                response = {'ok': False, 'error': str(e)}
+            writer.write(json.dumps(response, ensure_ascii=False).encode('utf-8') + b'\n')
+            await writer.drain()
+        finally:
+            writer.close()
+
+    async def _dispatch(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        op = request.get('op')
+
+        if op == 'submit':
+            future = asyncio.get_running_loop().create_future()
+            try:
+                self._queue.put_nowait((request.get('config') or {}, future))
+            except asyncio.QueueFull:
+                return {'ok': False, 'error': f'队列已满（{self.max_queue}）'}
+            self._last_activity = time.monotonic()
+            return {'ok': True, 'result': await future}
+
+        if op == 'health':
+            return {'ok': True, 'status': 'stopping' if self._stopping and self._stopping.is_set() else 'ok',
+                    **self.stats()}
+
+        if op == 'stats':
+            return {'ok': True, **self.stats()}
+
+        if op == 'shutdown':
+            self.stop()
+            return {'ok': True}
+
+        return {'ok': False, 'error': f'未知操作: {op}'}
+
+    async def _worker(self):
+        while True:
+            config, future = await self._queue.get()
+            self._in_flight += 1
+            try:
+                result = await self._run_job(config)
+            except Exception as e:
+                result = {'success': False, 'page_url': '', 'page_id': '', 'message': f'执行失败: {e}'}
+            finally:
+                self._in_flight -= 1
+                self._last_activity = time.monotonic()
+                self._queue.task_done()
+
+            if result['success']:
+                self._completed += 1
+            else:
+                self._failed += 1
+            if not future.done():
+                future.set_result(result)
+
+    async def _idle_watchdog(self):
+        """空闲超时后自动退出"""
+        interval = min(self.idle_timeout, 1.0)
+        while True:
+            await asyncio.sleep(interval)
+            idle = time.monotonic() - self._last_activity
+            if self._queue.empty() and not self._in_flight and idle >= self.idle_timeout:
+                self.logger.info(f"空闲 {idle:.0f}s，自动退出")
+                self.stop()
+                return
+
+    async def _run_job(self, config: Dict[str, Any]) -> Dict[str, Any]:
+        """在常驻会话中执行一个作业"""
+        from .main import ConfluencePageCreator
+
+        # 相对路径会按常驻进程的工作目录解析，读到错误的文件；submit客户端已按配置文件目录转换
+        relative = relative_config_paths(config)
+        if relative:
+            return {'success': False, 'page_url': '', 'page_id': '',
+                    'message': f"配置无效: 常驻进程只接受绝对路径: {', '.join(relative)}"}
+
+        # 常驻进程没有终端，不做交互确认
+        config = {**config, 'auto_confirm': True}
+        try:
+            creator = ConfluencePageCreator(config)
+        except ValueError as e:
+            return {'success': False, 'page_url': '', 'page_id': '', 'message': f'配置无效: {e}'}
+
+        if creator.backend.name == 'api':
+            creator.attach_api_client(self._api_client(config))
+            return await creator.execute()
+
+        session, recycler, key = await self._session(config)
+        # 每个作业使用新页面；上下文或浏览器被回收后，新作业的页面来自替换的上下文
+        page = await recycler.checkout(key)
+        try:
+            creator.attach_session(recycler.browser_of(page), recycler.context_of(page), page,
+                                   selector_resolver=session.selector_resolver,
+                                   request_filter=session.request_filter)
+            return await creator.execute()
+        finally:
+            await recycler.checkin(page, keep=False)
+
+    def _api_client(self, config: Dict[str, Any]):
+        from .confluence_api import ConfluenceRestClient
+
+        key = (config['confluence_url'].rstrip('/'), config['username'])
+        if key not in self._api_clients:
+            self._api_clients[key] = ConfluenceRestClient.from_config(config, pool_size=self.workers)
+        return self._api_clients[key]
+
+    async def _session(self, config: Dict[str, Any]):
+        """获取已登录的会话及管理其上下文的ResourceManager，首次使用时创建并登录"""
+        from .main import ConfluencePageCreator, launch_browser
+        from .recycling import RecyclePolicy, ResourceManager
+
+        key = (config['confluence_url'].rstrip('/'), config['username'])
+        browser_key = (config.get('browser', 'chromium'), config.get('headless', True))
+        async with self._session_lock:
+            session = self._sessions.get(key)
+            if session is not None:
+                return session, self._recyclers[browser_key], key
+
+            if self._playwright is None:
+                from playwright.async_api import async_playwright
+                self._playwright = await async_playwright().start()
+
+            recycler = self._recyclers.get(browser_key)
+            if recycler is None:
+                # 回收策略以该浏览器的首个会话配置为准
+                playwright = self._playwright
+                recycler = self._recyclers[browser_key] = ResourceManager(
+                    RecyclePolicy.from_config(config), launch=lambda: launch_browser(playwright, config))
+
+            session = ConfluencePageCreator({**config, 'job_id': 'session'})
+            session.browser = await recycler.current_browser()
+            await session.open_context()
+            # 导航一次以完成登录（或恢复缓存的登录态），之后作业各自打开页面
+            await session.navigate_to_parent_page()
+            await session.page.close()
+            recycler.adopt(key, session.browser, session.context, session.create_context,
+                           page_timeout=config.get('timeout', 30000))
+
+            self._sessions[key] = session
+            self.logger.info(f"已建立常驻会话: {key[0]} ({key[1]})")
+            return session, recycler, key
+
+    async def _close_resources(self):
+        for recycler in self._recyclers.values():
+            await recycler.close()
+        if self._playwright:
+            await self._playwright.stop()
+        for client in self._api_clients.values():
+            client.close()
+        self._sessions.clear()
+        self._recyclers.clear()
+        self._api_clients.clear()
+
+
+def send_request(request: Dict[str, Any], socket_path: str = DEFAULT_SOCKET_PATH,
+                 timeout: Optional[float] = None) -> Dict[str, Any]:
+    """向常驻进程发送一个请求并等待响应（同步，不依赖Playwright）"""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(socket_path)
+        sock.sendall(json.dumps(request, ensure_ascii=False).encode('utf-8') + b'\n')
+
+        chunks = []
+        while True:
+            chunk = sock.recv(65536)
+            if not chunk:
+                break
+            chunks.append(chunk)
+            if chunk.endswith(b'\n'):
+                break
+
+    return json.loads(b''.join(chunks))
+
+
+def main() -> int:
+    """命令行入口：serve启动常驻进程，其余子命令为瘦客户端"""
+    parser = argparse.ArgumentParser(description='Confluence页面创建器常驻进程')
+    parser.add_argument('--socket', default=DEFAULT_SOCKET_PATH, help='Unix域套接字路径')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    serve_parser = subparsers.add_parser('serve', help='启动常驻进程')
+    serve_parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS, help='并发作业数')
+    serve_parser.add_argument('--max-queue', type=int, default=DEFAULT_MAX_QUEUE, help='最大排队作业数')
+    serve_parser.add_argument('--idle-timeout', type=float, default=DEFAULT_IDLE_TIMEOUT,
+                              help='空闲多少秒后自动退出（0为不退出）')
+
+    submit_parser = subparsers.add_parser('submit', help='提交YAML配置并等待结果')
+    submit_parser.add_argument('config_file')
+
+    subparsers.add_parser('health', help='健康检查')
+    subparsers.add_parser('stats', help='队列与会话统计')
+    subparsers.add_parser('stop', help='停止常驻进程')
+
+    args = parser.parse_args()
+
+    if args.command == 'serve':
+        daemon = CreatorDaemon(args.socket, args.workers, args.idle_timeout, args.max_queue)
+        asyncio.run(daemon.serve())
+        return 0
+
+    try:
+        if args.command == 'submit':
+            with open(args.config_file, 'r', encoding='utf-8') as f:
+                config = yaml.safe_load(f)
+            if isinstance(config, dict):
+                config = resolve_config_paths(config, os.path.dirname(os.path.abspath(args.config_file)))
+            response = send_request({'op': 'submit', 'config': config}, args.socket)
+        else:
+            op = 'shutdown' if args.command == 'stop' else args.command
+            response = send_request({'op': op}, args.socket, timeout=10)
+    except (OSError, ValueError) as e:
+        print(f"无法连接常驻进程: {e}")
+        return 1
+
+    if not response.get('ok'):
+        print(f"❌ {response.get('error')}")
+        return 1
+
+    if args.command == 'submit':
+        result = response['result']
+        print(json.dumps(result, ensure_ascii=False, indent=2))
+        return 0 if result['success'] else 1
+
+    print(json.dumps(response, ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+执行日志
+以JSON Lines追加记录已完成的工作流步骤（及其可恢复的结果）、已审核的内容和已完成的作业，每条记录落盘后才继续，
+中断后以 --resume 重新运行时跳过已完成的作业，未完成的作业从第一个未完成的步骤继续。
+写入和fsync在后台线程中进行，同时到达的记录合并为一次fsync，不阻塞事件循环
+"""
+
+import concurrent.futures
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Any, Tuple
+
+
+DEFAULT_JOURNAL_DIR = Path.home() / '.cache' / 'confluence-page-creator' / 'journals'
+
+
+def journal_path_for(source_file: str) -> Path:
+    """配置或清单文件对应的默认日志路径（按文件绝对路径区分）"""
+    source = Path(source_file).resolve()
+    digest = hashlib.sha256(str(source).encode('utf-8')).hexdigest()[:10]
+    return DEFAULT_JOURNAL_DIR / f"{source.stem}-{digest}.jsonl"
+
+
+class JobState:
+    """从日志恢复的单个作业状态"""
+
+    def __init__(self):
+        # 已完成的工作流步骤 -> 步骤结果（无需恢复结果的步骤为None）
+        self.steps: Dict[str, Optional[Dict[str, Any]]] = {}
+        self.content: Optional[Dict[str, Any]] = None
+        self.approved: Optional[bool] = None
+        self.result: Optional[Dict[str, Any]] = None
+
+
+class RunJournal:
+    """追加写入的执行日志，resume为False时清空旧日志开始新的运行"""
+
+    def __init__(self, path: str, resume: bool = False):
+        self.path = Path(path).expanduser()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.jobs: Dict[str, JobState] = {}
+        self._pending: List[Tuple[str, concurrent.futures.Future]] = []
+        self._cond = threading.Condition()
+        self._closed = False
+
+        if resume:
+            self._replay()
+        self._file = open(self.path, 'a' if resume else 'w', encoding='utf-8')
+        self._writer = threading.Thread(target=self._write_loop, name='journal-writer', daemon=True)
+        self._writer.start()
+
+    def _replay(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                lines = f.readlines()
+        except FileNotFoundError:
+            return
+
+        for line in lines:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # 中断时可能留下写了一半的最后一行
+                continue
+            state = self.job(record['job_id'])
+            event = record['event']
+            if event == 'step':
+                state.steps[record['step']] = record.get('state')
+            elif event == 'content':
+                state.content = record['content']
+                state.approved = record['approved']
+            elif event == 'job':
+                state.result = record['result']
+
+    def _write(self, record: Dict[str, Any]) -> concurrent.futures.Future:
+        """排队写入一条记录，返回落盘（fsync完成）后结束的Future"""
+        record['ts'] = round(time.time(), 3)
+        line = json.dumps(record, ensure_ascii=False) + '\n'
+        future: concurrent.futures.Future = concurrent.futures.Future()
+        with self._cond:
+            if self._closed:
+                raise ValueError(f"执行日志已关闭: {self.path}")
+            self._pending.append((line, future))
+            self._cond.notify()
+        return future
+
+    def _write_loop(self):
+        """后台写入线程：每次取出排队的全部记录，一次写入并只调用一次fsync"""
+        while True:
+            with self._cond:
+                while not self._pending and not self._closed:
+                    self._cond.wait()
+                batch, self._pending = self._pending, []
+            if not batch:
+                return
+            try:
+                self._file.write(''.join(line for line, _ in batch))
+                self._file.flush()
+                os.fsync(self._file.fileno())
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+            else:
+                for _, future in batch:
+                    future.set_result(None)
+
+    def job(self, job_id: str) -> JobState:
+        return self.jobs.setdefault(str(job_id), JobState())
+
+    def completed_result(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """已完成作业的结果，未完成时返回None"""
+        state = self.jobs.get(str(job_id))
+        return state.result if state else None
+
+    def step_done(self, job_id: str, step: str, state: Optional[Dict[str, Any]] = None) -> concurrent.futures.Future:
+        self.job(job_id).steps[step] = state
+        return self._write({'event': 'step', 'job_id': str(job_id), 'step': step, 'state': state})
+
+    def content_reviewed(self, job_id: str, content: Dict[str, Any], approved: bool) -> concurrent.futures.Future:
+        state = self.job(job_id)
+        state.content = content
+        state.approved = approved
+        return self._write({'event': 'content', 'job_id': str(job_id), 'content': content, 'approved': approved})
+
+    def copy_job(self, job_id: str, state: JobState):
+        """把其他日志中未完成作业的步骤和审核内容写入本日志（分片恢复时使用）"""
+        for step, step_state in state.steps.items():
+            self.step_done(job_id, step, step_state)
+        if state.content is not None:
+            self.content_reviewed(job_id, state.content, state.approved)
+
+    def job_done(self, job_id: str, result: Dict[str, Any]) -> concurrent.futures.Future:
+        self.job(job_id).result = result
+        return self._write({'event': 'job', 'job_id': str(job_id), 'result': result})
+
+    def close(self):
+        """等待排队的记录全部落盘后关闭日志文件"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._writer.join()
+        self._file.close()
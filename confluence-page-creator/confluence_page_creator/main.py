@@ -0,0 +1,1273 @@
+#!/usr/bin/env python3
+"""
+Confluence页面创建自动化技能
+使用Playwright自动化在Confluence平台创建文档页面
+"""
+
+import asyncio
+import concurrent.futures
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+import json
+import logging
+from contextlib import asynccontextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Any, TYPE_CHECKING
+
+import yaml
+
+from .backends import BACKENDS, create_backend
+from .storage_format import markdown_to_storage
+from .template_registry import get_registry
+from .selector_engine import SelectorResolver
+from .request_filter import RequestFilter
+from .page_index import get_index, page_key, content_hash
+from .page_metadata import PageMetadataCache, get_metadata_cache, split_title_path
+from .page_metadata import DEFAULT_TTL as DEFAULT_METADATA_TTL
+from .section_diff import VOLATILE_MARKER
+from .tracing import Tracer, traced_step
+from .retry import RetryPolicy, is_transient
+from .workflow import get_workflow
+from .attachments import AttachmentUploader, parse_attachments
+from .attachments import DEFAULT_CONCURRENCY as DEFAULT_ATTACHMENT_CONCURRENCY
+from .traffic import THROTTLE_STATUS_CODES, ThrottledError, TrafficController, get_controller
+from .traffic import parse_retry_after, throttled
+from .recycling import RecyclePolicy
+from .content_source import STDIN, build_shard_tree, open_content, preview_lines
+
+# Playwright只在真正启动浏览器时导入，渲染和校验配置不承担其导入开销
+if TYPE_CHECKING:
+    from playwright.async_api import Browser, BrowserContext, Page
+
+
+# 登录表单和"已登录"标志，用于竞速判断当前登录状态
+LOGIN_FORM_SELECTOR = '#username'
+LOGGED_IN_SELECTORS = [
+    '[data-testid="app-navigation-profile"]',
+    '[data-testid="app-navigation-create"]',
+    'button[aria-label="Create"]',
+    '[data-testid="create-button"]',
+    '#create-page-button'
+]
+
+# 各步骤的候选选择器（并发竞速，见selector_engine）
+CREATE_BUTTON_SELECTORS = [
+    'button[aria-label="Create"]',
+    'button[data-testid="create-page-button"]',
+    '[data-testid="create-button"]',
+    'a[href*="/create"]',
+    '#create-page-button'
+]
+TITLE_INPUT_SELECTORS = [
+    'input[aria-label="Title"]',
+    'input[data-testid="title-input"]',
+    'input[name="title"]',
+    '#title-field'
+]
+CONTENT_EDITOR_SELECTORS = [
+    'div[contenteditable="true"]',
+    '.ProseMirror',
+    '[data-testid="editor-content"]',
+    '.editor-content'
+]
+PUBLISH_BUTTON_SELECTORS = [
+    'button[aria-label="Publish"]',
+    'button[data-testid="publish-button"]',
+    'button[type="submit"]',
+    '#publish-button',
+    '.publish-button'
+]
+
+# 各就绪等待的默认超时（毫秒），可通过wait_timeouts逐项覆盖
+DEFAULT_WAIT_TIMEOUTS = {
+    'navigation': 30000,
+    'login': 30000,
+    'editor': 20000,
+    'publish': 30000
+}
+
+# 发布成功后页面地址变为 /pages/<id>
+PUBLISHED_URL_RE = re.compile(r'/pages/(\d+)')
+# 发布请求（REST v1/v2）：只匹配页面资源本身，不包括标签、属性等子资源
+PUBLISH_REQUEST_RE = re.compile(r'/(rest/api/content|api/v2/pages)(/\d+)?/?(\?|$)')
+
+# 每次渲染都会变化的模板变量，计算内容哈希和比较章节时替换为占位符，避免重复运行被视为内容变化
+VOLATILE_TEMPLATE_VARS = ['current_time']
+
+# 审核预览显示的行数
+PREVIEW_LINES = 20
+
+# 恢复运行时可以直接跳过的步骤：结果已写入执行日志，由_restore_step还原（发布后重新执行check_unchanged会误判为未变化）
+RESTORABLE_ACTIONS = {'ensure_content', 'resolve_parent', 'check_unchanged', 'confirm_content',
+                      'publish_page', 'upload_attachments'}
+
+# 内容填写方式：paste为一次性合成粘贴HTML，insert为单次插入纯文本，type为逐键输入
+CONTENT_INPUT_MODES = ['paste', 'insert', 'type']
+
+# 在编辑器上派发合成粘贴事件，编辑器处理粘贴时会调用preventDefault
+PASTE_CONTENT_SCRIPT = """(el, data) => {
+    const transfer = new DataTransfer();
+    transfer.setData('text/html', data.html);
+    transfer.setData('text/plain', data.text);
+    el.focus();
+    const event = new ClipboardEvent('paste', {clipboardData: transfer, bubbles: true, cancelable: true});
+    return !el.dispatchEvent(event);
+}"""
+
+
+async def launch_browser(playwright, config: Dict[str, Any]) -> 'Browser':
+    """按配置启动浏览器"""
+    # 选择浏览器类型
+    browser_type = getattr(playwright, config.get('browser', 'chromium'))
+    return await browser_type.launch(
+        headless=config.get('headless', True),
+        args=['--no-sandbox', '--disable-setuid-sandbox']
+    )
+
+
+def is_publish_response(response) -> bool:
+    """判断响应是否为页面发布请求的响应；草稿自动保存（status=draft）不算发布"""
+    request = response.request
+    if request.method not in ('POST', 'PUT') or PUBLISH_REQUEST_RE.search(response.url) is None:
+        return False
+    if 'status=draft' in response.url:
+        return False
+    try:
+        body = json.loads(request.post_data or '{}')
+    except ValueError:
+        return True
+    return not (isinstance(body, dict) and body.get('status') == 'draft')
+
+
+_stdin_buffer = b''
+_pending_input: Optional[concurrent.futures.Future] = None
+_pending_input_lock = threading.Lock()
+
+
+def read_terminal_line() -> str:
+    """从标准输入的文件描述符读取一行，不经过sys.stdin（读取线程阻塞时不持有其缓冲区锁，进程可以正常退出）"""
+    global _stdin_buffer
+    while b'\n' not in _stdin_buffer:
+        chunk = os.read(0, 4096)
+        if not chunk:
+            if not _stdin_buffer:
+                raise EOFError
+            break
+        _stdin_buffer += chunk
+    line, _, _stdin_buffer = _stdin_buffer.partition(b'\n')
+    return line.decode('utf-8', 'replace').rstrip('\r')
+
+
+async def read_input(prompt: str = '') -> str:
+    """在守护线程中读取一行终端输入
+
+    不使用默认线程池：审核被取消时阻塞在读取上的线程会使asyncio.run()退出时一直等待。
+    取消等待不会丢失输入，尚未取走的一行留给下一次读取
+    """
+    global _pending_input
+    print(prompt, end='', flush=True)
+    with _pending_input_lock:
+        if _pending_input is None:
+            pending = _pending_input = concurrent.futures.Future()
+
+            def read():
+                pending.set_running_or_notify_cancel()
+                try:
+                    pending.set_result(read_terminal_line())
+                except BaseException as e:
+                    pending.set_exception(e)
+
+            threading.Thread(target=read, name='terminal-input', daemon=True).start()
+        pending = _pending_input
+
+    line = await asyncio.shield(asyncio.wrap_future(pending))
+    with _pending_input_lock:
+        if _pending_input is pending:
+            _pending_input = None
+    return line
+
+
+def load_config(config_file: str) -> Dict[str, Any]:
+    """读取YAML配置文件"""
+    if not os.path.exists(config_file):
+        raise ValueError(f"配置文件不存在: {config_file}")
+
+    with open(config_file, 'r', encoding='utf-8') as f:
+        try:
+            config = yaml.safe_load(f)
+        except yaml.YAMLError as e:
+            raise ValueError(f"配置文件解析失败: {e}")
+
+    if not isinstance(config, dict):
+        raise ValueError(f"配置文件格式错误: {config_file}")
+    return config
+
+
+def validate_config(config: Dict[str, Any]):
+    """验证配置参数，不创建浏览器、网络连接等任何资源"""
+    required_fields = ['confluence_url', 'space_key', 'username', 'api_token', 'page_title']
+    for field in required_fields:
+        if not config.get(field):
+            raise ValueError(f"缺少必需参数: {field}")
+
+    template_type = config.get('page_template', 'meeting-notes')
+    registry = get_registry(config.get('template_dir'))
+    if template_type not in registry:
+        raise ValueError(f"未知的页面模板: {template_type}，可选: {', '.join(registry.names())}")
+
+    backend = config.get('backend', 'ui')
+    if backend not in BACKENDS:
+        raise ValueError(f"不支持的后端: {backend}，可选: {', '.join(BACKENDS)}")
+
+    if config.get('update_existing') and backend != 'api':
+        raise ValueError("增量更新（update_existing）需要使用 backend: api")
+
+    input_mode = config.get('content_input_mode', 'auto')
+    if input_mode != 'auto' and input_mode not in CONTENT_INPUT_MODES:
+        raise ValueError(f"不支持的内容填写方式: {input_mode}")
+
+    # 校验请求过滤规则集与URL正则
+    RequestFilter.from_config(config)
+
+    # 校验工作流定义（步骤依赖、循环依赖）
+    get_workflow(config.get('workflow'))
+
+    # 校验附件配置（文件存在、名称不重复）
+    parse_attachments(config)
+
+    # 校验流量控制参数
+    TrafficController.from_config(config)
+
+    # 校验浏览器资源回收参数
+    RecyclePolicy.from_config(config)
+
+    # 校验父页面标题路径
+    if config.get('parent_page_path'):
+        split_title_path(str(config['parent_page_path']))
+
+    # 校验内容文件（标准输入不能同时用于交互审核）
+    content_file = config.get('content_file')
+    if content_file == STDIN and not config.get('auto_confirm'):
+        raise ValueError("从标准输入读取内容时需要设置 auto_confirm: true（或使用 --yes）")
+    if content_file and content_file != STDIN and not os.path.isfile(os.path.expanduser(str(content_file))):
+        raise ValueError(f"内容文件不存在: {content_file}")
+    if int(config.get('content_shard_size') or 0) < 0:
+        raise ValueError("content_shard_size不能为负数")
+
+
+def render_page(config: Dict[str, Any]) -> Dict[str, Any]:
+    """按模板渲染页面，只需要page_title、page_template、template_dir、template_vars和tags；
+    设置content_file时直接使用文件（或标准输入）中的Markdown，不使用模板
+    """
+    if not config.get('page_title'):
+        raise ValueError("缺少必需参数: page_title")
+
+    if config.get('content_file'):
+        page_title = config['page_title']
+        content = open_content(str(config['content_file'])).read()
+        tags = list(config.get('tags', []))
+        return {
+            'title': page_title,
+            'content': content,
+            'tags': tags,
+            'stable_content': content,
+            'content_hash': content_hash(page_title, content, tags)
+        }
+
+    template_type = config.get('page_template', 'meeting-notes')
+    page_title = config['page_title']
+    current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    template_vars = config.get('template_vars', {})
+
+    # 从模板注册表渲染内容，模板只编译一次
+    variables = {
+        'page_title': page_title,
+        'current_time': current_time,
+        **template_vars
+    }
+    registry = get_registry(config.get('template_dir'))
+    content = registry.render(template_type, variables)
+
+    # 生成标签（复制一份，避免修改共享配置中的列表）
+    tags = list(config.get('tags', []))
+    if template_type not in tags:
+        tags.append(template_type)
+
+    # 易变变量替换为占位符后再渲染一次计算哈希（模板已编译，开销可忽略）
+    stable_variables = dict(variables)
+    for name in VOLATILE_TEMPLATE_VARS:
+        if name not in template_vars:
+            stable_variables[name] = VOLATILE_MARKER
+    stable_content = registry.render(template_type, stable_variables)
+
+    return {
+        'title': page_title,
+        'content': content,
+        'tags': tags,
+        'stable_content': stable_content,
+        'content_hash': content_hash(page_title, stable_content, tags)
+    }
+
+
+class ConfluencePageCreator:
+    """Confluence页面创建自动化类"""
+
+    def __init__(self, config: Dict[str, Any]):
+        self.config = config
+        self.playwright = None
+        self.browser: Optional['Browser'] = None
+        self.context: Optional['BrowserContext'] = None
+        self.page: Optional['Page'] = None
+        self.generated_content: Dict[str, str] = {}
+        # 是否复用外部共享的浏览器会话（批量模式），共享会话不由本实例关闭
+        self._shared_session = False
+        # REST API客户端（API后端使用，可由批量执行器共享）
+        self.api_client = None
+        # 登录态缓存，以及本次会话是否由缓存恢复
+        self.session_cache = None
+        self._session_restored = False
+        # 本次内容填写使用的方式和耗时
+        self.content_insertion: Dict[str, Any] = {}
+        # 各类就绪等待累计耗时（秒），用于区分等待与实际操作时间
+        self.wait_time: Dict[str, float] = {}
+        # 发布响应中解析出的页面ID（早于URL变化到达时使用）
+        self.published_page_id = ''
+        # 生成内容的哈希（不含时间戳等易变变量），用于判断页面是否需要重新发布
+        self.content_hash = ''
+        # 易变变量渲染为占位符的内容，增量更新时用于章节比较
+        self.stable_content = ''
+        # 页面索引中上次发布的记录，以及增量更新的章节比较结果
+        self.previous_publish: Optional[Dict[str, Any]] = None
+        self.update_report: Dict[str, Any] = {}
+        # 审核结果（None表示尚未审核），批量模式下可在占用页面之前提前审核
+        self.approved: Optional[bool] = None
+        # 执行日志（用于中断后恢复）及本作业在日志中的标识
+        self.journal = None
+        self.journal_key = str(config.get('job_id') or 'main')
+        # 界面模式是否已点击发布按钮（点击后出错不再重试，避免重复创建）
+        self._publish_clicked = False
+        # 发布结果（publish_page步骤设置）及附件上传报告
+        self.published: Dict[str, Any] = {}
+        self.attachment_report: Dict[str, Any] = {}
+        # 按标题路径解析父页面的结果（路径、页面ID、是否命中元数据缓存）
+        self.parent_lookup: Dict[str, Any] = {}
+
+        # 设置日志
+        logging.basicConfig(
+            level=logging.INFO,
+            format='%(asctime)s - %(levelname)s - %(message)s'
+        )
+        self.logger = logging.getLogger(__name__)
+
+        # 验证必需参数
+        self._validate_config()
+
+        # 页面发布后端（ui: Playwright界面操作，api: REST API）
+        self.backend = create_backend(self)
+
+        # 步骤与等待的计时追踪（配置trace_sink时输出JSON Lines）
+        self.tracer = Tracer.from_config(self.config)
+
+        # 选择器竞速解析器（批量模式下共享以汇总命中统计）
+        self.selector_resolver = SelectorResolver.from_config(self.config)
+
+        # 浏览器请求过滤（拦截图片、字体、分析埋点等，批量模式下随上下文共享）
+        self.request_filter = RequestFilter.from_config(self.config)
+
+        # 瞬时故障的重试策略（指数退避加随机抖动）
+        self.retry_policy = RetryPolicy.from_config(self.config)
+
+        # 工作流步骤依赖图（默认读取skill.yaml的workflow）
+        self.workflow = get_workflow(self.config.get('workflow'))
+
+        # 站点共享的流量控制（限速、Retry-After、自适应并发），traffic: false时为None
+        self.traffic = get_controller(self.config)
+
+    def _validate_config(self):
+        """验证配置参数"""
+        validate_config(self.config)
+
+    def attach_session(self, browser: 'Browser', context: 'BrowserContext', page: 'Page',
+                       selector_resolver: Optional[SelectorResolver] = None,
+                       request_filter: Optional[RequestFilter] = None):
+        """挂载已初始化并登录的共享浏览器会话，跳过浏览器启动"""
+        self.browser = browser
+        self.context = context
+        self.page = page
+        self._shared_session = True
+        if selector_resolver:
+            self.selector_resolver = selector_resolver
+        # 请求过滤已安装在共享上下文上，执行结果只统计本作业页面的请求
+        self.request_filter = request_filter
+
+    async def _resolve_selector(self, step: str, selectors: List[str]):
+        """并发竞速候选选择器，返回最先出现的元素"""
+        async with self._waiting(f'selector:{step}'):
+            return await self.selector_resolver.resolve(
+                self.page, step, selectors, timeout=self.config.get('selector_timeout', 15000)
+            )
+
+    def _wait_timeout(self, name: str) -> int:
+        """获取指定就绪等待的超时时间（毫秒）"""
+        return self.config.get('wait_timeouts', {}).get(name, DEFAULT_WAIT_TIMEOUTS[name])
+
+    @asynccontextmanager
+    async def _waiting(self, name: str):
+        """统计就绪等待耗时，并记录为wait类型的span"""
+        started = time.monotonic()
+        try:
+            async with self.tracer.span(name, kind='wait'):
+                yield
+        finally:
+            self.wait_time[name] = self.wait_time.get(name, 0.0) + time.monotonic() - started
+
+    def attach_api_client(self, api_client):
+        """挂载共享的REST API客户端，复用其连接池"""
+        self.api_client = api_client
+
+    def attach_journal(self, journal):
+        """挂载执行日志：记录完成的工作流步骤、审核的内容和作业结果，并恢复上次运行中已审核的内容"""
+        self.journal = journal
+
+        state = journal.job(self.journal_key)
+        if state.content and state.result is None:
+            self.logger.info("从执行日志恢复已审核的内容")
+            self.generated_content = {
+                'title': state.content['title'],
+                'content': state.content['content'],
+                'tags': state.content['tags']
+            }
+            self.stable_content = state.content['stable_content']
+            self.content_hash = state.content['content_hash']
+            self.approved = state.approved
+
+    def _step_state(self, action: str) -> Optional[Dict[str, Any]]:
+        """步骤完成时写入执行日志的结果，恢复运行时由_restore_step还原"""
+        if action == 'ensure_content':
+            return {**self.generated_content, 'stable_content': self.stable_content, 'content_hash': self.content_hash}
+        if action == 'resolve_parent':
+            return {'parent_page_id': self.config.get('parent_page_id'), 'parent_lookup': self.parent_lookup}
+        if action == 'check_unchanged':
+            return {'previous_publish': self.previous_publish}
+        if action == 'confirm_content':
+            return {'approved': self.approved}
+        if action == 'publish_page':
+            return {'published': self.published}
+        if action == 'upload_attachments':
+            return {'attachments': self.attachment_report}
+        return None
+
+    def _restore_step(self, action: str, state: Optional[Dict[str, Any]]):
+        state = state or {}
+        if action == 'ensure_content' and state:
+            self.generated_content = {'title': state['title'], 'content': state['content'], 'tags': state['tags']}
+            self.stable_content = state['stable_content']
+            self.content_hash = state['content_hash']
+        elif action == 'resolve_parent' and state.get('parent_page_id'):
+            self.config['parent_page_id'] = state['parent_page_id']
+            self.parent_lookup = state.get('parent_lookup') or {}
+        elif action == 'check_unchanged':
+            self.previous_publish = state.get('previous_publish')
+        elif action == 'confirm_content' and 'approved' in state:
+            self.approved = state['approved']
+        elif action == 'publish_page':
+            self.published = state.get('published') or {}
+        elif action == 'upload_attachments':
+            self.attachment_report = state.get('attachments') or {}
+
+    def _resume_steps(self) -> set:
+        """上次运行中已完成、本次可以跳过的工作流步骤，并还原这些步骤的结果"""
+        if not self.journal:
+            return set()
+        completed = self.journal.job(self.journal_key).steps
+        if not completed:
+            return set()
+        skip = self.workflow.resumable(completed, lambda step: step.action in RESTORABLE_ACTIONS)
+        for step in self.workflow.order:
+            if step.name in skip and step.action in RESTORABLE_ACTIONS:
+                self._restore_step(step.action, completed[step.name])
+        if skip:
+            self.logger.info(f"从执行日志恢复，跳过已完成的步骤: {', '.join(s.name for s in self.workflow.order if s.name in skip)}")
+        return skip
+
+    async def _journal_step(self, step):
+        """工作流步骤完成后落盘，后续步骤在记录写入后才开始"""
+        await asyncio.wrap_future(self.journal.step_done(self.journal_key, step.name, self._step_state(step.action)))
+
+    async def _with_retry(self, stage: str, func):
+        """按重试策略执行后端阶段"""
+        def should_retry(error: BaseException) -> bool:
+            # 界面模式已点击发布后不再重试，避免重复创建页面；发布请求被限流时页面未创建，仍可重试
+            if isinstance(error, ThrottledError):
+                return True
+            return is_transient(error) and not self._publish_clicked
+
+        def on_retry(attempt: int, error: BaseException, delay: float):
+            self.logger.warning(f"{stage} 遇到瞬时错误，{delay:.1f}s后第{attempt}次重试: {error}")
+
+        return await self.retry_policy.run(func, should_retry, on_retry)
+
+    @traced_step('initialize')
+    async def setup_browser_and_auth(self):
+        """初始化浏览器和认证"""
+        self.logger.info("正在初始化浏览器...")
+
+        from playwright.async_api import async_playwright
+
+        # 重试时复用已启动的部分
+        if self.playwright is None:
+            self.playwright = await async_playwright().start()
+        if self.browser is None:
+            self.browser = await launch_browser(self.playwright, self.config)
+        if self.context is None:
+            await self.open_context()
+
+        self.logger.info("浏览器初始化完成")
+
+    async def open_context(self):
+        """在已启动的浏览器中创建上下文（恢复缓存的登录态）和页面"""
+        # 读取缓存的登录态
+        storage_state = None
+        if self.config.get('session_cache', True):
+            from .session_cache import SessionCache
+            self.session_cache = SessionCache.from_config(self.config)
+            storage_state = self.session_cache.load()
+            self._session_restored = storage_state is not None
+            if self._session_restored:
+                self.logger.info("已加载缓存的登录态")
+
+        self.context = await self.create_context(self.browser, storage_state)
+        self.page = await self.context.new_page()
+
+        # 设置页面超时
+        self.page.set_default_timeout(self.config.get('timeout', 30000))
+
+    async def create_context(self, browser: 'Browser', storage_state: Optional[Dict[str, Any]] = None) -> 'BrowserContext':
+        """创建浏览器上下文并安装请求过滤；回收上下文时以旧上下文的登录态创建替换的上下文"""
+        context = await browser.new_context(
+            viewport={'width': 1280, 'height': 800},
+            user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
+            storage_state=storage_state
+        )
+        if self.request_filter:
+            await self.request_filter.install(context)
+        return context
+
+    @traced_step('navigate_to_parent')
+    async def navigate_to_parent_page(self):
+        """导航到父页面"""
+        confluence_url = self.config['confluence_url'].rstrip('/')
+        space_key = self.config['space_key']
+
+        if self.config.get('parent_page_id'):
+            # 导航到特定父页面
+            target_url = f"{confluence_url}/pages/{self.config['parent_page_id']}"
+            self.logger.info(f"导航到父页面: {target_url}")
+        else:
+            # 导航到空间主页
+            target_url = f"{confluence_url}/spaces/{space_key}/overview"
+            self.logger.info(f"导航到空间主页: {target_url}")
+
+        # 只等待DOM就绪，后台分析和在线状态轮询不影响后续步骤
+        await self._goto(target_url)
+
+        # 检查是否需要登录（登录表单或已登录标志出现即视为页面就绪）
+        async with self._waiting('login_detect'):
+            need_login = await self._need_login()
+        if need_login:
+            if self._session_restored:
+                self.logger.info("缓存的登录态已过期，重新登录")
+                self.session_cache.invalidate()
+                self._session_restored = False
+            await self._login_once(target_url)
+
+    async def _login_once(self, target_url: str):
+        """登录；启用登录态缓存时跨进程加锁，等待期间其他进程已登录则直接复用其登录态"""
+        if not self.session_cache:
+            await self._login()
+            return
+
+        async with self.session_cache.login_lock():
+            storage_state = self.session_cache.load()
+            if storage_state:
+                await self.context.add_cookies(storage_state.get('cookies', []))
+                await self._goto(target_url)
+                async with self._waiting('login_detect'):
+                    need_login = await self._need_login()
+                if not need_login:
+                    self.logger.info("已复用其他进程缓存的登录态")
+                    return
+            await self._login()
+
+    async def _goto(self, target_url: str):
+        """经流量控制导航到目标页面，被限流时抛出可重试的ThrottledError"""
+        async with throttled(self.traffic) as outcome:
+            async with self._waiting('navigation'):
+                response = await self.page.goto(target_url, wait_until='domcontentloaded',
+                                                timeout=self._wait_timeout('navigation'))
+            if response is not None:
+                outcome['status'] = response.status
+                outcome['retry_after'] = parse_retry_after(response.headers.get('retry-after'))
+
+        if response is not None and response.status in THROTTLE_STATUS_CODES:
+            raise ThrottledError(response.status, outcome['retry_after'])
+
+    @asynccontextmanager
+    async def _throttled_navigation(self):
+        """点击触发的页面跳转经流量控制：占用令牌和并发槽位，记录主文档响应的状态码，
+        跳转被限流时抛出可重试的ThrottledError（等待就绪超时也以限流为准）
+        """
+        responses = []
+
+        def on_response(response):
+            if response.request.is_navigation_request() and response.frame == self.page.main_frame:
+                responses.append(response)
+
+        self.page.on('response', on_response)
+        try:
+            async with throttled(self.traffic) as outcome:
+                try:
+                    yield
+                finally:
+                    if responses:
+                        outcome['status'] = responses[-1].status
+                        outcome['retry_after'] = parse_retry_after(responses[-1].headers.get('retry-after'))
+        except Exception as e:
+            if responses and responses[-1].status in THROTTLE_STATUS_CODES:
+                raise ThrottledError(responses[-1].status, outcome['retry_after']) from e
+            raise
+        finally:
+            self.page.remove_listener('response', on_response)
+
+        if responses and responses[-1].status in THROTTLE_STATUS_CODES:
+            raise ThrottledError(responses[-1].status, outcome['retry_after'])
+
+    async def _need_login(self) -> bool:
+        """检查是否需要登录：登录表单与已登录标志竞速，先出现者决定结果"""
+        race_selector = ', '.join([LOGIN_FORM_SELECTOR] + LOGGED_IN_SELECTORS)
+        try:
+            element = await self.page.wait_for_selector(
+                race_selector,
+                state='attached',
+                timeout=self.config.get('login_detect_timeout', 5000)
+            )
+        except Exception:
+            # 超时视为未登录；不能捕获CancelledError，审核被拒绝后取消后端准备时需要立即停止
+            return False
+
+        return await element.evaluate('(el, selector) => el.matches(selector)', LOGIN_FORM_SELECTOR)
+
+    async def _login(self):
+        """执行登录"""
+        self.logger.info("正在执行登录...")
+
+        # 输入用户名
+        await self.page.fill('#username', self.config['username'])
+        async with self._throttled_navigation():
+            await self.page.click('#login-submit')
+
+            # 等待密码输入框
+            async with self._waiting('login'):
+                await self.page.wait_for_selector('#password', timeout=self._wait_timeout('login'))
+        await self.page.fill('#password', self.config['api_token'])
+        async with self._throttled_navigation():
+            await self.page.click('#login-submit')
+
+            # 等待已登录标志出现
+            async with self._waiting('login'):
+                await self.page.wait_for_selector(
+                    ', '.join(LOGGED_IN_SELECTORS),
+                    state='attached',
+                    timeout=self._wait_timeout('login')
+                )
+        self.logger.info("登录完成")
+
+        # 保存登录态，后续运行无需重新登录
+        if self.session_cache:
+            self.session_cache.save(await self.context.storage_state())
+            self.logger.info("登录态已缓存")
+
+    @traced_step('create_page')
+    async def click_create_button(self):
+        """点击创建按钮"""
+        self.logger.info("正在查找创建按钮...")
+
+        # 查找创建按钮（可能有多种选择器）
+        create_button = await self._resolve_selector('create_button', CREATE_BUTTON_SELECTORS)
+        if not create_button:
+            raise Exception("无法找到创建按钮")
+
+        async with self._throttled_navigation():
+            await create_button.click()
+            self.logger.info("已点击创建按钮")
+
+            # 等待编辑器挂载
+            async with self._waiting('editor'):
+                await self.page.wait_for_selector(
+                    ', '.join(CONTENT_EDITOR_SELECTORS),
+                    timeout=self._wait_timeout('editor')
+                )
+
+    @traced_step('generate_content')
+    async def generate_page_content(self) -> Dict[str, str]:
+        """生成页面内容"""
+        self.logger.info("正在生成页面内容...")
+
+        page = render_page(self.config)
+        self.stable_content = page['stable_content']
+        self.content_hash = page['content_hash']
+        self.generated_content = {
+            'title': page['title'],
+            'content': page['content'],
+            'tags': page['tags']
+        }
+
+        self.logger.info("页面内容生成完成")
+        return self.generated_content
+
+    def _print_preview(self):
+        """打印内容预览：只拆分显示的前几行，其余行只计数"""
+        print("\n" + "="*60)
+        print("📋 生成的内容预览")
+        print("="*60)
+        print(f"\n📝 标题: {self.generated_content['title']}")
+        print(f"\n🏷️  标签: {', '.join(self.generated_content['tags'])}")
+        print(f"\n📄 内容预览:")
+        print("-" * 40)
+
+        lines, remaining = preview_lines(self.generated_content['content'], PREVIEW_LINES)
+        for i, line in enumerate(lines):
+            print(f"{i+1:2d}: {line}")
+
+        if remaining:
+            print(f"... (还有 {remaining} 行)")
+
+        print("-" * 40)
+
+    @traced_step('user_review')
+    async def user_confirmation_step(self) -> bool:
+        """用户确认和审核步骤"""
+        self._print_preview()
+
+        # 用户确认
+        while True:
+            print("\n" + "="*60)
+            response = (await self._ainput("❓ 是否确认使用此内容？(y/n/e): ")).strip().lower()
+
+            if response == 'y' or response == 'yes':
+                print("✅ 用户确认，继续执行...")
+                return True
+            elif response == 'n' or response == 'no':
+                print("❌ 用户取消，停止执行...")
+                return False
+            elif response == 'e' or response == 'edit':
+                print("📝 编辑模式:")
+                new_content = await self._ainput("请输入新的内容 (支持多行，输入 'END' 结束):\n")
+                lines = []
+                while True:
+                    line = await self._ainput()
+                    if line.strip() == 'END':
+                        break
+                    lines.append(line)
+
+                if lines:
+                    self.generated_content['content'] = '\n'.join(lines)
+                    self.stable_content = self.generated_content['content']
+                    # 编辑后的内容重新计算哈希，页面索引和内容未变化判断使用新内容
+                    self.content_hash = content_hash(self.generated_content['title'], self.stable_content,
+                                                     self.generated_content['tags'])
+                    print("✅ 内容已更新，重新预览:")
+                    self._print_preview()
+                    continue
+                else:
+                    print("⚠️  未输入有效内容，保持原内容")
+                    continue
+            else:
+                print("⚠️  无效输入，请输入 y(确认)、n(取消) 或 e(编辑)")
+
+    async def _ainput(self, prompt: str = '') -> str:
+        """读取一行终端输入，等待用户时事件循环继续执行浏览器准备等任务"""
+        return await read_input(prompt)
+
+    async def review(self) -> bool:
+        """审核生成的内容（auto_confirm时直接通过），结果记录在approved中"""
+        if self.config.get('auto_confirm'):
+            self.approved = True
+        else:
+            self.approved = await self.user_confirmation_step()
+        return self.approved
+
+    def _page_index(self):
+        if not self.config.get('page_index', True):
+            return None
+        return get_index(self.config.get('page_index_path'))
+
+    def _metadata_cache(self) -> Optional[PageMetadataCache]:
+        if not self.config.get('metadata_cache', True):
+            return None
+        return get_metadata_cache(self.config.get('metadata_cache_path'))
+
+    def find_unchanged(self) -> Optional[Dict[str, Any]]:
+        """查询页面索引，内容与上次发布相同时返回上次的发布记录"""
+        index = self._page_index()
+        self.previous_publish = index.lookup(page_key(self.config)) if index else None
+        if self.previous_publish and self.previous_publish['content_hash'] == self.content_hash:
+            return self.previous_publish
+        return None
+
+    @traced_step('fill_content')
+    async def fill_page_content(self):
+        """填写页面内容"""
+        self.logger.info("正在填写页面内容...")
+
+        # 等待标题输入框加载
+        title_input = await self._resolve_selector('title_input', TITLE_INPUT_SELECTORS)
+        if not title_input:
+            raise Exception("无法找到标题输入框")
+
+        # 输入标题
+        await title_input.fill(self.generated_content['title'])
+
+        # 查找内容编辑器（Confluence使用富文本编辑器，挂载后即可写入）
+        content_editor = await self._resolve_selector('content_editor', CONTENT_EDITOR_SELECTORS)
+        if not content_editor:
+            raise Exception("无法找到内容编辑器")
+
+        await self._insert_content(content_editor)
+
+        self.logger.info(
+            f"页面内容填写完成（方式: {self.content_insertion['mode']}，"
+            f"耗时: {self.content_insertion['duration']}s）"
+        )
+
+    async def _insert_content(self, content_editor):
+        """一次性写入整篇内容，失败时依次回退到单次插入文本和逐键输入"""
+        input_mode = self.config.get('content_input_mode', 'auto')
+        modes = CONTENT_INPUT_MODES if input_mode == 'auto' else [input_mode]
+        content = self.generated_content['content']
+        started = time.monotonic()
+        fallbacks = []
+
+        for mode in modes:
+            # 清空现有内容（选中后由新内容替换）
+            await content_editor.click()
+            await self.page.keyboard.press('Control+a')
+
+            try:
+                if mode == 'paste':
+                    handled = await content_editor.evaluate(
+                        PASTE_CONTENT_SCRIPT,
+                        {'html': markdown_to_storage(content, code_macros=False), 'text': content}
+                    )
+                    inserted = handled and await self._editor_has_content(content_editor)
+                elif mode == 'insert':
+                    await self.page.keyboard.insert_text(content)
+                    inserted = await self._editor_has_content(content_editor)
+                else:
+                    await self.page.keyboard.type(content)
+                    inserted = True
+            except Exception as e:
+                self.logger.warning(f"内容填写方式 {mode} 失败: {e}")
+                inserted = False
+
+            if inserted:
+                self.content_insertion = {
+                    'mode': mode,
+                    'duration': round(time.monotonic() - started, 3),
+                    'fallbacks': fallbacks
+                }
+                return
+
+            fallbacks.append(mode)
+
+        raise Exception("无法填写页面内容")
+
+    async def _editor_has_content(self, content_editor) -> bool:
+        """检查编辑器中是否已有文本"""
+        return await content_editor.evaluate('el => el.innerText.trim().length > 0')
+
+    @traced_step('save_page')
+    async def save_and_publish(self):
+        """保存并发布页面"""
+        self.logger.info("正在保存页面...")
+
+        # 查找保存/发布按钮
+        save_button = await self._resolve_selector('publish_button', PUBLISH_BUTTON_SELECTORS)
+        if not save_button:
+            raise Exception("无法找到发布按钮")
+
+        # 发布响应到达或地址变为 /pages/<id>，任一信号出现即视为保存完成
+        timeout = self._wait_timeout('publish')
+        editor_url = self.page.url
+        url_changed = asyncio.ensure_future(self.page.wait_for_url(
+            lambda url: url != editor_url and PUBLISHED_URL_RE.search(url) is not None,
+            wait_until='commit',
+            timeout=timeout
+        ))
+        publish_response = asyncio.ensure_future(self.page.wait_for_event(
+            'response', predicate=is_publish_response, timeout=timeout
+        ))
+
+        async with throttled(self.traffic) as outcome:
+            self._publish_clicked = True
+            await save_button.click()
+
+            async with self._waiting('publish'):
+                signal = await self._first_ready([url_changed, publish_response])
+            if signal is publish_response:
+                response = publish_response.result()
+                outcome['status'] = response.status
+                outcome['retry_after'] = parse_retry_after(response.headers.get('retry-after'))
+
+        if signal is publish_response:
+            # 被限流的发布请求未创建页面，可以重新打开编辑器重试
+            if response.status in THROTTLE_STATUS_CODES:
+                raise ThrottledError(response.status, outcome['retry_after'])
+            await self._read_published_page_id(response)
+
+        self.logger.info("页面保存完成")
+
+    async def _first_ready(self, tasks: List[asyncio.Future]) -> asyncio.Future:
+        """返回第一个成功完成的等待任务，其余任务取消；全部失败时抛出最后一个错误"""
+        pending = set(tasks)
+        error: Optional[BaseException] = None
+
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task
+                    error = task.exception()
+        finally:
+            for task in pending:
+                task.cancel()
+
+        raise Exception(f"等待发布完成超时: {error}")
+
+    async def _read_published_page_id(self, response):
+        """从发布响应中解析页面ID；发布被拒绝或响应中没有页面ID时抛出异常"""
+        if not response.ok:
+            raise Exception(f"发布失败: HTTP {response.status}")
+        try:
+            data = await response.json()
+        except Exception as e:
+            raise Exception(f"无法解析发布响应: {e}")
+        page_id = str(data.get('id') or '')
+        if not page_id:
+            raise Exception("发布响应中没有页面ID")
+        self.published_page_id = page_id
+
+    # 以下为skill.yaml中workflow引用的步骤动作，返回False时停止工作流
+
+    async def ensure_content(self):
+        """生成页面内容（批量模式下已提前生成并审核时跳过）"""
+        if not self.generated_content:
+            await self.generate_page_content()
+
+    async def resolve_parent(self):
+        """按标题路径（parent_page_path）解析父页面ID，优先使用本地元数据缓存，已指定parent_page_id时跳过"""
+        path = self.config.get('parent_page_path')
+        if not path or self.config.get('parent_page_id'):
+            return
+
+        from .confluence_api import ConfluenceRestClient
+
+        confluence_url = self.config['confluence_url'].rstrip('/')
+        # 关闭元数据缓存时使用仅本次有效的内存缓存
+        cache = self._metadata_cache() or PageMetadataCache(':memory:')
+        client = self.api_client or ConfluenceRestClient.from_config(self.config)
+        loop = asyncio.get_running_loop()
+        try:
+            page_id, cached = await loop.run_in_executor(
+                None, cache.resolve_path, client, confluence_url, self.config['space_key'], str(path),
+                float(self.config.get('metadata_ttl', DEFAULT_METADATA_TTL))
+            )
+        finally:
+            if client is not self.api_client:
+                client.close()
+
+        self.config['parent_page_id'] = page_id
+        self.parent_lookup = {'path': str(path), 'page_id': page_id, 'cached': cached}
+        self.logger.info(f"父页面 {path} -> {page_id}" + ("（元数据缓存）" if cached else ""))
+
+    async def check_unchanged(self) -> bool:
+        """内容与上次发布相同时停止工作流"""
+        previous = self.find_unchanged()
+        if previous:
+            self.logger.info(f"页面内容未变化，跳过发布: {previous['page_id']}")
+            return False
+        return True
+
+    async def prepare_backend(self):
+        """后端准备：启动浏览器、登录、打开编辑器（API后端创建客户端）"""
+        # 自定义工作流未包含resolve_parent步骤时在此解析父页面
+        await self.resolve_parent()
+        await self._with_retry('prepare', self.backend.prepare)
+
+    async def confirm_content(self) -> bool:
+        """审核内容（已提前审核时直接使用审核结果），用户取消时停止工作流"""
+        confirmed = self.approved if self.approved is not None else await self.review()
+
+        if self.journal and not self.journal.job(self.journal_key).content:
+            await asyncio.wrap_future(self.journal.content_reviewed(self.journal_key, {
+                **self.generated_content,
+                'stable_content': self.stable_content,
+                'content_hash': self.content_hash
+            }, confirmed))
+        return confirmed
+
+    async def publish_page(self):
+        """发布页面并记录到页面索引和元数据缓存"""
+        confluence_url = self.config['confluence_url'].rstrip('/')
+        metadata = self._metadata_cache()
+        try:
+            self.published = await self._with_retry('publish', self.backend.publish)
+        except Exception:
+            if metadata and self.parent_lookup.get('cached'):
+                # 缓存的父页面可能已被删除或移动，清除该空间的缓存，下次运行重新查询
+                metadata.invalidate(confluence_url, self.config['space_key'])
+            raise
+
+        index = self._page_index()
+        if index and self.published['page_id']:
+            index.record(page_key(self.config), self.content_hash, self.published['page_id'],
+                         self.published['page_url'], self.published.get('version', 1))
+        if metadata and self.published['page_id']:
+            # 新发布的页面可直接作为后续作业的父页面路径
+            metadata.record_pages(confluence_url, self.config['space_key'], [(
+                self.published['page_id'], self.generated_content['title'],
+                str(self.config.get('parent_page_id') or '')
+            )])
+
+    async def upload_attachments(self):
+        """通过REST API流式上传附件（任意后端均可），校验和未变化的附件跳过"""
+        attachments = parse_attachments(self.config)
+        if not attachments:
+            return
+        if not self.published.get('page_id'):
+            self.logger.warning("未获取到页面ID，跳过附件上传")
+            return
+
+        from .confluence_api import ConfluenceRestClient
+
+        client = self.api_client or ConfluenceRestClient.from_config(self.config)
+        try:
+            uploader = AttachmentUploader(
+                client, self.published['page_id'],
+                concurrency=int(self.config.get('attachment_concurrency', DEFAULT_ATTACHMENT_CONCURRENCY)),
+                retry_policy=self.retry_policy,
+                logger=self.logger
+            )
+            self.attachment_report = await uploader.upload_all(attachments)
+        finally:
+            if client is not self.api_client:
+                client.close()
+
+        report = self.attachment_report
+        self.logger.info(f"附件上传完成: 上传 {report['uploaded']}，未变化 {report['unchanged']}，"
+                         f"失败 {report['failed']} ({report['throughput_mb_s']} MB/s)")
+
+    async def close_backend(self):
+        """释放后端资源"""
+        await self.backend.close()
+
+    @traced_step('cleanup')
+    async def cleanup_resources(self):
+        """清理资源"""
+        if self._shared_session:
+            # 共享会话由批量执行器统一关闭
+            return
+
+        self.logger.info("正在清理资源...")
+
+        if self.context:
+            await self.context.close()
+        if self.browser:
+            await self.browser.close()
+        if self.playwright:
+            await self.playwright.stop()
+
+        self.logger.info("资源清理完成")
+
+    async def execute(self) -> Dict[str, Any]:
+        """执行完整的页面创建流程；挂载执行日志时，上次运行中已完成的作业直接返回记录的结果"""
+        if self.journal:
+            finished = self.journal.completed_result(self.journal_key)
+            if finished:
+                self.logger.info("作业已在上次运行中完成，跳过")
+                return {**finished, 'resumed': True}
+
+        result = await self._run_workflow()
+
+        # 成功或被用户取消的作业视为已完成，失败的作业在恢复运行时重新执行
+        if self.journal and (result['success'] or self.approved is False):
+            await asyncio.wrap_future(self.journal.job_done(self.journal_key, result))
+        return result
+
+    async def _run_workflow(self) -> Dict[str, Any]:
+        result = {
+            'success': False,
+            'page_url': '',
+            'page_id': '',
+            'message': '',
+            'skipped': False,
+            'resumed': False,
+            'update': {},
+            'selector_cache': {},
+            'content_insertion': {},
+            'request_filter': {},
+            'timing': {},
+            'steps': {},
+            'workflow': {},
+            'attachments': {},
+            'traffic': {},
+            'parent_lookup': {}
+        }
+        started = time.monotonic()
+        # 共享会话的页面会被多个作业复用，记录作业开始时该页面的拦截统计以便只报告本作业的增量
+        filter_mark = self.request_filter.stats(self.page) if self.request_filter and self.page else None
+
+        try:
+            # 按skill.yaml中的依赖图执行：后端准备与用户审核并行，依赖全部完成后发布
+            # 挂载执行日志时记录每个完成的步骤，恢复运行从第一个未完成的步骤继续
+            report = await self.workflow.run(self, skip=self._resume_steps(),
+                                             on_step_done=self._journal_step if self.journal else None)
+            result['workflow'] = report.to_dict()
+
+            if self.approved is False:
+                result['message'] = '用户取消操作'
+            elif self.published:
+                result['page_url'] = self.published['page_url']
+                result['page_id'] = self.published['page_id']
+                result['success'] = True
+                result['message'] = {
+                    'updated': '页面更新成功',
+                    'unchanged': '页面内容未变化，未修改'
+                }.get(self.published.get('action'), '页面创建成功')
+                if self.attachment_report.get('failed'):
+                    result['message'] += f"（{self.attachment_report['failed']} 个附件上传失败）"
+            elif report.stopped_by and self.previous_publish and \
+                    self.previous_publish['content_hash'] == self.content_hash:
+                result['page_url'] = self.previous_publish['page_url']
+                result['page_id'] = self.previous_publish['page_id']
+                result['skipped'] = True
+                result['success'] = True
+                result['message'] = '页面内容未变化，已跳过'
+            else:
+                result['message'] = f"工作流在步骤 {report.stopped_by} 停止" if report.stopped_by else '页面未发布'
+
+        except Exception as e:
+            self.logger.error(f"执行过程中发生错误: {str(e)}")
+            result['message'] = f'执行失败: {str(e)}'
+
+        result['selector_cache'] = self.selector_resolver.stats()
+        result['content_insertion'] = self.content_insertion
+        result['update'] = self.update_report
+        result['attachments'] = self.attachment_report
+        result['parent_lookup'] = self.parent_lookup
+        if self.traffic:
+            result['traffic'] = self.traffic.stats()
+        if self.request_filter and self.backend.name == 'ui' and self.page:
+            result['request_filter'] = self.request_filter.stats(self.page, since=filter_mark)
+        result['timing'] = self._timing_report(time.monotonic() - started)
+        result['steps'] = self.tracer.step_latency()
+        return result
+
+    def _timing_report(self, total: float) -> Dict[str, Any]:
+        """汇总等待时间与实际操作时间"""
+        wait = sum(self.wait_time.values())
+        return {
+            'total': round(total, 3),
+            'wait': round(wait, 3),
+            'work': round(max(total - wait, 0.0), 3),
+            'waits': {name: round(seconds, 3) for name, seconds in self.wait_time.items()}
+        }
+
+
+async def main():
+    """主函数"""
+    if len(sys.argv) < 2:
+        print("用法: python -m confluence_page_creator.main <config_file.yaml>")
+        print("      python -m confluence_page_creator.main --batch <manifest.yaml>")
+        sys.exit(1)
+
+    if sys.argv[1] == '--batch':
+        if len(sys.argv) < 3:
+            print("用法: python -m confluence_page_creator.main --batch <manifest.yaml>")
+            sys.exit(1)
+        from .batch import run_batch
+        return await run_batch(sys.argv[2])
+
+    try:
+        config = load_config(sys.argv[1])
+    except Exception as e:
+        print(f"读取配置文件失败: {e}")
+        sys.exit(1)
+
+    return await run_single(config)
+
+
+async def run_single(config: Dict[str, Any], journal=None) -> int:
+    """创建单个页面并打印结果，返回退出码；挂载执行日志时可中断后恢复
+
+    内容文件超过content_shard_size时在标题处拆分，按页面树创建父页面和子页面
+    """
+    validate_config(config)
+    with tempfile.TemporaryDirectory(prefix='confluence-shards-') as shard_dir:
+        manifest = build_shard_tree(config, shard_dir)
+        if manifest:
+            from .batch import print_summary
+            from .tree import TreeRunner
+
+            print(f"✂️  内容超过 {config['content_shard_size']} 字节，拆分为 1 个父页面和 "
+                  f"{len(manifest['tree'][0]['children'])} 个子页面")
+            summary = await TreeRunner(manifest, journal=journal).run()
+            print_summary(summary)
+            return 0 if summary['success'] else 1
+
+    # 创建并执行技能
+    creator = ConfluencePageCreator(config)
+    if journal:
+        creator.attach_journal(journal)
+    result = await creator.execute()
+
+    print("\n" + "="*60)
+    print("🎉 执行结果")
+    print("="*60)
+    print(f"✅ 成功: {result['success']}")
+    print(f"📝 消息: {result['message']}")
+
+    if result['skipped']:
+        print("⏭️  页面内容与上次发布相同，未做任何修改")
+    if result.get('resumed'):
+        print("♻️  作业已在上次运行中完成，未重复执行")
+    if result.get('attachments'):
+        attachments = result['attachments']
+        print(f"📎 附件: 上传 {attachments['uploaded']}，未变化 {attachments['unchanged']}，"
+              f"失败 {attachments['failed']} ({attachments['throughput_mb_s']} MB/s)")
+    if result.get('traffic', {}).get('throttled'):
+        traffic = result['traffic']
+        print(f"🚦 服务端限流 {traffic['throttled']} 次，当前并发上限 {traffic['concurrency_limit']}")
+    if result.get('workflow', {}).get('critical_path'):
+        workflow = result['workflow']
+        print(f"🧭 关键路径: {' → '.join(workflow['critical_path'])} ({workflow['critical_path_latency']}s)")
+
+    if result['success']:
+        print(f"🔗 页面URL: {result['page_url']}")
+        if result['page_id']:
+            print(f"🆔 页面ID: {result['page_id']}")
+
+    print("="*60)
+
+    return 0 if result['success'] else 1
+
+
+if __name__ == "__main__":
+    exit_code = asyncio.run(main())
+    sys.exit(exit_code)
\ No newline at end of file
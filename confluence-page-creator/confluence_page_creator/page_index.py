@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+已发布页面索引
+本地SQLite索引，按(confluence_url, space_key, parent_id, title)记录上次发布内容的哈希、页面ID和版本，
+内容未变化的页面可在启动浏览器或发起网络请求之前直接跳过
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Any, Tuple
+
+
+DEFAULT_INDEX_PATH = Path.home() / '.cache' / 'confluence-page-creator' / 'pages.db'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    confluence_url TEXT NOT NULL,
+    space_key TEXT NOT NULL,
+    parent_id TEXT NOT NULL,
+    title TEXT NOT NULL,
+    content_hash TEXT NOT NULL,
+    page_id TEXT NOT NULL,
+    page_url TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (confluence_url, space_key, parent_id, title)
+)
+"""
+
+
+def content_hash(title: str, content: str, tags: List[str]) -> str:
+    """页面内容哈希（标题、正文、标签）"""
+    payload = json.dumps([title, content, sorted(tags)], ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def page_key(config: Dict[str, Any]) -> Tuple[str, str, str, str]:
+    """索引键：站点、空间、父页面（空表示空间主页）、标题"""
+    return (
+        config['confluence_url'].rstrip('/'),
+        config['space_key'],
+        str(config.get('parent_page_id') or ''),
+        config['page_title']
+    )
+
+
+class PageIndex:
+    """线程安全的SQLite页面索引（WAL模式，多进程可同时读写）"""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = Path(path or DEFAULT_INDEX_PATH).expanduser()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._conn:
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute(SCHEMA)
+
+    def lookup(self, key: Tuple[str, str, str, str]) -> Optional[Dict[str, Any]]:
+        """查询上次发布的记录，不存在时返回None"""
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT content_hash, page_id, page_url, version, updated_at FROM pages '
+                'WHERE confluence_url = ? AND space_key = ? AND parent_id = ? AND title = ?',
+                key
+            ).fetchone()
+        return dict(row) if row else None
+
+    def record(self, key: Tuple[str, str, str, str], content_hash: str,
+               page_id: str, page_url: str, version: int = 1):
+        """记录（或覆盖）一次成功发布"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO pages '
+                '(confluence_url, space_key, parent_id, title, content_hash, page_id, page_url, version, updated_at) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (*key, content_hash, page_id, page_url, version, time.time())
+            )
+
+    def remove(self, key: Tuple[str, str, str, str]):
+        """删除记录（页面已在Confluence中删除时使用）"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                'DELETE FROM pages WHERE confluence_url = ? AND space_key = ? AND parent_id = ? AND title = ?',
+                key
+            )
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_indexes: Dict[str, PageIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_index(path: Optional[str] = None) -> PageIndex:
+    """获取共享的页面索引，同一文件在进程内只打开一次"""
+    resolved = str(Path(path or DEFAULT_INDEX_PATH).expanduser())
+    with _indexes_lock:
+        index = _indexes.get(resolved)
+        if index is None:
+            index = _indexes[resolved] = PageIndex(resolved)
+        return index
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+空间页面元数据缓存
+本地SQLite缓存 站点 → 空间 → 页面标题树 → 页面ID，用于按标题路径（如 Engineering/Releases/2026）定位父页面。
+缓存未命中或过期时通过一次REST查询取得页面及其全部祖先并写入缓存，同一空间的后续作业无需任何网络请求
+"""
+
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Any, Tuple
+
+
+DEFAULT_METADATA_PATH = Path.home() / '.cache' / 'confluence-page-creator' / 'metadata.db'
+DEFAULT_TTL = 3600
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS page_tree (
+    confluence_url TEXT NOT NULL,
+    space_key TEXT NOT NULL,
+    page_id TEXT NOT NULL,
+    title TEXT NOT NULL,
+    parent_id TEXT NOT NULL,
+    fetched_at REAL NOT NULL,
+    PRIMARY KEY (confluence_url, space_key, page_id)
+)
+"""
+
+TITLE_INDEX = "CREATE INDEX IF NOT EXISTS page_tree_title ON page_tree (confluence_url, space_key, title)"
+
+
+def split_title_path(path: str) -> List[str]:
+    """拆分标题路径，标题中的 / 写作 \\/"""
+    segments = [segment.strip().replace('\\/', '/') for segment in re.split(r'(?<!\\)/', path)]
+    segments = [segment for segment in segments if segment]
+    if not segments:
+        raise ValueError(f"父页面路径为空: {path!r}")
+    return segments
+
+
+class PageMetadataCache:
+    """线程安全的SQLite页面元数据缓存（WAL模式，多进程可同时读写）
+
+    Confluence同一空间内页面标题唯一，按标题即可定位页面，再沿parent_id校验路径上的祖先
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = Path(path or DEFAULT_METADATA_PATH).expanduser()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        # 同一路径的并发解析只查询一次
+        self._resolve_locks: Dict[Tuple[str, str, str], threading.Lock] = {}
+        self._conn = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._conn:
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute(SCHEMA)
+            self._conn.execute(TITLE_INDEX)
+        self.hits = 0
+        self.misses = 0
+
+    def record_pages(self, confluence_url: str, space_key: str, pages: List[Tuple[str, str, str]]):
+        """记录页面 (page_id, title, parent_id)，parent_id为空表示空间顶层页面"""
+        now = time.time()
+        with self._lock, self._conn:
+            # 页面改名后旧标题不再对应该页面
+            self._conn.executemany(
+                'DELETE FROM page_tree WHERE confluence_url = ? AND space_key = ? AND title = ? AND page_id != ?',
+                [(confluence_url, space_key, title, page_id) for page_id, title, _ in pages]
+            )
+            self._conn.executemany(
+                'INSERT OR REPLACE INTO page_tree (confluence_url, space_key, page_id, title, parent_id, fetched_at) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                [(confluence_url, space_key, page_id, title, parent_id or '', now) for page_id, title, parent_id in pages]
+            )
+
+    def _fresh(self, confluence_url: str, space_key: str, column: str, value: str,
+               ttl: float) -> Optional[sqlite3.Row]:
+        with self._lock:
+            return self._conn.execute(
+                f'SELECT page_id, title, parent_id FROM page_tree '
+                f'WHERE confluence_url = ? AND space_key = ? AND {column} = ? AND fetched_at >= ?',
+                (confluence_url, space_key, value, time.time() - ttl)
+            ).fetchone()
+
+    def lookup_path(self, confluence_url: str, space_key: str, segments: List[str],
+                    ttl: float = DEFAULT_TTL) -> Optional[str]:
+        """从缓存解析标题路径，路径上任一页面缺失、过期或祖先不符时返回None"""
+        row = self._fresh(confluence_url, space_key, 'title', segments[-1], ttl)
+        if row is None:
+            return None
+        page_id = row['page_id']
+        for title in reversed(segments[:-1]):
+            if not row['parent_id']:
+                return None
+            row = self._fresh(confluence_url, space_key, 'page_id', row['parent_id'], ttl)
+            if row is None or row['title'] != title:
+                return None
+        return page_id
+
+    def resolve_path(self, client, confluence_url: str, space_key: str, path: str,
+                     ttl: float = DEFAULT_TTL) -> Tuple[str, bool]:
+        """解析标题路径为页面ID，返回(页面ID, 是否命中缓存)；在线程中调用，未命中时同步查询REST API"""
+        segments = split_title_path(path)
+        key = (confluence_url, space_key, '/'.join(segments))
+        with self._lock:
+            resolve_lock = self._resolve_locks.setdefault(key, threading.Lock())
+
+        with resolve_lock:
+            page_id = self.lookup_path(confluence_url, space_key, segments, ttl)
+            if page_id:
+                self.hits += 1
+                return page_id, True
+
+            self.misses += 1
+            page = client.find_page(space_key, segments[-1], expand='ancestors')
+            if page is None:
+                raise Exception(f"父页面不存在: {space_key}/{path}")
+
+            ancestors = page.get('ancestors', [])
+            chain = [(item['id'], item.get('title', ''), ancestors[i - 1]['id'] if i else '')
+                     for i, item in enumerate(ancestors)]
+            chain.append((page['id'], page['title'], ancestors[-1]['id'] if ancestors else ''))
+            self.record_pages(confluence_url, space_key, chain)
+
+            titles = [title for _, title, _ in chain]
+            if titles[-len(segments):] != segments:
+                raise Exception(f"父页面路径不匹配: {path}，实际为 {'/'.join(titles)}")
+            return str(page['id']), False
+
+    def invalidate(self, confluence_url: str, space_key: Optional[str] = None):
+        """清除站点（或站点中一个空间）的缓存"""
+        with self._lock, self._conn:
+            if space_key is None:
+                self._conn.execute('DELETE FROM page_tree WHERE confluence_url = ?', (confluence_url,))
+            else:
+                self._conn.execute('DELETE FROM page_tree WHERE confluence_url = ? AND space_key = ?',
+                                   (confluence_url, space_key))
+
+    def stats(self) -> Dict[str, Any]:
+        return {'hits': self.hits, 'misses': self.misses}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_caches: Dict[str, PageMetadataCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_metadata_cache(path: Optional[str] = None) -> PageMetadataCache:
+    """获取共享的元数据缓存，同一文件在进程内只打开一次"""
+    resolved = str(Path(path or DEFAULT_METADATA_PATH).expanduser())
+    with _caches_lock:
+        cache = _caches.get(resolved)
+        if cache is None:
+            cache = _caches[resolved] = PageMetadataCache(resolved)
+        return cache
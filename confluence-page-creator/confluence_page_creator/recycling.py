@@ -0,0 +1,392 @@
+#!/usr/bin/env python3
+"""
+浏览器资源回收
+Confluence单页应用在编辑器会话之间会泄漏内存，长时间运行时浏览器上下文和渲染进程持续增长。
+资源管理器统计每个页面、上下文和浏览器服务的作业数，并读取驱动进程和浏览器各进程的RSS：
+超过作业数上限或内存预算时按代回收——新作业改用新的页面/上下文/浏览器（沿用原上下文的登录态），
+旧资源等其上进行中的作业全部归还后再关闭，不中断任何作业
+"""
+
+import asyncio
+import os
+import time
+import logging
+from collections import deque
+from typing import Awaitable, Callable, Dict, List, Optional, Any, Hashable
+
+DEFAULT_SETTINGS = {
+    'max_jobs_per_page': 50,        # 页面服务的作业数上限，超过后换新页面
+    'max_jobs_per_context': 200,    # 上下文服务的作业数上限，超过后换新上下文
+    'max_jobs_per_browser': 1000,   # 浏览器服务的作业数上限，超过后重启浏览器
+    'max_memory_mb': None,          # 驱动和浏览器进程的总RSS预算（MB），None表示不检查内存
+    'memory_check_interval': 5.0    # 两次内存采样的最小间隔（秒）
+}
+
+# stats()中不能跨进程相加的字段：各进程的峰值出现在不同时刻，相加不是总峰值（当前RSS和资源数可以相加）
+GAUGES = ('peak_rss_mb',)
+
+# 保留的最近回收事件数
+MAX_EVENTS = 100
+
+KIND_NAMES = {'page': '页面', 'context': '上下文', 'browser': '浏览器'}
+
+PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+
+def _read_proc(pid: int, name: str) -> Optional[str]:
+    try:
+        with open(f'/proc/{pid}/{name}', 'rb') as f:
+            return f.read().decode('utf-8', 'replace')
+    except OSError:
+        return None
+
+
+def process_tree_rss(root: Optional[int] = None) -> Optional[Dict[str, float]]:
+    """统计root（默认当前进程）全部子孙进程的RSS（MB），按渲染进程、驱动进程和其他浏览器进程分类
+
+    当前进程自身不计入（回收浏览器无法释放它的内存）；不支持/proc的平台返回None
+    """
+    root = os.getpid() if root is None else root
+    if not os.path.isdir('/proc'):
+        return None
+
+    children: Dict[int, List[int]] = {}
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        stat = _read_proc(int(entry), 'stat')
+        if not stat:
+            continue
+        # 进程名可能包含空格和括号，从最后一个 ) 之后解析
+        fields = stat[stat.rfind(')') + 2:].split()
+        children.setdefault(int(fields[1]), []).append(int(entry))
+
+    usage = {'renderer_mb': 0.0, 'driver_mb': 0.0, 'browser_mb': 0.0, 'processes': 0}
+    pending = list(children.get(root, []))
+    while pending:
+        pid = pending.pop()
+        pending.extend(children.get(pid, []))
+        statm = _read_proc(pid, 'statm')
+        if not statm:
+            continue
+        rss_mb = int(statm.split()[1]) * PAGE_SIZE / (1024 * 1024)
+        cmdline = _read_proc(pid, 'cmdline') or ''
+        if '--type=renderer' in cmdline:
+            usage['renderer_mb'] += rss_mb
+        elif 'playwright' in cmdline and '--type=' not in cmdline and 'chrom' not in cmdline:
+            usage['driver_mb'] += rss_mb
+        else:
+            usage['browser_mb'] += rss_mb
+        usage['processes'] += 1
+
+    usage = {key: round(value, 1) if isinstance(value, float) else value for key, value in usage.items()}
+    usage['total_mb'] = round(usage['renderer_mb'] + usage['driver_mb'] + usage['browser_mb'], 1)
+    return usage
+
+
+class RecyclePolicy:
+    """回收策略；各上限为None或0表示不按该条件回收"""
+
+    def __init__(self, max_jobs_per_page: Optional[int] = None, max_jobs_per_context: Optional[int] = None,
+                 max_jobs_per_browser: Optional[int] = None, max_memory_mb: Optional[float] = None,
+                 memory_check_interval: float = 5.0):
+        self.max_jobs_per_page = max_jobs_per_page
+        self.max_jobs_per_context = max_jobs_per_context
+        self.max_jobs_per_browser = max_jobs_per_browser
+        self.max_memory_mb = max_memory_mb
+        self.memory_check_interval = memory_check_interval
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> 'RecyclePolicy':
+        """recycle为false时从不回收（仍统计内存），为字典时覆盖DEFAULT_SETTINGS中的参数"""
+        setting = config.get('recycle', {})
+        if setting is False:
+            return cls()
+        if not isinstance(setting, dict):
+            raise ValueError(f"recycle配置必须为字典或false: {setting}")
+        unknown = set(setting) - set(DEFAULT_SETTINGS)
+        if unknown:
+            raise ValueError(f"未知的recycle参数: {', '.join(sorted(unknown))}")
+        for key, value in setting.items():
+            if value is not None and (isinstance(value, bool) or not isinstance(value, (int, float)) or value < 0):
+                raise ValueError(f"recycle.{key} 必须为非负数: {value}")
+        return cls(**{**DEFAULT_SETTINGS, **setting})
+
+
+class _BrowserSlot:
+    def __init__(self, browser):
+        self.browser = browser
+        self.jobs = 0
+        self.retired = False
+        self.contexts: List['_ContextSlot'] = []
+
+
+class _ContextSlot:
+    def __init__(self, lane: '_Lane', context, browser_slot: _BrowserSlot):
+        self.lane = lane
+        self.context = context
+        self.browser_slot = browser_slot
+        self.jobs = 0
+        self.retired = False
+        # 页面 -> 该页面已服务的作业数
+        self.pages: Dict[Any, int] = {}
+
+
+class _Lane:
+    """同一登录身份的上下文序列：新上下文由open_context以上一个上下文的登录态创建"""
+
+    def __init__(self, key: Hashable, open_context: Callable[..., Awaitable[Any]], page_timeout: int):
+        self.key = key
+        self.open_context = open_context
+        self.page_timeout = page_timeout
+        self.storage_state: Optional[Dict[str, Any]] = None
+        self.current: Optional[_ContextSlot] = None
+
+
+class ResourceManager:
+    """按代回收页面、上下文和浏览器的资源管理器（在事件循环中使用）
+
+    作业开始前checkout借出页面，结束后checkin归还；回收只影响之后借出的页面，
+    被回收的上下文和浏览器在其页面全部关闭后才关闭
+    """
+
+    def __init__(self, policy: RecyclePolicy, launch: Optional[Callable[[], Awaitable[Any]]] = None,
+                 measure: Callable[[], Optional[Dict[str, float]]] = process_tree_rss):
+        self.policy = policy
+        # 未提供launch时无法重启浏览器，内存超出预算只回收上下文
+        self._launch = launch
+        self._measure = measure
+        self._lock = asyncio.Lock()
+
+        self._browser: Optional[_BrowserSlot] = None
+        self._browsers: List[_BrowserSlot] = []
+        self._lanes: Dict[Hashable, _Lane] = {}
+        self._slots: Dict[Any, _ContextSlot] = {}
+        self._in_flight = set()
+
+        self._last_memory_check = 0.0
+        # 回收上下文后内存仍超出预算时，下一次改为重启浏览器
+        self._escalate = False
+        self.memory: Optional[Dict[str, float]] = None
+        self.peak_rss_mb = 0.0
+        self.jobs = 0
+        self.counters = {'pages_recycled': 0, 'contexts_recycled': 0, 'browsers_recycled': 0}
+        self.events: deque = deque(maxlen=MAX_EVENTS)
+
+        self.logger = logging.getLogger(__name__)
+
+    def adopt(self, key: Hashable, browser, context, open_context: Callable[..., Awaitable[Any]],
+              page_timeout: int = 30000, pages: Optional[List[Any]] = None):
+        """接管已登录的上下文及其页面；open_context(browser, storage_state)用于创建替换的上下文"""
+        if self._browser is None or self._browser.browser is not browser:
+            self._browser = _BrowserSlot(browser)
+            self._browsers.append(self._browser)
+        lane = self._lanes[key] = _Lane(key, open_context, page_timeout)
+        lane.current = _ContextSlot(lane, context, self._browser)
+        self._browser.contexts.append(lane.current)
+        for page in pages or []:
+            lane.current.pages[page] = 0
+            self._slots[page] = lane.current
+
+    def browser_of(self, page):
+        return self._slots[page].browser_slot.browser
+
+    def context_of(self, page):
+        return self._slots[page].context
+
+    async def current_browser(self):
+        """当前代的浏览器，已被回收时启动新浏览器"""
+        async with self._lock:
+            return (await self._current_browser_slot()).browser
+
+    async def open_page(self, key: Hashable):
+        """在lane的当前上下文中打开一个空闲页面"""
+        async with self._lock:
+            return await self._new_page(self._lanes[key])
+
+    async def checkout(self, key: Hashable, page=None):
+        """借出页面执行作业；page为池中的空闲页面，属于已回收的上下文时换成当前上下文的新页面"""
+        async with self._lock:
+            lane = self._lanes[key]
+            if page is None:
+                page = await self._new_page(lane)
+            elif self._slots[page].retired:
+                try:
+                    replacement = await self._new_page(lane)
+                except Exception as e:
+                    # 旧上下文在其页面全部关闭前仍可用
+                    self.logger.warning(f"创建替换页面失败，继续使用旧页面: {e}")
+                else:
+                    await self._close_page(page)
+                    page = replacement
+            self._in_flight.add(page)
+            return page
+
+    async def checkin(self, page, keep: bool = True):
+        """归还作业结束的页面，按作业数和内存检查是否需要回收
+
+        keep为True时返回可继续使用的页面（可能是替换的新页面），否则关闭页面并返回None
+        """
+        async with self._lock:
+            self._in_flight.discard(page)
+            slot = self._slots[page]
+            slot.pages[page] += 1
+            slot.jobs += 1
+            slot.browser_slot.jobs += 1
+            self.jobs += 1
+
+            policy = self.policy
+            if policy.max_jobs_per_browser and slot.browser_slot.jobs >= policy.max_jobs_per_browser \
+                    and not slot.browser_slot.retired and self._launch:
+                await self._retire_browser(slot.browser_slot, 'jobs')
+            elif policy.max_jobs_per_context and slot.jobs >= policy.max_jobs_per_context and not slot.retired:
+                await self._retire_context(slot, 'jobs')
+            await self._check_memory()
+
+            if not keep:
+                await self._close_page(page)
+                return None
+
+            page_exhausted = bool(policy.max_jobs_per_page) and slot.pages[page] >= policy.max_jobs_per_page
+            if not (slot.retired or page_exhausted):
+                return page
+
+            try:
+                replacement = await self._new_page(slot.lane)
+            except Exception as e:
+                self.logger.warning(f"创建替换页面失败，继续使用旧页面: {e}")
+                return page
+            if page_exhausted and not slot.retired:
+                self._record('page', 'jobs', slot.pages[page])
+            await self._close_page(page)
+            return replacement
+
+    async def _current_browser_slot(self) -> _BrowserSlot:
+        if self._browser is None or self._browser.retired:
+            if self._launch is None:
+                raise Exception("浏览器已被回收且无法启动新浏览器")
+            self._browser = _BrowserSlot(await self._launch())
+            self._browsers.append(self._browser)
+            self.logger.info("已启动新浏览器")
+        return self._browser
+
+    async def _new_page(self, lane: _Lane):
+        slot = lane.current
+        if slot is None or slot.retired:
+            browser_slot = await self._current_browser_slot()
+            context = await lane.open_context(browser_slot.browser, lane.storage_state)
+            slot = lane.current = _ContextSlot(lane, context, browser_slot)
+            browser_slot.contexts.append(slot)
+        page = await slot.context.new_page()
+        page.set_default_timeout(lane.page_timeout)
+        slot.pages[page] = 0
+        self._slots[page] = slot
+        return page
+
+    async def _retire_context(self, slot: _ContextSlot, reason: str, event: bool = True):
+        """之后的页面改由新上下文提供；保存登录态供新上下文使用"""
+        slot.retired = True
+        try:
+            slot.lane.storage_state = await slot.context.storage_state()
+        except Exception as e:
+            self.logger.warning(f"读取上下文登录态失败，新上下文沿用上次保存的登录态: {e}")
+        if event:
+            self._record('context', reason, slot.jobs)
+        await self._reap()
+
+    async def _retire_browser(self, browser_slot: _BrowserSlot, reason: str):
+        browser_slot.retired = True
+        for slot in browser_slot.contexts:
+            if not slot.retired:
+                await self._retire_context(slot, reason, event=False)
+        self._record('browser', reason, browser_slot.jobs)
+        await self._reap()
+
+    async def _check_memory(self):
+        """按采样间隔检查内存：超出预算先回收上下文，回收后仍超出则重启浏览器"""
+        now = time.monotonic()
+        if now - self._last_memory_check < self.policy.memory_check_interval:
+            return
+        self._last_memory_check = now
+        usage = self._measure()
+        if usage is None:
+            return
+        self.memory = usage
+        self.peak_rss_mb = max(self.peak_rss_mb, usage['total_mb'])
+
+        if not self.policy.max_memory_mb or usage['total_mb'] <= self.policy.max_memory_mb:
+            self._escalate = False
+            return
+        # 上一次回收的资源仍在等待作业归还时，内存尚未释放，暂不判断
+        if any(slot.retired for browser_slot in self._browsers for slot in browser_slot.contexts) or \
+                any(browser_slot.retired for browser_slot in self._browsers):
+            return
+
+        if self._escalate and self._launch and self._browser:
+            await self._retire_browser(self._browser, 'memory')
+            self._escalate = False
+        else:
+            for lane in self._lanes.values():
+                if lane.current and not lane.current.retired:
+                    await self._retire_context(lane.current, 'memory')
+            self._escalate = True
+
+    async def _close_page(self, page):
+        slot = self._slots.pop(page)
+        slot.pages.pop(page, None)
+        self._in_flight.discard(page)
+        await self._close_quietly(page)
+        await self._reap()
+
+    async def _reap(self):
+        """关闭已回收且没有页面的上下文，以及已回收且没有上下文的浏览器"""
+        for browser_slot in list(self._browsers):
+            for slot in list(browser_slot.contexts):
+                if slot.retired and not slot.pages:
+                    browser_slot.contexts.remove(slot)
+                    await self._close_quietly(slot.context)
+            if browser_slot.retired and not browser_slot.contexts:
+                self._browsers.remove(browser_slot)
+                await self._close_quietly(browser_slot.browser)
+
+    async def _close_quietly(self, resource):
+        try:
+            await resource.close()
+        except Exception as e:
+            self.logger.warning(f"关闭{type(resource).__name__}失败: {e}")
+
+    def _record(self, kind: str, reason: str, jobs: int):
+        self.counters[f'{kind}s_recycled'] += 1
+        rss_mb = self.memory['total_mb'] if self.memory else None
+        self.events.append({'kind': kind, 'reason': reason, 'jobs': jobs, 'rss_mb': rss_mb,
+                            'at': round(time.time(), 3)})
+        reason_text = '内存超出预算' if reason == 'memory' else '作业数达到上限'
+        memory_text = f"，RSS {rss_mb}MB" if rss_mb is not None else ''
+        self.logger.info(f"♻️ 回收{KIND_NAMES[kind]}：{reason_text}（已服务 {jobs} 个作业{memory_text}）")
+
+    async def close(self):
+        """关闭全部页面、上下文和浏览器"""
+        async with self._lock:
+            for page in list(self._slots):
+                await self._close_quietly(page)
+            for browser_slot in self._browsers:
+                for slot in browser_slot.contexts:
+                    await self._close_quietly(slot.context)
+                await self._close_quietly(browser_slot.browser)
+            self._slots.clear()
+            self._browsers.clear()
+            self._lanes.clear()
+            self._browser = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'jobs': self.jobs,
+            'in_flight': len(self._in_flight),
+            'pages': len(self._slots),
+            'contexts': sum(len(browser_slot.contexts) for browser_slot in self._browsers),
+            'browsers': len(self._browsers),
+            'rss_mb': self.memory['total_mb'] if self.memory else 0.0,
+            'peak_rss_mb': round(self.peak_rss_mb, 1),
+            **self.counters,
+            'events': list(self.events)
+        }
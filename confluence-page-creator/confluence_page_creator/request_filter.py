@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+浏览器请求过滤
+在浏览器上下文上按资源类型和URL规则拦截自动化用不到的请求（图片、字体、头像、分析埋点等），
+并按页面统计拦截数量和估算节省的流量
+"""
+
+import re
+import weakref
+from typing import Dict, List, Optional, Pattern, Union, Any
+
+
+DEFAULT_PROFILE = 'confluence'
+
+PROFILES: Dict[str, Dict[str, List[str]]] = {
+    # Confluence默认规则：不拦截样式表和业务脚本，避免影响编辑器渲染和元素可见性判断
+    'confluence': {
+        'block_resource_types': ['image', 'media', 'font'],
+        'block_url_patterns': [
+            r'/gateway/api/gasv3/',
+            r'api-private\.atlassian\.com/gasv3',
+            r'/gateway/api/avatar',
+            r'avatar-management--avatars',
+            r'secure\.gravatar\.com',
+            r'google-analytics\.com',
+            r'googletagmanager\.com',
+            r'api\.segment\.io',
+            r'cdn\.segment\.com',
+            r'js-agent\.newrelic\.com',
+            r'bam\.nr-data\.net',
+            r'\.ingest\.sentry\.io',
+            r'fullstory\.com',
+            r'hotjar\.com'
+        ],
+        'allow_url_patterns': []
+    },
+    # 不带任何规则，完全由配置指定
+    'none': {
+        'block_resource_types': [],
+        'block_url_patterns': [],
+        'allow_url_patterns': []
+    }
+}
+
+# 被拦截资源的典型大小（字节）。请求被拦截后无法得知实际大小，按此估算节省的流量
+TYPICAL_RESOURCE_BYTES = {
+    'image': 20_000,
+    'media': 500_000,
+    'font': 40_000,
+    'script': 60_000,
+    'stylesheet': 30_000,
+    'xhr': 2_000,
+    'fetch': 2_000,
+    'ping': 500,
+    'beacon': 500
+}
+DEFAULT_RESOURCE_BYTES = 5_000
+
+# 资源类型对应的URL扩展名。路由只注册在可能被拦截的URL上，按资源类型拦截时用扩展名预筛，
+# 其余请求不经过Python处理；没有扩展名的同类资源（如无后缀的图片地址）不会被拦截
+RESOURCE_TYPE_URL_PATTERNS = {
+    'image': r'\.(?:png|jpe?g|gif|svg|webp|ico|avif|bmp)(?:[?#]|$)',
+    'font': r'\.(?:woff2?|ttf|otf|eot)(?:[?#]|$)',
+    'media': r'\.(?:mp4|webm|mp3|ogg|wav|m4a|mov)(?:[?#]|$)',
+    'stylesheet': r'\.css(?:[?#]|$)',
+    'script': r'\.m?js(?:[?#]|$)'
+}
+
+
+def _empty_counters() -> Dict[str, Any]:
+    return {'blocked': 0, 'allowed': 0, 'blocked_by_type': {}, 'bytes_saved': 0}
+
+
+class RequestFilter:
+    """上下文级请求拦截规则，放行规则优先于拦截规则，主文档请求永不拦截"""
+
+    def __init__(self, profile: str = DEFAULT_PROFILE,
+                 block_resource_types: Optional[List[str]] = None,
+                 block_url_patterns: Optional[List[str]] = None,
+                 allow_url_patterns: Optional[List[str]] = None):
+        self.profile = profile
+        self.block_resource_types = set(block_resource_types or [])
+        self.block_url_patterns = [re.compile(p) for p in block_url_patterns or []]
+        self.allow_url_patterns = [re.compile(p) for p in allow_url_patterns or []]
+
+        # 上下文累计统计，以及按页面的统计（共享上下文时每个作业使用各自的页面）
+        self._totals = _empty_counters()
+        # 以弱引用为键：页面对象释放后其统计随之丢弃，常驻进程中不会随作业数增长
+        self._by_page: 'weakref.WeakKeyDictionary[Any, Dict[str, Any]]' = weakref.WeakKeyDictionary()
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> Optional['RequestFilter']:
+        """根据配置创建过滤器
+
+        request_filter 可以是规则集名称、false（关闭），或包含 profile 及
+        block_resource_types / block_url_patterns / allow_url_patterns 的字典（在规则集基础上追加）
+        """
+        setting = config.get('request_filter', DEFAULT_PROFILE)
+        if not setting:
+            return None
+
+        overrides = setting if isinstance(setting, dict) else {'profile': setting}
+        profile = overrides.get('profile', DEFAULT_PROFILE)
+        if profile not in PROFILES:
+            raise ValueError(f"未知的请求过滤规则集: {profile}，可选: {', '.join(PROFILES)}")
+
+        rules = PROFILES[profile]
+        try:
+            return cls(
+                profile=profile,
+                block_resource_types=rules['block_resource_types'] + overrides.get('block_resource_types', []),
+                block_url_patterns=rules['block_url_patterns'] + overrides.get('block_url_patterns', []),
+                allow_url_patterns=rules['allow_url_patterns'] + overrides.get('allow_url_patterns', [])
+            )
+        except re.error as e:
+            raise ValueError(f"请求过滤URL规则无效: {e}")
+
+    def should_block(self, url: str, resource_type: str) -> bool:
+        if resource_type == 'document':
+            return False
+        if any(pattern.search(url) for pattern in self.allow_url_patterns):
+            return False
+        if resource_type in self.block_resource_types:
+            return True
+        return any(pattern.search(url) for pattern in self.block_url_patterns)
+
+    def route_pattern(self) -> Optional[Union[str, Pattern]]:
+        """需要注册路由的URL：拦截规则与被拦截资源类型扩展名的并集，没有拦截规则时为None
+
+        启用路由后Playwright会停用HTTP缓存，但只有匹配的请求会暂停并交给Python处理。
+        拦截的资源类型没有可识别的扩展名（如xhr、fetch）时只能路由全部请求
+        """
+        if not self.block_resource_types and not self.block_url_patterns:
+            return None
+        if any(t not in RESOURCE_TYPE_URL_PATTERNS for t in self.block_resource_types):
+            return '**/*'
+        sources = [RESOURCE_TYPE_URL_PATTERNS[t] for t in sorted(self.block_resource_types)]
+        sources += [pattern.pattern for pattern in self.block_url_patterns]
+        # 正则会交给浏览器驱动按JavaScript语法匹配，只用两者通用的写法
+        return re.compile('|'.join(f'(?:{source})' for source in sources), re.IGNORECASE)
+
+    async def install(self, context):
+        """在浏览器上下文上注册拦截（对其中所有页面生效），只路由可能被拦截的请求"""
+        pattern = self.route_pattern()
+        if pattern is not None:
+            await context.route(pattern, self._handle_route)
+
+    def _page_counters(self, request) -> Optional[Dict[str, Any]]:
+        """请求所属页面的统计；Service Worker等不属于页面的请求返回None"""
+        try:
+            page = request.frame.page
+        except Exception:
+            return None
+        if page not in self._by_page:
+            self._by_page[page] = _empty_counters()
+        return self._by_page[page]
+
+    async def _handle_route(self, route):
+        request = route.request
+        resource_type = request.resource_type
+        try:
+            blocked = self.should_block(request.url, resource_type)
+            for counters in (self._totals, self._page_counters(request)):
+                if counters is None:
+                    continue
+                if blocked:
+                    counters['blocked'] += 1
+                    counters['blocked_by_type'][resource_type] = counters['blocked_by_type'].get(resource_type, 0) + 1
+                    counters['bytes_saved'] += TYPICAL_RESOURCE_BYTES.get(resource_type, DEFAULT_RESOURCE_BYTES)
+                else:
+                    counters['allowed'] += 1
+            if blocked:
+                await route.abort('blockedbyclient')
+            else:
+                await route.continue_()
+        except Exception:
+            # 页面已关闭或请求已被取消，忽略
+            pass
+
+    def stats(self, page=None, since: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """拦截统计：默认为整个上下文的累计值，指定page时只统计该页面的请求；
+        since为之前的统计结果时返回此后的增量（页面池中的页面会被多个作业复用）
+        """
+        counters = self._totals if page is None else self._by_page.get(page, _empty_counters())
+        stats = {
+            'profile': self.profile,
+            'blocked': counters['blocked'],
+            'allowed': counters['allowed'],
+            'blocked_by_type': dict(counters['blocked_by_type']),
+            'bytes_saved_estimate': counters['bytes_saved']
+        }
+        if since:
+            for key in ('blocked', 'allowed', 'bytes_saved_estimate'):
+                stats[key] -= since.get(key, 0)
+            previous = since.get('blocked_by_type', {})
+            stats['blocked_by_type'] = {
+                resource_type: count - previous.get(resource_type, 0)
+                for resource_type, count in stats['blocked_by_type'].items()
+                if count - previous.get(resource_type, 0)
+            }
+        return stats
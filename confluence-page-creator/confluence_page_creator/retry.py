@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+瞬时故障重试
+指数退避加随机抖动（full jitter），只重试网络超时、连接失败、429/5xx等瞬时错误；
+错误带有Retry-After时至少等待该时长
+"""
+
+import asyncio
+import random
+import sys
+from typing import Awaitable, Callable, Dict, Optional, Any
+
+from .tracing import retry_attempt
+
+
+DEFAULT_MAX_ATTEMPTS = 3
+DEFAULT_BASE_DELAY = 1.0
+DEFAULT_MAX_DELAY = 30.0
+
+# 可重试的HTTP状态码
+TRANSIENT_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+
+
+def is_transient(error: BaseException) -> bool:
+    """判断错误是否为瞬时故障（重试可能成功）"""
+    status_code = getattr(error, 'status_code', None)
+    if status_code is not None:
+        return status_code in TRANSIENT_STATUS_CODES
+
+    if isinstance(error, (asyncio.TimeoutError, TimeoutError, ConnectionError)):
+        return True
+
+    # requests和Playwright只在已加载时检查，避免为判断错误类型而导入
+    requests = sys.modules.get('requests')
+    if requests and isinstance(error, (requests.ConnectionError, requests.Timeout)):
+        return True
+
+    if type(error).__module__.startswith('playwright'):
+        return type(error).__name__ == 'TimeoutError' or 'net::ERR_' in str(error)
+
+    return False
+
+
+class RetryPolicy:
+    """重试策略：第n次重试前等待 uniform(0, min(max_delay, base_delay * 2^(n-1))) 秒"""
+
+    def __init__(self, max_attempts: int = DEFAULT_MAX_ATTEMPTS, base_delay: float = DEFAULT_BASE_DELAY,
+                 max_delay: float = DEFAULT_MAX_DELAY):
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> 'RetryPolicy':
+        """retry为false时不重试，为字典时可设置max_attempts、base_delay、max_delay"""
+        setting = config.get('retry', {})
+        if setting is False:
+            return cls(max_attempts=1)
+        setting = setting if isinstance(setting, dict) else {}
+        return cls(
+            max_attempts=int(setting.get('max_attempts', DEFAULT_MAX_ATTEMPTS)),
+            base_delay=float(setting.get('base_delay', DEFAULT_BASE_DELAY)),
+            max_delay=float(setting.get('max_delay', DEFAULT_MAX_DELAY))
+        )
+
+    def delay(self, attempt: int) -> float:
+        """第attempt次重试（从1开始）前的等待时间"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+    async def run(self, func: Callable[[], Awaitable[Any]],
+                  should_retry: Callable[[BaseException], bool] = is_transient,
+                  on_retry: Optional[Callable[[int, BaseException, float], None]] = None) -> Any:
+        """执行func，瞬时故障时按退避策略重试；重试期间创建的span记录重试次数"""
+        attempt = 0
+        while True:
+            token = retry_attempt.set(attempt)
+            try:
+                return await func()
+            except Exception as e:
+                attempt += 1
+                if attempt >= self.max_attempts or not should_retry(e):
+                    raise
+                # 服务端通过Retry-After要求的等待时间优先；超过max_delay时放弃重试
+                retry_after = getattr(e, 'retry_after', None)
+                if retry_after is not None and retry_after > self.max_delay:
+                    raise
+                delay = max(self.delay(attempt), retry_after or 0.0)
+                if on_retry:
+                    on_retry(attempt, e, delay)
+            finally:
+                retry_attempt.reset(token)
+            await asyncio.sleep(delay)
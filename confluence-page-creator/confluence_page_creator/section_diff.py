@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+storage格式按章节比较
+以标题（h1~h6）为界把页面正文切分为章节，与现有页面逐章节比较：
+未变化的章节保留页面中的原始标记，只替换变化的章节；全部未变化时不需要更新
+"""
+
+import re
+from typing import Dict, List, Optional, Any
+
+
+# 渲染易变模板变量（如current_time）时使用的占位符，比较时匹配任意文本
+VOLATILE_MARKER = '\ue000'
+
+SECTION_RE = re.compile(r'(?=<h[1-6][\s>])')
+HEADING_RE = re.compile(r'^<h([1-6])[^>]*>(.*?)</h\1>', re.S)
+# Confluence Cloud保存时添加的属性（元素local-id、宏的schema-version和macro-id、表格布局），比较时忽略；
+# 生成的正文不包含这些属性，不忽略时含代码宏或表格的章节每次都会被视为变化
+SERVER_ATTRIBUTE_RE = re.compile(
+    r'\s(?:(?:ac:)?local-id|ac:schema-version|ac:macro-id|data-layout|data-table-width)="[^"]*"'
+)
+TAG_GAP_RE = re.compile(r'>\s+<')
+SPACE_RE = re.compile(r'\s+')
+TAG_RE = re.compile(r'<[^>]+>')
+
+
+def split_sections(body: str) -> List[str]:
+    """切分章节，首个标题之前的内容作为一个无标题章节；各章节拼接后与原文完全一致"""
+    return [section for section in SECTION_RE.split(body) if section]
+
+
+def normalize(fragment: str) -> str:
+    """规范化storage片段：忽略服务端添加的属性和标签间空白"""
+    fragment = SERVER_ATTRIBUTE_RE.sub('', fragment)
+    fragment = TAG_GAP_RE.sub('><', fragment.strip())
+    return SPACE_RE.sub(' ', fragment)
+
+
+def section_heading(section: str) -> str:
+    """章节标题的纯文本（带级别前缀，区分同名的不同级标题），无标题章节返回空字符串"""
+    match = HEADING_RE.match(section)
+    if not match:
+        return ''
+    return f"h{match.group(1)}:{normalize(TAG_RE.sub('', match.group(2)))}"
+
+
+def _matches(old_section: str, stable_section: str) -> bool:
+    """旧章节与新章节是否一致，新章节中的易变占位符可匹配任意文本"""
+    pattern = re.escape(normalize(stable_section)).replace(VOLATILE_MARKER, '.*?')
+    return re.fullmatch(pattern, normalize(old_section), re.S) is not None
+
+
+class SectionDiff:
+    """章节比较结果"""
+
+    def __init__(self, body: str, changed: List[str], added: List[str],
+                 removed: List[str], unchanged: int, has_changes: bool):
+        self.body = body
+        self.changed = changed
+        self.added = added
+        self.removed = removed
+        self.unchanged = unchanged
+        self.has_changes = has_changes
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'changed_sections': self.changed,
+            'added_sections': self.added,
+            'removed_sections': self.removed,
+            'unchanged_sections': self.unchanged
+        }
+
+
+def diff_sections(old_body: str, new_body: str, stable_body: Optional[str] = None) -> SectionDiff:
+    """比较现有正文与新正文，返回合并后的正文
+
+    stable_body为把易变变量渲染为VOLATILE_MARKER的新正文，用于忽略时间戳等每次都会变化的内容
+    """
+    new_sections = split_sections(new_body)
+    stable_sections = split_sections(stable_body) if stable_body is not None else new_sections
+    if len(stable_sections) != len(new_sections):
+        stable_sections = new_sections
+
+    # 同名章节按出现顺序依次对应
+    old_by_heading: Dict[str, List[str]] = {}
+    for section in split_sections(old_body):
+        old_by_heading.setdefault(section_heading(section), []).append(section)
+
+    merged: List[str] = []
+    changed: List[str] = []
+    added: List[str] = []
+    unchanged = 0
+    for new_section, stable_section in zip(new_sections, stable_sections):
+        heading = section_heading(new_section)
+        candidates = old_by_heading.get(heading)
+        if not candidates:
+            added.append(heading)
+            merged.append(new_section)
+            continue
+
+        old_section = candidates.pop(0)
+        if _matches(old_section, stable_section):
+            unchanged += 1
+            merged.append(old_section)
+        else:
+            changed.append(heading)
+            merged.append(new_section)
+
+    removed = [heading for heading, sections in old_by_heading.items() for _ in sections]
+    body = ''.join(merged)
+    # 章节顺序变化也算作变化
+    has_changes = normalize(body) != normalize(old_body)
+    return SectionDiff(body, changed, added, removed, unchanged, has_changes)
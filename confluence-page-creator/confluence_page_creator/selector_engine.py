@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+选择器解析引擎
+并发竞速所有候选选择器，取最先匹配的元素；按主机和Confluence版本在磁盘上记住胜出的选择器
+"""
+
+import asyncio
+import json
+import os
+from pathlib import Path
+from typing import Dict, List, Optional, Any
+from urllib.parse import urlparse
+
+
+DEFAULT_CACHE_PATH = Path.home() / '.cache' / 'confluence-page-creator' / 'selectors.json'
+# 缓存的选择器独占等待的时间窗口，超时后其余候选加入竞速（缓存的等待不会中断）
+DEFAULT_PROBE_TIMEOUT = 1000
+
+
+class SelectorResolver:
+    """选择器竞速解析器，带按主机/版本学习的选择器缓存"""
+
+    def __init__(self, host: str, version: Optional[str] = None,
+                 cache_path: Optional[str] = None, probe_timeout: int = DEFAULT_PROBE_TIMEOUT):
+        self.host = host
+        self.version = version
+        self.cache_path = Path(cache_path or DEFAULT_CACHE_PATH).expanduser()
+        self.probe_timeout = probe_timeout
+        self._cache: Dict[str, Dict[str, str]] = self._load_cache()
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> 'SelectorResolver':
+        """根据技能配置创建解析器"""
+        return cls(
+            urlparse(config['confluence_url']).netloc,
+            version=config.get('confluence_version'),
+            cache_path=config.get('selector_cache_path'),
+            probe_timeout=config.get('selector_probe_timeout', DEFAULT_PROBE_TIMEOUT)
+        )
+
+    def _load_cache(self) -> Dict[str, Dict[str, str]]:
+        try:
+            with open(self.cache_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_cache(self):
+        """原子写入缓存文件"""
+        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = self.cache_path.with_suffix(f'.{os.getpid()}.tmp')
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(self._cache, f, ensure_ascii=False, indent=2)
+        os.replace(temp_path, self.cache_path)
+
+    @property
+    def cache_key(self) -> str:
+        return f"{self.host}|{self.version or 'unknown'}"
+
+    async def detect_version(self, page) -> str:
+        """从页面元数据识别Confluence版本（Server/DC提供ajs-version-number）"""
+        try:
+            version = await page.evaluate(
+                "() => { const meta = document.querySelector('meta[name=\"ajs-version-number\"]');"
+                " return meta ? meta.content : null; }"
+            )
+        except Exception:
+            version = None
+
+        if not version:
+            version = 'cloud' if self.host.endswith('.atlassian.net') else 'unknown'
+        return version
+
+    def _record(self, step: str, hit: bool):
+        step_stats = self._stats.setdefault(step, {'hits': 0, 'misses': 0})
+        step_stats['hits' if hit else 'misses'] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """缓存命中统计，Confluence升级后缓存失效表现为miss升高"""
+        hits = sum(s['hits'] for s in self._stats.values())
+        misses = sum(s['misses'] for s in self._stats.values())
+        return {
+            'cache_key': self.cache_key,
+            'hits': hits,
+            'misses': misses,
+            'steps': {step: dict(s) for step, s in self._stats.items()}
+        }
+
+    async def resolve(self, page, step: str, candidates: List[str], timeout: int = 5000):
+        """解析步骤对应的元素：先尝试缓存的选择器，随后所有候选并发竞速"""
+        if self.version is None:
+            self.version = await self.detect_version(page)
+
+        cached = self._cache.get(self.cache_key, {}).get(step)
+        if cached not in candidates:
+            cached = None
+
+        pending: Dict[asyncio.Task, str] = {}
+
+        def start(selector: str):
+            task = asyncio.ensure_future(page.wait_for_selector(selector, timeout=timeout))
+            pending[task] = selector
+
+        winner = None
+        element = None
+
+        try:
+            if cached:
+                start(cached)
+                winner, element = await self._first_match(pending, self.probe_timeout / 1000)
+
+            if element is None:
+                for selector in candidates:
+                    if selector not in pending.values():
+                        start(selector)
+                winner, element = await self._first_match(pending, None)
+        finally:
+            for task in pending:
+                if not task.done():
+                    task.cancel()
+                elif not task.cancelled():
+                    task.exception()
+
+        if element is None:
+            self._record(step, hit=False)
+            return None
+
+        hit = winner == cached
+        self._record(step, hit)
+        if not hit:
+            self._cache.setdefault(self.cache_key, {})[step] = winner
+            self._save_cache()
+
+        return element
+
+    async def _first_match(self, pending: Dict[asyncio.Task, str], timeout: Optional[float]):
+        """等待第一个成功匹配的选择器，失败的候选从竞速中移除"""
+        loop = asyncio.get_running_loop()
+        deadline = None if timeout is None else loop.time() + timeout
+
+        while pending:
+            remaining = None if deadline is None else max(0, deadline - loop.time())
+            done, _ = await asyncio.wait(pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                return None, None
+
+            for task in done:
+                selector = pending.pop(task)
+                if not task.cancelled() and task.exception() is None and task.result():
+                    return selector, task.result()
+
+        return None, None
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+登录态缓存
+将已认证BrowserContext的storage state加密保存到本地，按confluence_url和username区分；
+多个进程同时需要登录时通过文件锁只让一个进程登录，其余进程复用其保存的登录态
+"""
+
+import asyncio
+import base64
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Dict, Optional, Any
+
+from cryptography.fernet import Fernet, InvalidToken
+
+try:
+    import fcntl
+except ImportError:
+    # 非POSIX平台不支持跨进程登录锁，各进程分别登录
+    fcntl = None
+
+
+DEFAULT_CACHE_DIR = Path.home() / '.cache' / 'confluence-page-creator' / 'sessions'
+DEFAULT_MAX_AGE = 12 * 3600
+
+
+class SessionCache:
+    """加密的登录态缓存，密钥由api_token派生，更换token后旧缓存自动失效"""
+
+    def __init__(self, confluence_url: str, username: str, api_token: str,
+                 cache_dir: Optional[str] = None, max_age: int = DEFAULT_MAX_AGE):
+        cache_key = f"{confluence_url.rstrip('/')}|{username}".encode('utf-8')
+        digest = hashlib.sha256(cache_key).hexdigest()
+
+        self.path = Path(cache_dir or DEFAULT_CACHE_DIR).expanduser() / f"{digest}.session"
+        self.max_age = max_age
+
+        # 使用scrypt从api_token派生加密密钥，缓存键作为盐
+        key = hashlib.scrypt(api_token.encode('utf-8'), salt=cache_key, n=2 ** 14, r=8, p=1, dklen=32)
+        self._fernet = Fernet(base64.urlsafe_b64encode(key))
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> 'SessionCache':
+        """根据技能配置创建缓存"""
+        return cls(
+            config['confluence_url'],
+            config['username'],
+            config['api_token'],
+            cache_dir=config.get('session_cache_dir'),
+            max_age=config.get('session_max_age', DEFAULT_MAX_AGE)
+        )
+
+    def load(self) -> Optional[Dict[str, Any]]:
+        """读取缓存的storage state，不存在、过期或无法解密时返回None"""
+        try:
+            token = self.path.read_bytes()
+        except OSError:
+            return None
+
+        try:
+            return json.loads(self._fernet.decrypt(token, ttl=self.max_age))
+        except (InvalidToken, ValueError):
+            self.invalidate()
+            return None
+
+    def save(self, storage_state: Dict[str, Any]):
+        """加密并原子写入storage state"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        token = self._fernet.encrypt(json.dumps(storage_state).encode('utf-8'))
+
+        temp_path = self.path.with_suffix(f'.{os.getpid()}.tmp')
+        fd = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(token)
+        os.replace(temp_path, self.path)
+
+    def invalidate(self):
+        """删除缓存（会话过期时调用）"""
+        try:
+            self.path.unlink()
+        except FileNotFoundError:
+            pass
+
+    def login_lock(self) -> 'LoginLock':
+        """同一站点和用户的跨进程登录锁"""
+        return LoginLock(self.path.with_suffix('.lock'))
+
+
+class LoginLock:
+    """基于flock的跨进程锁，异步轮询获取，等待期间可被取消"""
+
+    def __init__(self, path: Path, poll_interval: float = 0.1):
+        self.path = path
+        self.poll_interval = poll_interval
+        self._fd: Optional[int] = None
+
+    def try_acquire(self) -> bool:
+        if fcntl is None:
+            return True
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return False
+        self._fd = fd
+        return True
+
+    async def acquire(self):
+        while not self.try_acquire():
+            await asyncio.sleep(self.poll_interval)
+
+    def release(self):
+        if self._fd is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+            self._fd = None
+
+    async def __aenter__(self) -> 'LoginLock':
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.release()
@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+"""
+多进程分片批量执行
+把清单中的作业轮流分配到多个工作进程，每个进程有独立的Playwright实例和浏览器（各自运行BatchRunner），
+登录态通过本地加密缓存共享；总并发为 进程数 × 每进程页面数，并按内存上限估算收缩。
+各分片结果按清单顺序合并
+"""
+
+import asyncio
+import multiprocessing
+import os
+import time
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Any, Tuple
+
+from .batch import DEFAULT_CONCURRENCY, build_job_configs
+from .journal import JobState, RunJournal
+from .recycling import GAUGES as RECYCLE_GAUGES
+from .traffic import DEFAULT_SETTINGS as DEFAULT_TRAFFIC_SETTINGS
+from .traffic import GAUGES as TRAFFIC_GAUGES
+
+
+DEFAULT_WORKERS = min(os.cpu_count() or 1, 4)
+
+# 内存估算（MB）：每个工作进程（Python、Playwright驱动和浏览器进程）及每个并发页面的常驻内存
+MEMORY_ESTIMATE_MB = {
+    'ui': {'worker': 300, 'page': 80},
+    'api': {'worker': 60, 'page': 2}
+}
+
+
+def plan_shards(job_count: int, workers: int, pages_per_worker: int,
+                max_memory_mb: Optional[int] = None, backend: str = 'ui') -> Tuple[int, int]:
+    """确定进程数与每进程页面数：不超过作业数，并在内存上限内保留尽可能多的并发槽位"""
+    workers = max(1, min(workers, job_count))
+    pages_per_worker = max(1, min(pages_per_worker, -(-job_count // workers)))
+    if not max_memory_mb:
+        return workers, pages_per_worker
+
+    estimate = MEMORY_ESTIMATE_MB.get(backend, MEMORY_ESTIMATE_MB['ui'])
+
+    def usage(w: int, p: int) -> int:
+        return w * (estimate['worker'] + p * estimate['page'])
+
+    while usage(workers, pages_per_worker) > max_memory_mb:
+        options = []
+        if pages_per_worker > 1:
+            options.append((workers, pages_per_worker - 1))
+        if workers > 1:
+            options.append((workers - 1, pages_per_worker))
+        if not options:
+            raise ValueError(f"内存上限 {max_memory_mb}MB 不足以运行一个工作进程"
+                             f"（约需 {usage(1, 1)}MB）")
+        workers, pages_per_worker = max(options, key=lambda option: option[0] * option[1])
+
+    return workers, pages_per_worker
+
+
+def split_jobs(job_configs: List[Dict[str, Any]], workers: int) -> List[List[int]]:
+    """轮流分配作业下标，相邻的作业落在不同进程上，耗时差异较大时也能大致均衡"""
+    return [list(range(shard, len(job_configs), workers)) for shard in range(workers)]
+
+
+def merge_stats(stats: List[Dict[str, Any]], gauges: Tuple[str, ...] = ()) -> Dict[str, Any]:
+    """合并各进程的统计：计数相加，列表拼接，嵌套字典递归合并，其他字段取首个值
+
+    gauges中的字段是各进程的瞬时值（平滑延迟、错误率、并发上限等），相加没有意义：
+    合并结果取平均值，并在per_worker中按进程列出原值
+    """
+    merged: Dict[str, Any] = {}
+    for item in stats:
+        for key, value in item.items():
+            if key in gauges:
+                continue
+            if isinstance(value, bool) or key not in merged:
+                merged.setdefault(key, value if not isinstance(value, dict) else merge_stats([value]))
+            elif isinstance(value, (int, float)):
+                merged[key] += value
+            elif isinstance(value, list):
+                merged[key] = merged[key] + value
+            elif isinstance(value, dict):
+                merged[key] = merge_stats([merged[key], value])
+
+    if gauges and stats:
+        for key in gauges:
+            values = [item[key] for item in stats if isinstance(item.get(key), (int, float))]
+            if values:
+                merged[key] = round(sum(values) / len(values), 3)
+        merged['per_worker'] = [{key: item.get(key) for key in gauges} for item in stats]
+    return merged
+
+
+def scale_traffic(config: Dict[str, Any], workers: int) -> Dict[str, Any]:
+    """各进程的流量控制相互独立，按进程数均分速率和并发上限，使站点承受的总流量不变"""
+    traffic = config.get('traffic')
+    if traffic is False or workers <= 1:
+        return config
+    setting = {**DEFAULT_TRAFFIC_SETTINGS, **(traffic or {})}
+    scaled = dict(traffic or {})
+    if setting['rate']:
+        scaled['rate'] = setting['rate'] / workers
+    scaled['burst'] = max(1, setting['burst'] // workers)
+    scaled['initial_concurrency'] = max(1, setting['initial_concurrency'] // workers)
+    scaled['max_concurrency'] = max(1, setting['max_concurrency'] // workers)
+    return {**config, 'traffic': scaled}
+
+
+def _run_shard(jobs: List[Dict[str, Any]], pages_per_worker: int,
+               journal_path: Optional[str]) -> Dict[str, Any]:
+    """工作进程入口：以独立的浏览器会话执行一个分片"""
+    from .batch import BatchRunner
+
+    journal = RunJournal(journal_path, resume=True) if journal_path else None
+    try:
+        return asyncio.run(BatchRunner({'concurrency': pages_per_worker, 'jobs': jobs}, journal=journal).run())
+    finally:
+        if journal:
+            journal.close()
+
+
+class ShardedRunner:
+    """多进程分片执行器：清单中的workers为进程数，concurrency为每进程页面数，max_memory_mb为总内存上限"""
+
+    def __init__(self, manifest: Dict[str, Any], journal_path: Optional[str] = None, resume: bool = False):
+        self.job_configs = build_job_configs(manifest)
+        for config in self.job_configs:
+            # 工作进程没有终端，无法逐个审核
+            if not config.get('auto_confirm'):
+                raise ValueError(f"多进程模式不支持交互审核，请为作业 {config['job_id']} 设置 auto_confirm: true")
+
+        self.backend = self.job_configs[0].get('backend', 'ui')
+        self.requested_workers = max(1, int(manifest.get('workers', DEFAULT_WORKERS)))
+        self.pages_per_worker = max(1, int(manifest.get('concurrency', DEFAULT_CONCURRENCY)))
+        self.max_memory_mb = manifest.get('max_memory_mb')
+        self.journal_path = Path(journal_path).expanduser() if journal_path else None
+        self.resume = resume
+        # 上次运行中未完成作业已记录的步骤，按作业分给新的分片日志
+        self._unfinished: Dict[str, JobState] = {}
+
+        logging.basicConfig(
+            level=logging.INFO,
+            format='%(asctime)s - %(levelname)s - %(message)s'
+        )
+        self.logger = logging.getLogger(__name__)
+
+    def _shard_journal(self, shard: int) -> Path:
+        return self.journal_path.with_name(f"{self.journal_path.stem}.shard-{shard}.jsonl")
+
+    def _seed_shard_journal(self, shard: int, jobs: List[int]) -> str:
+        """把分给该分片的未完成作业的步骤写入分片日志，工作进程从第一个未完成的步骤继续"""
+        path = self._shard_journal(shard)
+        journal = RunJournal(str(path))
+        for index in jobs:
+            state = self._unfinished.get(self.job_configs[index]['job_id'])
+            if state:
+                journal.copy_job(self.job_configs[index]['job_id'], state)
+        journal.close()
+        return str(path)
+
+    def _consolidate_journal(self) -> Dict[str, Dict[str, Any]]:
+        """汇总上次运行各分片日志中已完成的作业和未完成作业的步骤，写回主日志并删除分片日志
+
+        分片方式取决于本次的进程数，恢复时按作业ID而不是分片对应
+        """
+        completed: Dict[str, Dict[str, Any]] = {}
+        shard_paths = sorted(self.journal_path.parent.glob(f"{self.journal_path.stem}.shard-*.jsonl"))
+
+        if self.resume:
+            for path in [self.journal_path] + shard_paths:
+                journal = RunJournal(path, resume=True)
+                journal.close()
+                for job_id, state in journal.jobs.items():
+                    if state.result is not None:
+                        completed[job_id] = state.result
+                        continue
+                    merged = self._unfinished.setdefault(job_id, JobState())
+                    merged.steps.update(state.steps)
+                    if state.content is not None:
+                        merged.content, merged.approved = state.content, state.approved
+
+        journal = RunJournal(self.journal_path)
+        for job_id, result in completed.items():
+            journal.job_done(job_id, result)
+        for job_id, state in self._unfinished.items():
+            if job_id not in completed:
+                journal.copy_job(job_id, state)
+        journal.close()
+        for path in shard_paths:
+            path.unlink()
+        return completed
+
+    async def run(self) -> Dict[str, Any]:
+        """分片执行全部作业，返回与BatchRunner相同结构的汇总结果"""
+        started = time.monotonic()
+        completed = self._consolidate_journal() if self.journal_path else {}
+
+        results: List[Optional[Dict[str, Any]]] = [None] * len(self.job_configs)
+        pending: List[int] = []
+        for index, config in enumerate(self.job_configs):
+            finished = completed.get(config['job_id'])
+            if finished:
+                results[index] = {**finished, 'job_id': config['job_id'], 'resumed': True, 'elapsed': 0.0}
+            else:
+                pending.append(index)
+
+        workers, pages_per_worker = plan_shards(len(pending) or 1, self.requested_workers,
+                                                self.pages_per_worker, self.max_memory_mb, self.backend)
+        shards = [[pending[i] for i in shard] for shard in split_jobs(pending, workers)] if pending else []
+        shards = [shard for shard in shards if shard]
+        if shards:
+            self.logger.info(f"分片执行: {len(shards)} 个进程 × 每进程 {pages_per_worker} 个页面，"
+                             f"待执行作业 {len(pending)} 个")
+        else:
+            self.logger.info("全部作业已在上次运行中完成")
+
+        shard_summaries: List[Dict[str, Any]] = []
+        message = ''
+        if shards:
+            loop = asyncio.get_running_loop()
+            # spawn启动的进程不继承父进程的事件循环和浏览器状态
+            context = multiprocessing.get_context('spawn')
+            with ProcessPoolExecutor(max_workers=len(shards), mp_context=context) as pool:
+                futures = [
+                    loop.run_in_executor(
+                        pool, _run_shard, [scale_traffic(self.job_configs[i], len(shards)) for i in shard],
+                        pages_per_worker,
+                        self._seed_shard_journal(number, shard) if self.journal_path else None
+                    )
+                    for number, shard in enumerate(shards)
+                ]
+                outcomes = await asyncio.gather(*futures, return_exceptions=True)
+
+            for shard, outcome in zip(shards, outcomes):
+                if isinstance(outcome, BaseException):
+                    self.logger.error(f"工作进程异常退出: {outcome}")
+                    message = f'工作进程异常退出: {outcome}'
+                    for index in shard:
+                        results[index] = {
+                            'job_id': self.job_configs[index]['job_id'],
+                            'success': False,
+                            'page_url': '',
+                            'page_id': '',
+                            'message': f'工作进程异常退出: {outcome}',
+                            'elapsed': 0.0
+                        }
+                    continue
+
+                shard_summaries.append(outcome)
+                if outcome['message'].startswith('批量执行失败'):
+                    message = outcome['message']
+                for index, job in zip(shard, outcome['jobs']):
+                    results[index] = job
+
+        jobs = [result for result in results if result is not None]
+        elapsed = time.monotonic() - started
+        summary = {
+            'success': False,
+            'total': len(self.job_configs),
+            'succeeded': sum(1 for r in jobs if r['success']),
+            'failed': 0,
+            'skipped': sum(1 for r in jobs if r.get('skipped')),
+            'resumed': sum(1 for r in jobs if r.get('resumed')),
+            'elapsed': round(elapsed, 3),
+            'pages_per_second': 0.0,
+            'workers': len(shards),
+            'pages_per_worker': pages_per_worker,
+            'jobs': jobs,
+            'selector_cache': merge_stats([s['selector_cache'] for s in shard_summaries if s['selector_cache']]),
+            'request_filter': merge_stats([s['request_filter'] for s in shard_summaries if s['request_filter']]),
+            'traffic': merge_stats([s['traffic'] for s in shard_summaries if s.get('traffic')], TRAFFIC_GAUGES),
+            'recycle': merge_stats([s['recycle'] for s in shard_summaries if s.get('recycle')], RECYCLE_GAUGES),
+            'message': message
+        }
+        summary['failed'] = summary['total'] - summary['succeeded']
+        if elapsed > 0:
+            summary['pages_per_second'] = round(summary['succeeded'] / elapsed, 3)
+        summary['success'] = len(jobs) == summary['total'] and summary['failed'] == 0
+        if not summary['message']:
+            summary['message'] = (f"完成 {summary['succeeded']}/{summary['total']} 个页面"
+                                  f"（{summary['workers']} 个进程）")
+        return summary
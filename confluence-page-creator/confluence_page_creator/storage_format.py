@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+"""
+Markdown到Confluence storage格式的流式转换器
+逐行读取 -> 块级事件 -> XHTML片段，全程基于生成器，内存占用与文档长度无关
+"""
+
+import html
+import io
+import re
+from typing import Iterable, Iterator, List, Optional, Tuple, Union
+
+
+# Confluence代码宏支持的语言，其余语言（如mermaid）不设置language参数
+CODE_MACRO_LANGUAGES = {
+    'actionscript3', 'bash', 'c', 'cpp', 'csharp', 'css', 'diff', 'go', 'groovy', 'html',
+    'java', 'javascript', 'js', 'json', 'kotlin', 'perl', 'php', 'powershell', 'python',
+    'ruby', 'rust', 'scala', 'shell', 'sql', 'swift', 'typescript', 'xml', 'yaml'
+}
+
+HEADING_RE = re.compile(r'^(#{1,6})\s+(.*?)\s*#*\s*$')
+FENCE_RE = re.compile(r'^\s*(```|~~~)\s*([\w+-]*)')
+LIST_ITEM_RE = re.compile(r'^(\s*)([-*+]|\d+[.)])\s+(.*)$')
+HR_RE = re.compile(r'^\s*([-*_])(\s*\1){2,}\s*$')
+TABLE_SEPARATOR_RE = re.compile(r'^\s*\|?\s*:?-+:?\s*(\|\s*:?-+:?\s*)*\|?\s*$')
+QUOTE_RE = re.compile(r'^\s*>\s?(.*)$')
+
+INLINE_CODE_RE = re.compile(r'`([^`]+)`')
+BOLD_RE = re.compile(r'\*\*(.+?)\*\*|__(.+?)__')
+# 星号允许词内强调（中文常见），下划线只在词边界生效（避免误伤snake_case）
+ITALIC_RE = re.compile(r'(?<!\*)\*(?![\s*])(.+?)(?<![\s*])\*(?!\*)|(?<![\w_])_(?!\s)(.+?)(?<!\s)_(?![\w_])')
+STRIKE_RE = re.compile(r'~~(.+?)~~')
+LINK_RE = re.compile(r'\[([^\]]+)\]\(([^)\s]+)\)')
+
+Event = Tuple
+
+
+def iter_lines(source: Union[str, Iterable[str]]) -> Iterator[str]:
+    """将字符串、文件对象或行迭代器统一为去掉换行符的行流"""
+    if isinstance(source, str):
+        source = io.StringIO(source)
+    for line in source:
+        yield line.rstrip('\r\n')
+
+
+def render_inline(text: str) -> str:
+    """转换行内格式：代码、加粗、斜体、删除线和链接"""
+    # 先取出行内代码，避免其中的符号被当作格式处理
+    code_spans: List[str] = []
+
+    def stash_code(match):
+        code_spans.append(f"<code>{html.escape(match.group(1), quote=False)}</code>")
+        return f"\x00{len(code_spans) - 1}\x00"
+
+    text = INLINE_CODE_RE.sub(stash_code, text)
+    text = html.escape(text, quote=False)
+    # 文本已转义，链接地址只需再转义引号
+    text = LINK_RE.sub(lambda m: f'<a href="{m.group(2).replace(chr(34), "&quot;")}">{m.group(1)}</a>', text)
+    text = BOLD_RE.sub(lambda m: f"<strong>{m.group(1) or m.group(2)}</strong>", text)
+    text = ITALIC_RE.sub(lambda m: f"<em>{m.group(1) or m.group(2)}</em>", text)
+    text = STRIKE_RE.sub(r'<del>\1</del>', text)
+
+    return re.sub(r'\x00(\d+)\x00', lambda m: code_spans[int(m.group(1))], text)
+
+
+def _split_table_row(line: str) -> List[str]:
+    cells = line.strip()
+    if cells.startswith('|'):
+        cells = cells[1:]
+    if cells.endswith('|'):
+        cells = cells[:-1]
+    return [cell.strip() for cell in cells.split('|')]
+
+
+def iter_events(lines: Iterable[str]) -> Iterator[Event]:
+    """将行流解析为块级事件，只缓冲当前段落和前瞻的一行"""
+    paragraph: List[str] = []
+    list_stack: List[Tuple[int, bool]] = []
+    fence: Optional[str] = None
+    in_table = False
+    in_quote = False
+
+    def flush_paragraph():
+        if paragraph:
+            text = ' '.join(part.strip() for part in paragraph)
+            paragraph.clear()
+            yield ('paragraph', text)
+
+    def close_lists(indent: int = -1):
+        while list_stack and list_stack[-1][0] > indent:
+            yield ('list_end', list_stack.pop()[1])
+
+    def close_blocks():
+        nonlocal in_table, in_quote
+        yield from flush_paragraph()
+        yield from close_lists()
+        if in_table:
+            in_table = False
+            yield ('table_end',)
+        if in_quote:
+            in_quote = False
+            yield ('quote_end',)
+
+    iterator = iter(lines)
+    # 前瞻后需要放回的行
+    pushback: List[str] = []
+
+    while True:
+        if pushback:
+            line = pushback.pop()
+        else:
+            line = next(iterator, None)
+            if line is None:
+                break
+
+        # 代码块内部原样输出
+        if fence:
+            if line.strip().startswith(fence):
+                fence = None
+                yield ('code_end',)
+            else:
+                yield ('code_line', line)
+            continue
+
+        # 表格行：第一行为表头，需要前瞻一行确认分隔行
+        if in_table:
+            if line.strip().startswith('|'):
+                yield ('table_row', _split_table_row(line), False)
+                continue
+            in_table = False
+            yield ('table_end',)
+
+        stripped = line.strip()
+
+        match = FENCE_RE.match(line)
+        if match:
+            yield from close_blocks()
+            fence = match.group(1)
+            yield ('code_start', match.group(2).lower())
+            continue
+
+        if not stripped:
+            yield from flush_paragraph()
+            if in_quote:
+                in_quote = False
+                yield ('quote_end',)
+            continue
+
+        match = HEADING_RE.match(line)
+        if match:
+            yield from close_blocks()
+            yield ('heading', len(match.group(1)), match.group(2))
+            continue
+
+        if HR_RE.match(line):
+            yield from close_blocks()
+            yield ('hr',)
+            continue
+
+        if stripped.startswith('|'):
+            lookahead = next(iterator, None)
+            if lookahead is not None and TABLE_SEPARATOR_RE.match(lookahead):
+                yield from close_blocks()
+                in_table = True
+                yield ('table_start',)
+                yield ('table_row', _split_table_row(line), True)
+                continue
+            # 不是表格，作为普通段落处理，前瞻的一行放回
+            yield from close_lists()
+            paragraph.append(line)
+            if lookahead is not None:
+                pushback.append(lookahead)
+            continue
+
+        match = LIST_ITEM_RE.match(line)
+        if match:
+            yield from flush_paragraph()
+            indent = len(match.group(1).expandtabs(4))
+            ordered = match.group(2)[0].isdigit()
+            yield from close_lists(indent)
+            # 同一层级切换有序/无序时另起列表
+            if list_stack and list_stack[-1][0] == indent and list_stack[-1][1] != ordered:
+                yield ('list_end', list_stack.pop()[1])
+            if not list_stack or list_stack[-1][0] < indent:
+                list_stack.append((indent, ordered))
+                yield ('list_start', ordered)
+            yield ('list_item', match.group(3))
+            continue
+
+        match = QUOTE_RE.match(line)
+        if match:
+            if not in_quote:
+                yield from close_blocks()
+                in_quote = True
+                yield ('quote_start',)
+            yield ('quote_line', match.group(1))
+            continue
+
+        # 普通文本：结束列表后并入段落
+        yield from close_lists()
+        paragraph.append(line)
+
+    if fence:
+        yield ('code_end',)
+    yield from close_blocks()
+
+
+def render_events(events: Iterable[Event], code_macros: bool = True) -> Iterator[str]:
+    """将块级事件渲染为XHTML片段
+
+    code_macros为True时代码块输出为Confluence代码宏（REST API使用），
+    否则输出为<pre>（粘贴到编辑器使用）。
+    """
+    # 每层列表是否有尚未闭合的<li>
+    open_items: List[bool] = []
+
+    for event in events:
+        kind = event[0]
+
+        if kind == 'heading':
+            yield f"<h{event[1]}>{render_inline(event[2])}</h{event[1]}>"
+        elif kind == 'paragraph':
+            yield f"<p>{render_inline(event[1])}</p>"
+        elif kind == 'hr':
+            yield '<hr />'
+        elif kind == 'list_start':
+            # 嵌套列表放在上一层尚未闭合的<li>内
+            open_items.append(False)
+            yield '<ol>' if event[1] else '<ul>'
+        elif kind == 'list_item':
+            if open_items[-1]:
+                yield '</li>'
+            open_items[-1] = True
+            yield f"<li>{render_inline(event[1])}"
+        elif kind == 'list_end':
+            if open_items.pop():
+                yield '</li>'
+            yield '</ol>' if event[1] else '</ul>'
+        elif kind == 'table_start':
+            yield '<table><tbody>'
+        elif kind == 'table_row':
+            tag = 'th' if event[2] else 'td'
+            cells = ''.join(f"<{tag}>{render_inline(cell)}</{tag}>" for cell in event[1])
+            yield f"<tr>{cells}</tr>"
+        elif kind == 'table_end':
+            yield '</tbody></table>'
+        elif kind == 'quote_start':
+            yield '<blockquote>'
+        elif kind == 'quote_line':
+            yield f"<p>{render_inline(event[1])}</p>"
+        elif kind == 'quote_end':
+            yield '</blockquote>'
+        elif kind == 'code_start':
+            language = event[1]
+            if code_macros:
+                yield '<ac:structured-macro ac:name="code">'
+                if language in CODE_MACRO_LANGUAGES:
+                    yield f'<ac:parameter ac:name="language">{language}</ac:parameter>'
+                yield '<ac:plain-text-body><![CDATA['
+                first_line = True
+            else:
+                css_class = f' class="language-{html.escape(language)}"' if language else ''
+                yield f"<pre><code{css_class}>"
+                first_line = True
+        elif kind == 'code_line':
+            prefix = '' if first_line else '\n'
+            first_line = False
+            if code_macros:
+                # CDATA中不能出现"]]>"
+                yield prefix + event[1].replace(']]>', ']]]]><![CDATA[>')
+            else:
+                yield prefix + html.escape(event[1], quote=False)
+        elif kind == 'code_end':
+            yield ']]></ac:plain-text-body></ac:structured-macro>' if code_macros else '</code></pre>'
+
+
+def iter_storage(source: Union[str, Iterable[str]], code_macros: bool = True) -> Iterator[str]:
+    """流式转换：输入字符串或行迭代器，逐片输出storage格式XHTML"""
+    return render_events(iter_events(iter_lines(source)), code_macros=code_macros)
+
+
+def markdown_to_storage(source: Union[str, Iterable[str]], code_macros: bool = True) -> str:
+    """将Markdown转换为完整的storage格式字符串"""
+    return ''.join(iter_storage(source, code_macros=code_macros))
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+页面模板注册表
+从目录加载模板文件（<名称>.md），每个模板只解析编译一次，按mtime失效的LRU缓存
+"""
+
+import os
+import re
+import time
+import threading
+from collections import OrderedDict
+from importlib import resources
+from pathlib import Path
+from typing import Dict, List, Optional, Any, Tuple
+
+
+# 内置模板作为包数据随包安装，通过importlib.resources读取（wheel、--user及zip安装均可用）
+BUILTIN_TEMPLATE_DIR = resources.files(__package__) / 'templates'
+TEMPLATE_SUFFIX = '.md'
+DEFAULT_CACHE_SIZE = 64
+# 同一模板两次检查文件mtime的最小间隔（秒），批量渲染时避免每页都访问文件系统
+DEFAULT_CHECK_INTERVAL = 1.0
+
+PLACEHOLDER_RE = re.compile(r'\{\{\s*(\w+)\s*\}\}')
+
+
+class CompiledTemplate:
+    """编译后的模板：字面量片段与变量名交替排列，渲染时只做拼接"""
+
+    def __init__(self, name: str, source: str):
+        self.name = name
+        self.segments: List[Tuple[bool, str]] = []
+        self.variables = set()
+
+        position = 0
+        for match in PLACEHOLDER_RE.finditer(source):
+            if match.start() > position:
+                self.segments.append((False, source[position:match.start()]))
+            self.segments.append((True, match.group(1)))
+            self.variables.add(match.group(1))
+            position = match.end()
+        if position < len(source):
+            self.segments.append((False, source[position:]))
+
+    def render(self, variables: Dict[str, Any]) -> str:
+        missing = self.variables - variables.keys()
+        if missing:
+            raise ValueError(f"模板 {self.name} 缺少变量: {', '.join(sorted(missing))}")
+        return ''.join(str(variables[value]) if is_variable else value
+                       for is_variable, value in self.segments)
+
+
+class TemplateRegistry:
+    """模板注册表：按顺序搜索模板目录，前面的目录可覆盖内置模板"""
+
+    def __init__(self, template_dirs: Optional[List[str]] = None,
+                 cache_size: int = DEFAULT_CACHE_SIZE, check_interval: float = DEFAULT_CHECK_INTERVAL):
+        dirs = [Path(d).expanduser() for d in (template_dirs or [])]
+        self.template_dirs = dirs + [BUILTIN_TEMPLATE_DIR]
+        self.cache_size = cache_size
+        self.check_interval = check_interval
+        # 名称 -> (路径, mtime, 上次检查时间, 编译结果)
+        self._cache: 'OrderedDict[str, Tuple[Any, float, float, CompiledTemplate]]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def names(self) -> List[str]:
+        """列出所有可用模板名称"""
+        names = set()
+        for template_dir in self.template_dirs:
+            if template_dir.is_dir():
+                names.update(path.name[:-len(TEMPLATE_SUFFIX)] for path in template_dir.iterdir()
+                             if path.name.endswith(TEMPLATE_SUFFIX))
+        return sorted(names)
+
+    def __contains__(self, name: str) -> bool:
+        return self._find(name) is not None
+
+    def _find(self, name: str) -> Optional[Any]:
+        # 模板名不允许包含路径
+        if not name or os.sep in name or '/' in name or name.startswith('.'):
+            return None
+        for template_dir in self.template_dirs:
+            path = template_dir / f'{name}{TEMPLATE_SUFFIX}'
+            if path.is_file():
+                return path
+        return None
+
+    def get(self, name: str) -> CompiledTemplate:
+        """获取编译后的模板，文件未变化时直接使用缓存"""
+        now = time.monotonic()
+
+        with self._lock:
+            cached = self._cache.get(name)
+            if cached and now - cached[2] < self.check_interval:
+                self._cache.move_to_end(name)
+                return cached[3]
+
+            path = self._find(name)
+            if path is None:
+                self._cache.pop(name, None)
+                raise ValueError(f"未知的页面模板: {name}，可选: {', '.join(self.names())}")
+
+            # 内置模板随包安装，不会变化（zip安装时也无法取得mtime）
+            mtime = path.stat().st_mtime if isinstance(path, Path) else 0.0
+            if cached and cached[0] == path and cached[1] == mtime:
+                compiled = cached[3]
+            else:
+                compiled = CompiledTemplate(name, path.read_text(encoding='utf-8').strip())
+
+            self._cache[name] = (path, mtime, now, compiled)
+            self._cache.move_to_end(name)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+            return compiled
+
+    def render(self, name: str, variables: Dict[str, Any]) -> str:
+        """用作业变量渲染模板"""
+        return self.get(name).render(variables)
+
+
+_registries: Dict[Tuple[str, ...], TemplateRegistry] = {}
+
+
+def get_registry(template_dir: Optional[str] = None) -> TemplateRegistry:
+    """获取共享的模板注册表，同一组模板目录在进程内只创建一次"""
+    key = (template_dir,) if template_dir else ()
+    registry = _registries.get(key)
+    if registry is None:
+        registry = _registries.setdefault(key, TemplateRegistry(list(key)))
+    return registry
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+执行追踪
+为工作流步骤和选择器等待记录带单调时钟时间戳的span，按JSON Lines写入可配置的输出
+"""
+
+import asyncio
+import atexit
+import contextvars
+import functools
+import json
+import sys
+import threading
+import time
+import uuid
+from contextlib import asynccontextmanager
+from typing import Dict, List, Optional, Any
+
+
+class Span:
+    """一次计时操作：工作流步骤（step）或等待（wait）"""
+
+    __slots__ = ('job_id', 'step', 'kind', 'parent', 'start', 'end', 'outcome', 'retries', 'error', 'attrs')
+
+    def __init__(self, job_id: str, step: str, kind: str, parent: Optional[str], attrs: Dict[str, Any]):
+        self.job_id = job_id
+        self.step = step
+        self.kind = kind
+        self.parent = parent
+        self.start = time.monotonic()
+        self.end = self.start
+        self.outcome = 'ok'
+        self.retries = retry_attempt.get()
+        self.error = ''
+        self.attrs = attrs
+
+    @property
+    def duration(self) -> float:
+        return self.end - self.start
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = {
+            'job_id': self.job_id,
+            'step': self.step,
+            'kind': self.kind,
+            'parent': self.parent,
+            'start': round(self.start, 6),
+            'end': round(self.end, 6),
+            'duration': round(self.duration, 6),
+            'outcome': self.outcome,
+            'retries': self.retries
+        }
+        if self.error:
+            data['error'] = self.error
+        data.update(self.attrs)
+        return data
+
+
+class JsonLinesSink:
+    """线程安全的JSON Lines输出，"-"表示标准错误输出"""
+
+    def __init__(self, target: str):
+        self.target = target
+        if target == '-':
+            self._stream = sys.stderr
+        else:
+            self._stream = open(target, 'a', encoding='utf-8')
+        self._lock = threading.Lock()
+
+    def write(self, record: Dict[str, Any]):
+        line = json.dumps(record, ensure_ascii=False) + '\n'
+        with self._lock:
+            self._stream.write(line)
+            self._stream.flush()
+
+    def close(self):
+        if self._stream is not sys.stderr:
+            self._stream.close()
+
+
+_sinks: Dict[str, JsonLinesSink] = {}
+_sinks_lock = threading.Lock()
+
+
+def get_sink(target: str) -> JsonLinesSink:
+    """同一输出目标在进程内共享一个sink（批量模式下多个作业写入同一文件）"""
+    with _sinks_lock:
+        sink = _sinks.get(target)
+        if sink is None:
+            sink = _sinks[target] = JsonLinesSink(target)
+        return sink
+
+
+@atexit.register
+def _close_sinks():
+    for sink in _sinks.values():
+        sink.close()
+
+
+# 当前正在执行的span，用于记录嵌套关系
+_current_span: contextvars.ContextVar = contextvars.ContextVar('current_span', default=None)
+
+# 当前重试次数（由重试策略设置），新建的span记录该值
+retry_attempt: contextvars.ContextVar = contextvars.ContextVar('retry_attempt', default=0)
+
+
+class Tracer:
+    """按作业记录span；未配置输出时只在内存中汇总步骤耗时"""
+
+    def __init__(self, job_id: Optional[str] = None, sink: Optional[JsonLinesSink] = None):
+        self.job_id = job_id or uuid.uuid4().hex[:12]
+        self.sink = sink
+        self.spans: List[Span] = []
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> 'Tracer':
+        """根据配置创建追踪器，trace_sink为JSON Lines文件路径或"-"（标准错误输出）"""
+        target = config.get('trace_sink')
+        return cls(
+            job_id=str(config['job_id']) if config.get('job_id') else None,
+            sink=get_sink(target) if target else None
+        )
+
+    @asynccontextmanager
+    async def span(self, step: str, kind: str = 'step', **attrs):
+        """计时一个操作，异常时记录失败并继续抛出"""
+        parent = _current_span.get()
+        span = Span(self.job_id, step, kind, parent.step if parent else None, attrs)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.outcome = 'cancelled' if isinstance(e, asyncio.CancelledError) else 'error'
+            span.error = str(e)[:200]
+            raise
+        finally:
+            span.end = time.monotonic()
+            _current_span.reset(token)
+            self.spans.append(span)
+            if self.sink:
+                self.sink.write(span.to_dict())
+
+    def step_latency(self) -> Dict[str, float]:
+        """各工作流步骤耗时（秒），同名步骤累加"""
+        latency: Dict[str, float] = {}
+        for span in self.spans:
+            if span.kind == 'step':
+                latency[span.step] = latency.get(span.step, 0.0) + span.duration
+        return {step: round(seconds, 3) for step, seconds in latency.items()}
+
+
+def traced_step(step: str):
+    """将异步方法包装为工作流步骤span，追踪器取自self.tracer"""
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(self, *args, **kwargs):
+            async with self.tracer.span(step):
+                return await func(self, *args, **kwargs)
+        return wrapper
+    return decorator
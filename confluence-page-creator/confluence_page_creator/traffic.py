@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+Confluence流量控制
+同一站点的所有请求（页面导航、发布和REST API调用）共用一个控制器：
+令牌桶限制请求速率，遵守Retry-After暂停发送，并按延迟和错误率以AIMD（加性增、乘性减）调整并发上限
+"""
+
+import asyncio
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional, Any
+
+# 服务端限流或过载的状态码
+THROTTLE_STATUS_CODES = {429, 503}
+
+DEFAULT_SETTINGS = {
+    'rate': None,               # 每秒请求数，None表示不限速
+    'burst': 10,                # 令牌桶容量
+    'initial_concurrency': 8,
+    'min_concurrency': 1,
+    'max_concurrency': 32,
+    'latency_target': 2.0,      # 平滑延迟超过该值（秒）时降低并发
+    'error_threshold': 0.2,     # 平滑错误率超过该值时降低并发
+    'decrease_factor': 0.5
+}
+
+# stats()中的瞬时值（其余为累计计数），合并多个进程的统计时取平均而不是相加
+GAUGES = ('concurrency_limit', 'rate', 'latency_ewma', 'error_rate')
+
+# 延迟和错误率的指数平滑系数
+EWMA_ALPHA = 0.2
+# 等待空闲并发槽位时的异步轮询间隔（秒）
+ASYNC_POLL_INTERVAL = 0.02
+
+
+class ThrottledError(Exception):
+    """页面导航或发布被服务端限流（429/503）"""
+
+    def __init__(self, status_code: int, retry_after: Optional[float] = None):
+        super().__init__(f"Confluence限流 {status_code}" +
+                         (f"，Retry-After {retry_after:.1f}s" if retry_after is not None else ''))
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """解析Retry-After头（秒数或HTTP日期），无法解析时返回None"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class TrafficController:
+    """线程安全的流量控制器，供事件循环中的浏览器操作和线程中的REST请求共用"""
+
+    def __init__(self, rate: Optional[float] = None, burst: int = 10, initial_concurrency: int = 8,
+                 min_concurrency: int = 1, max_concurrency: int = 32, latency_target: float = 2.0,
+                 error_threshold: float = 0.2, decrease_factor: float = 0.5):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.min_concurrency = max(1, min_concurrency)
+        self.max_concurrency = max(self.min_concurrency, max_concurrency)
+        self.limit = float(min(max(initial_concurrency, self.min_concurrency), self.max_concurrency))
+        self.latency_target = latency_target
+        self.error_threshold = error_threshold
+        self.decrease_factor = decrease_factor
+
+        self.in_flight = 0
+        self._tokens = float(self.burst)
+        self._refilled = time.monotonic()
+        self._paused_until = 0.0
+        self._last_decrease = 0.0
+        self._cond = threading.Condition()
+
+        self.latency_ewma: Optional[float] = None
+        self.error_ewma = 0.0
+        self.counters = {'requests': 0, 'throttled': 0, 'errors': 0, 'increases': 0, 'decreases': 0}
+        self.waited = 0.0
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> Optional['TrafficController']:
+        """traffic为false时不做流量控制，为字典时覆盖DEFAULT_SETTINGS中的参数"""
+        setting = config.get('traffic', {})
+        if setting is False:
+            return None
+        if not isinstance(setting, dict):
+            raise ValueError(f"traffic配置必须为字典或false: {setting}")
+        unknown = set(setting) - set(DEFAULT_SETTINGS)
+        if unknown:
+            raise ValueError(f"未知的traffic参数: {', '.join(sorted(unknown))}")
+        return cls(**{**DEFAULT_SETTINGS, **setting})
+
+    def _try_acquire(self, now: float) -> Optional[float]:
+        """尝试占用一个槽位：成功返回0，需要等待时返回等待秒数（None表示等待其他请求完成）"""
+        if now < self._paused_until:
+            return self._paused_until - now
+        if self.in_flight >= int(self.limit):
+            return None
+
+        if self.rate:
+            self._tokens = min(self.burst, self._tokens + (now - self._refilled) * self.rate)
+            self._refilled = now
+            if self._tokens < 1:
+                return (1 - self._tokens) / self.rate
+            self._tokens -= 1
+
+        self.in_flight += 1
+        self.counters['requests'] += 1
+        return 0.0
+
+    def acquire(self):
+        """阻塞直到可以发送请求（在线程中调用）"""
+        started = time.monotonic()
+        with self._cond:
+            while True:
+                wait = self._try_acquire(time.monotonic())
+                if wait == 0:
+                    break
+                self._cond.wait(wait)
+            self.waited += time.monotonic() - started
+
+    async def acquire_async(self):
+        """等待直到可以发送请求，不阻塞事件循环"""
+        started = time.monotonic()
+        while True:
+            with self._cond:
+                wait = self._try_acquire(time.monotonic())
+                if wait == 0:
+                    self.waited += time.monotonic() - started
+                    return
+            await asyncio.sleep(ASYNC_POLL_INTERVAL if wait is None else wait)
+
+    def release(self, latency: Optional[float], status: Optional[int] = None, error: bool = False,
+                retry_after: Optional[float] = None):
+        """请求完成：记录延迟和结果，按AIMD调整并发上限
+
+        latency为None时不计入平滑延迟（如流式上传，耗时取决于请求体大小而不是服务端拥塞），
+        限流和错误照常处理
+        """
+        with self._cond:
+            was_saturated = self.in_flight >= int(self.limit)
+            self.in_flight -= 1
+            now = time.monotonic()
+
+            throttled = status in THROTTLE_STATUS_CODES
+            failed = error or throttled or (status is not None and status >= 500)
+            if latency is not None:
+                self.latency_ewma = latency if self.latency_ewma is None else \
+                    EWMA_ALPHA * latency + (1 - EWMA_ALPHA) * self.latency_ewma
+            self.error_ewma = EWMA_ALPHA * float(failed) + (1 - EWMA_ALPHA) * self.error_ewma
+            if throttled:
+                self.counters['throttled'] += 1
+            elif failed:
+                self.counters['errors'] += 1
+
+            if throttled and retry_after is None:
+                retry_after = 1.0
+            if retry_after:
+                self._paused_until = max(self._paused_until, now + retry_after)
+
+            congested = throttled or self.error_ewma > self.error_threshold or \
+                (self.latency_ewma or 0.0) > self.latency_target
+            if congested:
+                # 同一批并发请求的拥塞信号只减一次（间隔至少一个平滑延迟）
+                if now - self._last_decrease >= (self.latency_ewma or 0):
+                    self.limit = max(self.min_concurrency, self.limit * self.decrease_factor)
+                    self._last_decrease = now
+                    self.counters['decreases'] += 1
+            elif was_saturated and self.limit < self.max_concurrency:
+                # 只有并发上限确实成为瓶颈时才增加，每一轮（limit个成功请求）约加1
+                self.limit = min(self.max_concurrency, self.limit + 1 / self.limit)
+                self.counters['increases'] += 1
+
+            self._cond.notify_all()
+
+    @contextmanager
+    def request(self):
+        """同步请求上下文：调用方通过返回的字典设置status和retry_after，异常视为错误；
+        把sample_latency设为False时本次耗时不计入平滑延迟"""
+        self.acquire()
+        outcome: Dict[str, Any] = {'status': None, 'retry_after': None, 'sample_latency': True}
+        started = time.monotonic()
+        error = False
+        try:
+            yield outcome
+        except Exception:
+            error = True
+            raise
+        finally:
+            latency = time.monotonic() - started if outcome['sample_latency'] else None
+            self.release(latency, outcome['status'], error, outcome['retry_after'])
+
+    @asynccontextmanager
+    async def request_async(self):
+        """异步请求上下文，用法同request"""
+        await self.acquire_async()
+        outcome: Dict[str, Any] = {'status': None, 'retry_after': None, 'sample_latency': True}
+        started = time.monotonic()
+        error = False
+        try:
+            yield outcome
+        except Exception:
+            error = True
+            raise
+        finally:
+            latency = time.monotonic() - started if outcome['sample_latency'] else None
+            self.release(latency, outcome['status'], error, outcome['retry_after'])
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                'concurrency_limit': int(self.limit),
+                'rate': self.rate,
+                'latency_ewma': round(self.latency_ewma or 0.0, 3),
+                'error_rate': round(self.error_ewma, 3),
+                'waited': round(self.waited, 3),
+                **self.counters
+            }
+
+
+@asynccontextmanager
+async def throttled(controller: Optional[TrafficController]):
+    """经流量控制执行一次异步操作；controller为None（traffic: false）时直接执行"""
+    if controller is None:
+        yield {'status': None, 'retry_after': None, 'sample_latency': True}
+        return
+    async with controller.request_async() as outcome:
+        yield outcome
+
+
+_controllers: Dict[str, TrafficController] = {}
+_controllers_lock = threading.Lock()
+
+
+def get_controller(config: Dict[str, Any]) -> Optional[TrafficController]:
+    """获取站点共享的流量控制器，同一confluence_url在进程内只创建一次（参数以首次创建时为准）"""
+    if config.get('traffic', {}) is False:
+        return None
+    key = config['confluence_url'].rstrip('/')
+    with _controllers_lock:
+        controller = _controllers.get(key)
+        if controller is None:
+            controller = _controllers[key] = TrafficController.from_config(config)
+        return controller
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+页面树批量创建
+清单中的tree为嵌套的页面节点（children为子页面），父页面创建成功后立即把新页面ID作为子页面的parent_page_id，
+并发创建其子页面；不同分支互不等待，整棵树的耗时约为 深度 × 单页耗时
+"""
+
+import asyncio
+from typing import Dict, List, Optional, Any, Tuple
+
+from .batch import BatchRunner
+
+
+def flatten_tree(nodes: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], List[Optional[int]]]:
+    """按先序遍历展开页面树，返回作业列表和每个作业的父作业下标（根节点为None）
+
+    未指定id的节点按位置编号，如 "2"、"2.1"、"2.1.3"
+    """
+    jobs: List[Dict[str, Any]] = []
+    parents: List[Optional[int]] = []
+
+    def visit(children: Any, parent: Optional[int], prefix: str, depth: int):
+        if not isinstance(children, list):
+            raise ValueError(f"页面树的children必须为列表: {children}")
+        for position, node in enumerate(children, start=1):
+            if not isinstance(node, dict):
+                raise ValueError(f"页面树节点无效: {node}")
+            job = {key: value for key, value in node.items() if key != 'children'}
+            job.setdefault('id', f"{prefix}{position}")
+            job['tree_depth'] = depth
+            index = len(jobs)
+            jobs.append(job)
+            parents.append(parent)
+            visit(node.get('children') or [], index, f"{job['id']}.", depth + 1)
+
+    visit(nodes, None, '', 0)
+    return jobs, parents
+
+
+class TreeRunner(BatchRunner):
+    """页面树执行器：复用批量执行器的共享会话和Page池，子页面在父页面创建成功后调度"""
+
+    def __init__(self, manifest: Dict[str, Any], journal=None):
+        jobs, self.parents = flatten_tree(manifest.get('tree') or [])
+        if not jobs:
+            raise ValueError("清单缺少页面树: tree")
+        super().__init__({**manifest, 'jobs': jobs}, journal=journal)
+
+        self.children: List[List[int]] = [[] for _ in jobs]
+        for index, parent in enumerate(self.parents):
+            if parent is not None:
+                self.children[parent].append(index)
+
+    def _descendants(self, index: int) -> List[int]:
+        result = []
+        for child in self.children[index]:
+            result.append(child)
+            result.extend(self._descendants(child))
+        return result
+
+    async def _run_jobs(self, session: Optional[asyncio.Future]) -> List[Dict[str, Any]]:
+        """从根节点开始，每个节点完成后立即并发调度其子节点，结果按先序排列"""
+        results: List[Optional[Dict[str, Any]]] = [None] * len(self.job_configs)
+
+        async def run_node(index: int):
+            config = self.job_configs[index]
+            result = await self._run_job(config, session)
+            parent = self.parents[index]
+            result['parent_job_id'] = self.job_configs[parent]['job_id'] if parent is not None else None
+            result['depth'] = config['tree_depth']
+            results[index] = result
+
+            if result['success'] and result['page_id']:
+                for child in self.children[index]:
+                    self.job_configs[child]['parent_page_id'] = result['page_id']
+                    # 清单defaults中的父页面路径只用于根页面
+                    self.job_configs[child].pop('parent_page_path', None)
+                await asyncio.gather(*[run_node(child) for child in self.children[index]])
+                return
+
+            # 父页面未创建成功时不创建其子树
+            for descendant in self._descendants(index):
+                descendant_config = self.job_configs[descendant]
+                results[descendant] = {
+                    'job_id': descendant_config['job_id'],
+                    'success': False,
+                    'page_url': '',
+                    'page_id': '',
+                    'message': f"父页面 {config['job_id']} 未创建，已跳过",
+                    'elapsed': 0.0,
+                    'parent_job_id': self.job_configs[self.parents[descendant]]['job_id'],
+                    'depth': descendant_config['tree_depth']
+                }
+
+        roots = [index for index, parent in enumerate(self.parents) if parent is None]
+        tasks = [asyncio.ensure_future(run_node(index)) for index in roots]
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+        return results
@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+"""
+声明式工作流
+从skill.yaml的workflow读取步骤定义，按depends_on构成的依赖图调度：依赖全部完成的步骤立即开始，
+互不依赖的步骤并发执行；步骤返回False时停止工作流，always步骤（如清理资源）总是在最后执行。
+执行结束后按实际耗时计算关键路径
+"""
+
+import asyncio
+import importlib
+import threading
+import time
+from importlib import resources
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Set, Any
+
+import yaml
+
+
+# 安装时skill.yaml作为包数据复制到包内，通过importlib.resources读取；源码目录中直接使用技能根目录的skill.yaml
+SKILL_FILE = resources.files(__package__) / 'skill.yaml'
+if not SKILL_FILE.is_file():
+    SKILL_FILE = Path(__file__).resolve().parent.parent / 'skill.yaml'
+
+# 自定义步骤动作：名称 -> async func(target)
+_actions: Dict[str, Callable[[Any], Awaitable[Any]]] = {}
+
+
+def register_action(name: str, func: Callable[[Any], Awaitable[Any]]):
+    """注册自定义步骤动作，工作流中以action: <name>引用，调用时传入执行对象（页面创建器）"""
+    _actions[name] = func
+
+
+def resolve_action(target: Any, action: str) -> Callable[[], Awaitable[Any]]:
+    """按注册表、"模块:函数"、执行对象方法的顺序查找步骤动作"""
+    if action in _actions:
+        func = _actions[action]
+        return lambda: func(target)
+
+    if ':' in action:
+        module_name, attr = action.split(':', 1)
+        func = getattr(importlib.import_module(module_name), attr)
+        return lambda: func(target)
+
+    method = getattr(target, action, None)
+    if method is None:
+        raise ValueError(f"未知的工作流动作: {action}")
+    return method
+
+
+class WorkflowStep:
+    """工作流步骤定义"""
+
+    def __init__(self, name: str, action: str, depends_on: Optional[List[str]] = None,
+                 always: bool = False, description: str = ''):
+        self.name = name
+        self.action = action
+        self.depends_on = list(depends_on or [])
+        self.always = always
+        self.description = description
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'WorkflowStep':
+        if not isinstance(data, dict) or not data.get('name') or not data.get('action'):
+            raise ValueError(f"工作流步骤缺少name或action: {data}")
+        depends_on = data.get('depends_on') or []
+        if isinstance(depends_on, str):
+            depends_on = [depends_on]
+        return cls(data['name'], data['action'], depends_on, bool(data.get('always', False)),
+                   data.get('description', ''))
+
+
+class WorkflowReport:
+    """一次工作流执行的结果：各步骤时间、停止原因和关键路径"""
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.timings: Dict[str, Dict[str, Any]] = {}
+        self.stopped_by: Optional[str] = None
+        self.critical_path: List[str] = []
+
+    def record(self, name: str, start: float, end: float, outcome: str):
+        self.timings[name] = {'start': start - self.started, 'end': end - self.started, 'outcome': outcome}
+
+    @property
+    def critical_path_latency(self) -> float:
+        """关键路径上各步骤的耗时之和"""
+        return sum(self.timings[name]['end'] - self.timings[name]['start'] for name in self.critical_path)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'steps': {
+                name: {
+                    'start': round(timing['start'], 3),
+                    'duration': round(timing['end'] - timing['start'], 3),
+                    'outcome': timing['outcome']
+                }
+                for name, timing in self.timings.items()
+            },
+            'stopped_by': self.stopped_by,
+            'critical_path': self.critical_path,
+            'critical_path_latency': round(self.critical_path_latency, 3)
+        }
+
+
+class Workflow:
+    """按依赖图并发执行的工作流"""
+
+    def __init__(self, steps: List[WorkflowStep]):
+        self.steps = steps
+        self.by_name = {step.name: step for step in steps}
+        self._validate()
+
+    def _validate(self):
+        if len(self.by_name) != len(self.steps):
+            raise ValueError("工作流步骤名称重复")
+
+        for step in self.steps:
+            for dependency in step.depends_on:
+                if dependency not in self.by_name:
+                    raise ValueError(f"步骤 {step.name} 依赖不存在的步骤: {dependency}")
+                if self.by_name[dependency].always:
+                    raise ValueError(f"步骤 {step.name} 不能依赖always步骤: {dependency}")
+
+        self.order = self._topological_order()
+
+    def _topological_order(self) -> List[WorkflowStep]:
+        """按依赖排序的步骤列表，存在循环依赖时报错"""
+        order: List[WorkflowStep] = []
+        remaining = {step.name: set(step.depends_on) for step in self.steps}
+        while remaining:
+            ready = [name for name, deps in remaining.items() if not deps]
+            if not ready:
+                raise ValueError(f"工作流存在循环依赖: {', '.join(sorted(remaining))}")
+            for name in ready:
+                del remaining[name]
+                order.append(self.by_name[name])
+            for deps in remaining.values():
+                deps.difference_update(ready)
+        return order
+
+    def resumable(self, completed: Iterable[str], restorable: Callable[[WorkflowStep], bool]) -> Set[str]:
+        """恢复运行时可以跳过的已完成步骤
+
+        结果可以从执行日志恢复的步骤直接跳过；结果只在进程内有效的步骤（如ui后端的prepare）
+        只有在依赖它的步骤都已跳过时才跳过，否则重新执行
+        """
+        completed = set(completed)
+        skipped: Set[str] = set()
+        for step in reversed(self.order):
+            if step.always or step.name not in completed:
+                continue
+            dependents = [other.name for other in self.steps if step.name in other.depends_on]
+            if restorable(step) or all(name in skipped for name in dependents):
+                skipped.add(step.name)
+        return skipped
+
+    @classmethod
+    def from_list(cls, steps: List[Dict[str, Any]]) -> 'Workflow':
+        if not isinstance(steps, list) or not steps:
+            raise ValueError("工作流步骤列表为空")
+        return cls([WorkflowStep.from_dict(step) for step in steps])
+
+    @classmethod
+    def from_file(cls, path: Any) -> 'Workflow':
+        """从YAML文件（skill.yaml或只含workflow的文件）加载，path为路径或包内资源"""
+        path = Path(path) if isinstance(path, str) else path
+        if not path.is_file():
+            raise ValueError(f"工作流文件不存在: {path}")
+        with path.open('r', encoding='utf-8') as f:
+            data = yaml.safe_load(f) or {}
+        return cls.from_list(data.get('workflow') if isinstance(data, dict) else data)
+
+    async def run(self, target: Any, skip: Iterable[str] = (),
+                  on_step_done: Optional[Callable[[WorkflowStep], Awaitable[Any]]] = None) -> WorkflowReport:
+        """执行工作流，步骤出错时取消其余步骤、执行always步骤后抛出
+
+        skip中的步骤（恢复运行时已完成的步骤）视为已完成，不再执行；
+        on_step_done在每个步骤成功完成后、其后续步骤开始前等待执行（如写入执行日志）
+        """
+        report = WorkflowReport()
+        skip = set(skip)
+        main_steps = [step for step in self.steps if not step.always and step.name not in skip]
+        actions = {step.name: resolve_action(target, step.action) for step in self.steps}
+
+        done: set = set()
+        for step in self.steps:
+            if step.name in skip and not step.always:
+                now = time.monotonic()
+                report.record(step.name, now, now, 'resumed')
+                done.add(step.name)
+        running: Dict[asyncio.Future, WorkflowStep] = {}
+        pending = list(main_steps)
+        error: Optional[BaseException] = None
+
+        def stop(step: WorkflowStep):
+            # 在步骤所在的任务中立即取消其余步骤，不等调度循环被唤醒
+            report.stopped_by = step.name
+            pending.clear()
+            current = asyncio.current_task()
+            for task in running:
+                if task is not current:
+                    task.cancel()
+
+        async def run_step(step: WorkflowStep):
+            start = time.monotonic()
+            outcome = 'ok'
+            try:
+                result = await actions[step.name]()
+                if result is False and not step.always and report.stopped_by is None:
+                    stop(step)
+                elif result is not False and not step.always and on_step_done:
+                    await on_step_done(step)
+                return result
+            except asyncio.CancelledError:
+                outcome = 'cancelled'
+                raise
+            except Exception:
+                outcome = 'error'
+                raise
+            finally:
+                report.record(step.name, start, time.monotonic(), outcome)
+
+        try:
+            while pending or running:
+                for step in [step for step in pending if done.issuperset(step.depends_on)]:
+                    pending.remove(step)
+                    running[asyncio.ensure_future(run_step(step))] = step
+
+                finished, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for task in finished:
+                    step = running.pop(task)
+                    if task.cancelled():
+                        continue
+                    if task.exception() is not None:
+                        raise task.exception()
+                    done.add(step.name)
+
+                if report.stopped_by:
+                    break
+
+        except BaseException as e:
+            error = e
+
+        finally:
+            # 停止、出错或被取消时取消仍在执行的步骤
+            for task in running:
+                task.cancel()
+            await asyncio.gather(*running, return_exceptions=True)
+
+            for step in self.steps:
+                if step.always:
+                    try:
+                        await run_step(step)
+                    except Exception as e:
+                        error = error or e
+
+        report.critical_path = self.critical_path(report)
+        if error is not None:
+            raise error
+        return report
+
+    def critical_path(self, report: WorkflowReport) -> List[str]:
+        """从最后结束的步骤沿最晚结束的依赖回溯，得到决定总耗时的步骤链"""
+        timings = report.timings
+        finished = [step for step in self.steps if step.name in timings and not step.always]
+        if not finished:
+            return []
+
+        current = max(finished, key=lambda step: timings[step.name]['end'])
+        path = [current.name]
+        while True:
+            dependencies = [name for name in current.depends_on if name in timings]
+            if not dependencies:
+                break
+            current = self.by_name[max(dependencies, key=lambda name: timings[name]['end'])]
+            path.append(current.name)
+        return list(reversed(path))
+
+
+_workflows: Dict[str, Workflow] = {}
+_workflows_lock = threading.Lock()
+
+
+def get_workflow(source: Any = None) -> Workflow:
+    """获取工作流：source为步骤列表、YAML文件路径或None（skill.yaml），文件在进程内只解析一次"""
+    if isinstance(source, list):
+        return Workflow.from_list(source)
+
+    path = Path(source).expanduser() if source else SKILL_FILE
+    with _workflows_lock:
+        workflow = _workflows.get(str(path))
+        if workflow is None:
+            workflow = _workflows[str(path)] = Workflow.from_file(path)
+        return workflow
@@ -0,0 +1,557 @@
+#!/usr/bin/env python3
+"""
+本地Confluence替身服务
+实现技能用到的REST API子集（创建、查询、按标题查找、更新页面，列出和上传附件）和网页界面（登录表单、创建按钮、标题输入框、类ProseMirror编辑器、发布按钮），
+用于离线测试和基准测试，数据只保存在内存中
+"""
+
+import argparse
+import base64
+import hashlib
+import html
+import json
+import re
+import secrets
+import threading
+import time
+from http.cookies import SimpleCookie
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Any
+from urllib.parse import parse_qs, urlparse
+
+
+BASE_PATH = '/wiki'
+SESSION_COOKIE = 'mock.session.token'
+MOCK_VERSION = 'mock-1.0'
+
+# 静态资源内容：1x1透明PNG，以及用于占位的字体数据（浏览器解析失败时回退到系统字体）
+MOCK_PNG = base64.b64decode(
+    'iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mNkYPhfDwAChwGA60e6kgAAAABJRU5ErkJggg=='
+)
+MOCK_FONT = b'wOF2' + bytes(2048)
+
+PAGE_SHELL = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<meta name="ajs-version-number" content="{version}">
+<title>{title}</title>
+<style>
+@font-face {{ font-family: "Mock Sans"; src: url("{base_path}/s/fonts/mock-sans.woff2") format("woff2"); }}
+body {{ font-family: "Mock Sans", sans-serif; }}
+</style>
+</head>
+<body>
+{body}
+<script>const BASE = {base};</script>
+{script}
+</body>
+</html>"""
+
+LOGIN_BODY = """
+<form id="login-form" onsubmit="return false">
+  <input id="username" name="username" placeholder="Email">
+  <div id="password-step" style="display: none">
+    <input id="password" name="password" type="password">
+  </div>
+  <button id="login-submit" type="button">Continue</button>
+</form>"""
+
+LOGIN_SCRIPT = """<script>
+document.getElementById('login-submit').addEventListener('click', async () => {
+  const step = document.getElementById('password-step');
+  if (step.style.display === 'none') {
+    step.style.display = 'block';
+    return;
+  }
+  const response = await fetch(BASE + '/login', {
+    method: 'POST',
+    headers: {'Content-Type': 'application/json'},
+    body: JSON.stringify({
+      username: document.getElementById('username').value,
+      password: document.getElementById('password').value
+    })
+  });
+  if (response.ok) {
+    location.reload();
+  }
+});
+</script>"""
+
+SPACE_BODY = """
+<nav>
+  <img alt="" src="/wiki/s/images/logo.png" width="24" height="24">
+  <img alt="" src="/wiki/gateway/api/avatar/default" width="24" height="24">
+  <span data-testid="app-navigation-profile">{username}</span>
+  <button aria-label="Create" data-testid="create-button"
+          onclick="location.href = BASE + '/spaces/{space_key}/pages/create?parentId={parent_id}'">Create</button>
+</nav>
+<main><h1>{heading}</h1>{content}</main>"""
+
+EDITOR_BODY = """
+<nav>
+  <img alt="" src="/wiki/gateway/api/avatar/default" width="24" height="24">
+  <span data-testid="app-navigation-profile">{username}</span>
+</nav>
+<input aria-label="Title" data-testid="title-input" name="title" placeholder="Title">
+<div class="ProseMirror" contenteditable="true" data-testid="editor-content"><p></p></div>
+<button aria-label="Publish" data-testid="publish-button">Publish</button>"""
+
+EDITOR_SCRIPT = """<script>
+const editor = document.querySelector('.ProseMirror');
+editor.addEventListener('paste', (event) => {
+  const markup = event.clipboardData.getData('text/html');
+  if (markup) {
+    event.preventDefault();
+    editor.innerHTML = markup;
+  }
+});
+document.querySelector('[aria-label="Publish"]').addEventListener('click', async () => {
+  const parentId = new URLSearchParams(location.search).get('parentId');
+  const response = await fetch(BASE + '/rest/api/content', {
+    method: 'POST',
+    headers: {'Content-Type': 'application/json'},
+    body: JSON.stringify({
+      type: 'page',
+      title: document.querySelector('[aria-label="Title"]').value,
+      space: {key: '{space_key}'},
+      ancestors: parentId ? [{id: parentId}] : [],
+      body: {storage: {value: editor.innerHTML, representation: 'storage'}}
+    })
+  });
+  const page = await response.json();
+  location.href = BASE + '/spaces/{space_key}/pages/' + page.id + '/' + encodeURIComponent(page.title);
+});
+</script>"""
+
+
+def add_server_attributes(storage: str) -> str:
+    """模拟Confluence Cloud保存页面时添加的属性：宏的schema-version和macro-id、表格的布局和local-id"""
+    def macro(match: re.Match) -> str:
+        return f'{match.group(0)} ac:schema-version="1" ac:macro-id="{secrets.token_hex(8)}"'
+
+    def table(match: re.Match) -> str:
+        return f'<table data-layout="default" data-table-width="760" ac:local-id="{secrets.token_hex(4)}"'
+
+    # 已有这些属性的元素（更新时保留的原始标记）不重复添加
+    storage = re.sub(r'<ac:structured-macro ac:name="[^"]*"(?![^>]*ac:macro-id)', macro, storage)
+    return re.sub(r'<table(?=[\s>])(?![^>]*data-layout)', table, storage)
+
+
+class MockConfluenceStore:
+    """内存中的页面存储；server_attributes为True时像Confluence Cloud一样在保存的正文中添加属性"""
+
+    def __init__(self, server_attributes: bool = False):
+        self.server_attributes = server_attributes
+        self.pages: Dict[str, Dict[str, Any]] = {}
+        # 页面ID -> 附件列表（只保存大小和SHA-256，不保存文件内容）
+        self.attachments: Dict[str, List[Dict[str, Any]]] = {}
+        self._next_id = 100000
+        self._lock = threading.Lock()
+
+    def create_page(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        with self._lock:
+            self._next_id += 1
+            page_id = str(self._next_id)
+            page = {
+                'id': page_id,
+                'type': payload.get('type', 'page'),
+                'title': payload['title'],
+                'space': {'key': payload['space']['key']},
+                'ancestors': payload.get('ancestors', []),
+                'body': {'storage': self._stored(payload['body']['storage'])},
+                'version': {'number': 1},
+                'labels': [label['name'] for label in payload.get('metadata', {}).get('labels', [])]
+            }
+            self.pages[page_id] = page
+            return page
+
+    def update_page(self, page_id: str, payload: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """更新页面，版本号必须为当前版本+1，否则返回None（版本冲突）"""
+        with self._lock:
+            page = self.pages[page_id]
+            if payload['version']['number'] != page['version']['number'] + 1:
+                return None
+            page['title'] = payload['title']
+            page['body'] = {'storage': self._stored(payload['body']['storage'])}
+            page['version'] = {'number': payload['version']['number']}
+            return page
+
+    def _stored(self, storage: Dict[str, Any]) -> Dict[str, Any]:
+        if not self.server_attributes:
+            return storage
+        return {**storage, 'value': add_server_attributes(storage['value'])}
+
+    def find_pages(self, space_key: Optional[str], title: Optional[str]) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [page for page in self.pages.values()
+                    if (space_key is None or page['space']['key'] == space_key)
+                    and (title is None or page['title'] == title)]
+
+    def ancestors(self, page: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """页面的全部祖先（从顶层页面开始），与REST API的expand=ancestors一致"""
+        chain = []
+        parent_ids = [item['id'] for item in page.get('ancestors', [])[-1:]]
+        while parent_ids and parent_ids[0] in self.pages and len(chain) < 100:
+            parent = self.pages[parent_ids[0]]
+            chain.insert(0, {'id': parent['id'], 'type': parent['type'], 'title': parent['title']})
+            parent_ids = [item['id'] for item in parent.get('ancestors', [])[-1:]]
+        if parent_ids and parent_ids[0] not in self.pages:
+            # 父页面不在替身服务中（测试中直接指定的父页面ID）
+            chain.insert(0, {'id': parent_ids[0], 'type': 'page', 'title': ''})
+        return chain
+
+    def save_attachment(self, page_id: str, upload: Dict[str, Any],
+                        attachment_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """新建附件或上传新版本；新建同名附件或附件不存在时返回None"""
+        with self._lock:
+            attachments = self.attachments.setdefault(page_id, [])
+            if attachment_id is None:
+                if any(item['title'] == upload['filename'] for item in attachments):
+                    return None
+                self._next_id += 1
+                attachment = {'id': f'att{self._next_id}', 'title': upload['filename'], 'version': {'number': 0}}
+                attachments.append(attachment)
+            else:
+                attachment = next((item for item in attachments if item['id'] == attachment_id), None)
+                if attachment is None:
+                    return None
+
+            attachment['version'] = {'number': attachment['version']['number'] + 1}
+            attachment['metadata'] = {'comment': upload.get('comment', ''), 'mediaType': upload['content_type']}
+            attachment['extensions'] = {'fileSize': upload['size']}
+            attachment['sha256'] = upload['sha256']
+            return dict(attachment)
+
+
+class MockConfluenceHandler(BaseHTTPRequestHandler):
+    """HTTP请求处理器（HTTP/1.1，支持keep-alive）"""
+
+    protocol_version = 'HTTP/1.1'
+    server: 'MockConfluenceServer'
+
+    def log_message(self, format, *args):
+        # 静默访问日志，避免干扰测试输出
+        pass
+
+    def _send_json(self, status: int, data: Any, headers: Optional[Dict[str, str]] = None):
+        body = json.dumps(data, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_asset(self, path: str):
+        """页面引用的静态资源（logo、头像、字体），按asset_latency模拟CDN延迟，可被浏览器缓存"""
+        if self.server.asset_latency:
+            time.sleep(self.server.asset_latency)
+        content_type, body = ('font/woff2', MOCK_FONT) if path.endswith('.woff2') else ('image/png', MOCK_PNG)
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Cache-Control', 'public, max-age=3600')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_html(self, status: int, title: str, body: str, script: str = ''):
+        document = PAGE_SHELL.format(
+            version=MOCK_VERSION,
+            title=html.escape(title),
+            body=body,
+            base=json.dumps(BASE_PATH),
+            base_path=BASE_PATH,
+            script=script
+        ).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(document)))
+        self.end_headers()
+        self.wfile.write(document)
+
+    def _session_user(self) -> Optional[str]:
+        """从会话Cookie中识别已登录用户"""
+        cookie = SimpleCookie(self.headers.get('Cookie', ''))
+        morsel = cookie.get(SESSION_COOKIE)
+        return self.server.sessions.get(morsel.value) if morsel else None
+
+    def _read_json(self) -> Dict[str, Any]:
+        length = int(self.headers.get('Content-Length', 0))
+        return json.loads(self.rfile.read(length) or b'{}')
+
+    def _read_upload(self) -> Dict[str, Any]:
+        """解析multipart附件上传：file字段计算大小和SHA-256，其余字段作为文本"""
+        boundary = re.search(r'boundary=([^;]+)', self.headers.get('Content-Type', '')).group(1).strip('"')
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        upload: Dict[str, Any] = {}
+        for part in body.split(b'--' + boundary.encode())[1:-1]:
+            headers, _, content = part[2:-2].partition(b'\r\n\r\n')
+            headers = headers.decode('utf-8')
+            name = re.search(r'name="([^"]*)"', headers).group(1)
+            if name == 'file':
+                upload['filename'] = re.search(r'filename="([^"]*)"', headers).group(1)
+                media_type = re.search(r'Content-Type:\s*(\S+)', headers, re.I)
+                upload['content_type'] = media_type.group(1) if media_type else 'application/octet-stream'
+                upload['size'] = len(content)
+                upload['sha256'] = hashlib.sha256(content).hexdigest()
+            else:
+                upload[name] = content.decode('utf-8')
+        return upload
+
+    def _authorized(self) -> bool:
+        expected = self.server.credentials
+        if expected is None or self._session_user():
+            return True
+        header = self.headers.get('Authorization', '')
+        if not header.startswith('Basic '):
+            return False
+        username, _, token = base64.b64decode(header[6:]).decode('utf-8').partition(':')
+        return (username, token) == expected
+
+    def _page_json(self, page: Dict[str, Any]) -> Dict[str, Any]:
+        data = dict(page)
+        data['ancestors'] = self.server.store.ancestors(page)
+        data['_links'] = {
+            'base': f"{self.server.url}",
+            'webui': f"/spaces/{page['space']['key']}/pages/{page['id']}"
+        }
+        return data
+
+    def _route(self, method: str):
+        path = urlparse(self.path).path
+        if not path.startswith(BASE_PATH):
+            self._send_json(404, {'message': 'not found'})
+            return
+        path = path[len(BASE_PATH):]
+
+        if path.startswith('/rest/') and not self._authorized():
+            self._send_json(401, {'message': 'unauthorized'})
+            return
+
+        self.server.request_count += 1
+
+        if not path.startswith('/rest/'):
+            self._route_ui(method, path)
+            return
+
+        retry_after = self.server.take_throttle()
+        if retry_after is not None:
+            # 读出未处理的请求体，保持keep-alive连接可用
+            self.rfile.read(int(self.headers.get('Content-Length') or 0))
+            self._send_json(429, {'message': 'rate limited'}, headers={'Retry-After': str(retry_after)})
+            return
+
+        if self.server.latency:
+            time.sleep(self.server.latency)
+
+        if method == 'POST' and path == '/rest/api/content':
+            page = self.server.store.create_page(self._read_json())
+            self._send_json(200, self._page_json(page))
+            return
+
+        if method == 'GET' and path == '/rest/api/content':
+            query = parse_qs(urlparse(self.path).query)
+            pages = self.server.store.find_pages(query.get('spaceKey', [None])[0], query.get('title', [None])[0])
+            self._send_json(200, {'results': [self._page_json(page) for page in pages], 'size': len(pages)})
+            return
+
+        match = re.fullmatch(r'/rest/api/content/(\d+)/child/attachment(?:/(att\d+)/data)?', path)
+        if match and match.group(1) in self.server.store.pages:
+            if method == 'GET' and not match.group(2):
+                query = parse_qs(urlparse(self.path).query)
+                start = int(query.get('start', ['0'])[0])
+                limit = int(query.get('limit', ['25'])[0])
+                attachments = self.server.store.attachments.get(match.group(1), [])[start:start + limit]
+                self._send_json(200, {'results': attachments, 'start': start, 'limit': limit,
+                                      'size': len(attachments)})
+            elif method == 'POST':
+                if self.headers.get('X-Atlassian-Token') != 'no-check':
+                    self._send_json(403, {'message': 'XSRF check failed'})
+                    return
+                attachment = self.server.store.save_attachment(match.group(1), self._read_upload(), match.group(2))
+                if attachment is None:
+                    self._send_json(400, {'message': 'attachment already exists or not found'})
+                elif match.group(2):
+                    self._send_json(200, attachment)
+                else:
+                    self._send_json(200, {'results': [attachment], 'size': 1})
+            else:
+                self._send_json(405, {'message': 'method not allowed'})
+            return
+
+        match = re.fullmatch(r'/rest/api/content/(\d+)', path)
+        if method in ('GET', 'PUT') and match:
+            page = self.server.store.pages.get(match.group(1))
+            if page is None:
+                self._send_json(404, {'message': 'page not found'})
+            elif method == 'GET':
+                self._send_json(200, self._page_json(page))
+            else:
+                page = self.server.store.update_page(match.group(1), self._read_json())
+                if page is None:
+                    self._send_json(409, {'message': 'version conflict'})
+                else:
+                    self._send_json(200, self._page_json(page))
+            return
+
+        self._send_json(404, {'message': 'not found'})
+
+    def _route_ui(self, method: str, path: str):
+        """网页界面：未登录时任何页面都显示登录表单"""
+        if method == 'POST' and path == '/login':
+            data = self._read_json()
+            expected = self.server.credentials
+            if expected is not None and (data.get('username'), data.get('password')) != expected:
+                self._send_json(401, {'message': 'invalid credentials'})
+                return
+            token = secrets.token_hex(16)
+            self.server.sessions[token] = data.get('username', '')
+            body = b'{}'
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.send_header('Set-Cookie', f'{SESSION_COOKIE}={token}; Path=/; HttpOnly')
+            self.end_headers()
+            self.wfile.write(body)
+            return
+
+        if method != 'GET':
+            self._send_json(404, {'message': 'not found'})
+            return
+
+        if re.fullmatch(r'/(?:s|gateway/api/avatar)/[\w./-]+', path):
+            self._send_asset(path)
+            return
+
+        username = self._session_user()
+        if username is None:
+            self._send_html(200, 'Log in', LOGIN_BODY, LOGIN_SCRIPT)
+            return
+
+        user = html.escape(username)
+
+        match = re.fullmatch(r'/spaces/(\w+)/pages/create', path)
+        if match:
+            space_key = match.group(1)
+            self._send_html(200, 'Create page', EDITOR_BODY.format(username=user),
+                            EDITOR_SCRIPT.replace('{space_key}', space_key))
+            return
+
+        match = re.fullmatch(r'/spaces/(\w+)/overview', path)
+        if match:
+            space_key = match.group(1)
+            self._send_html(200, space_key, SPACE_BODY.format(
+                username=user, space_key=space_key, parent_id='', heading=space_key, content=''))
+            return
+
+        match = re.fullmatch(r'(?:/spaces/(\w+))?/pages/(\d+)(?:/[^/]*)?', path)
+        if match:
+            page = self.server.store.pages.get(match.group(2))
+            space_key = match.group(1) or (page['space']['key'] if page else 'MOCK')
+            title = page['title'] if page else f"Page {match.group(2)}"
+            content = page['body']['storage']['value'] if page else ''
+            self._send_html(200, title, SPACE_BODY.format(
+                username=user, space_key=space_key, parent_id=match.group(2),
+                heading=html.escape(title), content=content))
+            return
+
+        self._send_html(404, 'Not found', '<h1>Not found</h1>')
+
+    def do_GET(self):
+        self._route('GET')
+
+    def do_POST(self):
+        self._route('POST')
+
+    def do_PUT(self):
+        self._route('PUT')
+
+
+class MockConfluenceServer(ThreadingHTTPServer):
+    """本地Confluence替身服务，可作为上下文管理器在后台线程运行"""
+
+    daemon_threads = True
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0,
+                 username: Optional[str] = None, api_token: Optional[str] = None, latency: float = 0.0,
+                 server_attributes: bool = False, asset_latency: float = 0.0):
+        super().__init__((host, port), MockConfluenceHandler)
+        # 每个REST请求的模拟服务端延迟（秒）
+        self.latency = latency
+        # 每个静态资源（图片、字体）的模拟延迟（秒）
+        self.asset_latency = asset_latency
+        self.store = MockConfluenceStore(server_attributes=server_attributes)
+        self.credentials = (username, api_token) if username else None
+        # 会话Cookie -> 用户名
+        self.sessions: Dict[str, str] = {}
+        self.request_count = 0
+        # 模拟限流：接下来的若干个REST请求返回429和Retry-After
+        self._throttle_remaining = 0
+        self._throttle_retry_after = 1.0
+        self._throttle_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        """供confluence_url配置使用的根地址"""
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}{BASE_PATH}"
+
+    def throttle(self, count: int, retry_after: float = 1.0):
+        """让接下来的count个REST请求返回429，Retry-After为retry_after秒"""
+        with self._throttle_lock:
+            self._throttle_remaining = count
+            self._throttle_retry_after = retry_after
+
+    def take_throttle(self) -> Optional[float]:
+        """当前请求需要限流时返回Retry-After秒数"""
+        with self._throttle_lock:
+            if self._throttle_remaining <= 0:
+                return None
+            self._throttle_remaining -= 1
+            return self._throttle_retry_after
+
+    def start(self) -> 'MockConfluenceServer':
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+        if self._thread:
+            self._thread.join()
+
+    def __enter__(self) -> 'MockConfluenceServer':
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def main():
+    """命令行启动替身服务"""
+    parser = argparse.ArgumentParser(description='本地Confluence替身服务')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8090)
+    parser.add_argument('--username', help='要求的用户名（不设置则不校验认证）')
+    parser.add_argument('--api-token', help='要求的API token')
+    parser.add_argument('--latency', type=float, default=0.0, help='每个REST请求的模拟延迟（秒）')
+    parser.add_argument('--asset-latency', type=float, default=0.0, help='每个静态资源的模拟延迟（秒）')
+    args = parser.parse_args()
+
+    server = MockConfluenceServer(args.host, args.port, args.username, args.api_token, latency=args.latency,
+                                  asset_latency=args.asset_latency)
+    print(f"🧪 Confluence替身服务运行于: {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
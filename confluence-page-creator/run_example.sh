@@ -31,6 +31,6 @@ echo "✅ 配置文件检查通过"
 
 # 运行技能
 echo "🎯 开始执行技能..."
-python main.py config.yaml
+python -m confluence_page_creator.main config.yaml
 
 echo "✅ 执行完成！"
\ No newline at end of file
@@ -1,4 +1,19 @@
-from setuptools import setup, find_packages
+import shutil
+from pathlib import Path
+
+from setuptools import setup
+from setuptools.command.build_py import build_py
+
+
+class BuildPy(build_py):
+    """把技能根目录的skill.yaml复制到包内，作为包数据随wheel安装（运行时通过importlib.resources读取）"""
+
+    def run(self):
+        super().run()
+        target = Path(self.build_lib) / "confluence_page_creator" / "skill.yaml"
+        target.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile("skill.yaml", target)
+
 
 with open("README.md", "r", encoding="utf-8") as fh:
     long_description = fh.read()
@@ -15,23 +30,26 @@ setup(
     long_description=long_description,
     long_description_content_type="text/markdown",
     url="https://github.com/yourusername/confluence-page-creator",
-    packages=find_packages(),
+    # 运行时代码都在confluence_page_creator包内；mock_confluence.py、benchmark.py和test_skill.py只用于
+    # 源码目录中的测试和基准测试，不安装
+    packages=["confluence_page_creator"],
+    package_data={"confluence_page_creator": ["templates/*.md"]},
+    cmdclass={"build_py": BuildPy},
     classifiers=[
         "Development Status :: 4 - Beta",
         "Intended Audience :: Developers",
         "License :: OSI Approved :: MIT License",
         "Operating System :: OS Independent",
         "Programming Language :: Python :: 3",
-        "Programming Language :: Python :: 3.8",
         "Programming Language :: Python :: 3.9",
         "Programming Language :: Python :: 3.10",
         "Programming Language :: Python :: 3.11",
     ],
-    python_requires=">=3.8",
+    python_requires=">=3.9",
     install_requires=requirements,
     entry_points={
         "console_scripts": [
-            "confluence-creator=main:main",
+            "confluence-creator=confluence_page_creator.cli:main",
         ],
     },
 )
\ No newline at end of file
@@ -5,10 +5,22 @@ Confluence页面创建器测试脚本
 """
 
 import asyncio
+import atexit
+import json
 import os
+import shutil
 import tempfile
+import time
 import yaml
-from main import ConfluencePageCreator
+
+from confluence_page_creator import page_metadata
+from confluence_page_creator.main import ConfluencePageCreator
+
+# 发布成功的页面默认记录到页面元数据缓存；测试使用临时文件，不写入开发者的 ~/.cache/confluence-page-creator
+TEST_CACHE_DIR = tempfile.mkdtemp(prefix='confluence-test-')
+atexit.register(shutil.rmtree, TEST_CACHE_DIR, ignore_errors=True)
+TEST_METADATA_PATH = os.path.join(TEST_CACHE_DIR, 'metadata.db')
+page_metadata.DEFAULT_METADATA_PATH = TEST_METADATA_PATH
 
 
 async def test_content_generation():
@@ -120,6 +132,2018 @@ def test_config_file_loading():
         return False
 
 
+async def test_batch_manifest():
+    """测试批量清单加载与作业配置合并"""
+    print("🧪 测试批量清单加载...")
+
+    from confluence_page_creator.batch import load_manifest, build_job_configs
+
+    manifest_yaml = """
+concurrency: 2
+defaults:
+  confluence_url: "https://test.atlassian.net/wiki"
+  space_key: "TEST"
+  username: "test@test.com"
+  api_token: "test-token"
+  tags: ["批量"]
+jobs:
+  - page_title: "页面一"
+    page_template: "meeting-notes"
+  - id: "second"
+    page_title: "页面二"
+    page_template: "project-update"
+"""
+
+    try:
+        with tempfile.NamedTemporaryFile(mode='w', suffix='.yaml', delete=False, encoding='utf-8') as f:
+            f.write(manifest_yaml)
+            temp_file = f.name
+
+        manifest = load_manifest(temp_file)
+        os.unlink(temp_file)
+
+        configs = build_job_configs(manifest)
+        assert [c['job_id'] for c in configs] == ['1', 'second']
+        assert all(c['auto_confirm'] for c in configs)
+        assert configs[1]['space_key'] == 'TEST'
+
+        # 作业之间不能共享被修改的标签列表
+        for config in configs:
+            await ConfluencePageCreator(config).generate_page_content()
+        assert manifest['defaults']['tags'] == ['批量']
+
+        # 作业共享第一个作业的会话：站点、用户或后端不同的清单被拒绝，站点末尾的/不算不同
+        manifest['jobs'][1]['confluence_url'] = 'https://test.atlassian.net/wiki/'
+        build_job_configs(manifest)
+        for override in [{'confluence_url': 'https://other.atlassian.net/wiki'},
+                         {'username': 'other@test.com'}, {'backend': 'api'}]:
+            try:
+                build_job_configs({**manifest, 'jobs': [manifest['jobs'][0], {**manifest['jobs'][1], **override}]})
+                assert False, f"应拒绝会话配置不同的作业: {override}"
+            except ValueError as e:
+                assert next(iter(override)) in str(e)
+
+        print("✅ 批量清单测试通过")
+        return True
+
+    except Exception as e:
+        print(f"❌ 批量清单测试失败：{e}")
+        return False
+
+
+async def test_rest_api_backend():
+    """测试REST API后端（使用本地Confluence替身服务）"""
+    print("🧪 测试REST API后端...")
+
+    from mock_confluence import MockConfluenceServer
+
+    try:
+        with MockConfluenceServer(username='test@test.com', api_token='test-token') as server:
+            config = {
+                'confluence_url': server.url,
+                'space_key': 'TEST',
+                'username': 'test@test.com',
+                'api_token': 'test-token',
+                'page_title': 'API测试页面',
+                'page_template': 'technical-doc',
+                'parent_page_id': '42',
+                'backend': 'api',
+                'auto_confirm': True,
+                'page_index': False
+            }
+
+            started = time.monotonic()
+            result = await ConfluencePageCreator(config).execute()
+            elapsed = time.monotonic() - started
+
+            assert result['success'], result['message']
+            page = server.store.pages[result['page_id']]
+            assert page['title'] == 'API测试页面'
+            assert page['ancestors'] == [{'id': '42'}]
+            assert page['body']['storage']['representation'] == 'storage'
+            assert '<h1>API测试页面</h1>' in page['body']['storage']['value']
+            assert 'technical-doc' in page['labels']
+            assert result['page_url'].endswith(f"/pages/{result['page_id']}")
+
+        print(f"✅ REST API后端测试通过 (页面ID: {result['page_id']}, 耗时: {elapsed * 1000:.0f}ms)")
+        return True
+
+    except Exception as e:
+        print(f"❌ REST API后端测试失败：{e}")
+        return False
+
+
+def test_session_cache():
+    """测试登录态缓存的加密读写与失效"""
+    print("🧪 测试登录态缓存...")
+
+    from confluence_page_creator.session_cache import SessionCache
+
+    state = {'cookies': [{'name': 'cloud.session.token', 'value': 'secret-cookie'}], 'origins': []}
+
+    try:
+        with tempfile.TemporaryDirectory() as cache_dir:
+            cache = SessionCache('https://test.atlassian.net/wiki', 'test@test.com', 'test-token', cache_dir)
+            assert cache.load() is None
+
+            cache.save(state)
+            assert b'secret-cookie' not in cache.path.read_bytes()
+            assert cache.load() == state
+
+            # 其他用户的缓存互不影响
+            other = SessionCache('https://test.atlassian.net/wiki', 'other@test.com', 'test-token', cache_dir)
+            assert other.load() is None
+
+            # 更换token后无法解密，缓存被丢弃
+            rotated = SessionCache('https://test.atlassian.net/wiki', 'test@test.com', 'new-token', cache_dir)
+            assert rotated.load() is None
+            assert not cache.path.exists()
+
+        print("✅ 登录态缓存测试通过")
+        return True
+
+    except Exception as e:
+        print(f"❌ 登录态缓存测试失败：{e}")
+        return False
+
+
+class FakeSelectorPage:
+    """模拟页面：每个选择器在指定延迟后出现，未列出的选择器永不出现"""
+
+    def __init__(self, delays):
+        self.delays = delays
+        self.waited = []
+
+    async def evaluate(self, expression):
+        return '7.19.0'
+
+    async def wait_for_selector(self, selector, timeout=5000):
+        self.waited.append(selector)
+        delay = self.delays.get(selector)
+        if delay is None:
+            await asyncio.sleep(timeout / 1000)
+            raise TimeoutError(selector)
+        await asyncio.sleep(delay)
+        return f"element:{selector}"
+
+
+async def test_selector_racing():
+    """测试选择器竞速与学习缓存"""
+    print("🧪 测试选择器竞速...")
+
+    from confluence_page_creator.selector_engine import SelectorResolver
+
+    candidates = ['#first', '#second', '#third']
+
+    try:
+        with tempfile.TemporaryDirectory() as cache_dir:
+            cache_path = os.path.join(cache_dir, 'selectors.json')
+
+            # 首次解析：所有候选并发，最后一个候选最快出现也无需等待前面的超时
+            resolver = SelectorResolver('test.atlassian.net', cache_path=cache_path)
+            page = FakeSelectorPage({'#third': 0.05})
+            started = time.monotonic()
+            element = await resolver.resolve(page, 'create_button', candidates, timeout=2000)
+            assert element == 'element:#third'
+            assert time.monotonic() - started < 1
+            assert resolver.stats()['misses'] == 1
+
+            # 新实例从磁盘读取缓存，只等待胜出的选择器
+            resolver = SelectorResolver('test.atlassian.net', cache_path=cache_path)
+            page = FakeSelectorPage({'#third': 0.01, '#first': 0.02})
+            element = await resolver.resolve(page, 'create_button', candidates, timeout=2000)
+            assert element == 'element:#third'
+            assert page.waited == ['#third']
+            assert resolver.stats()['hits'] == 1
+            assert resolver.stats()['cache_key'] == 'test.atlassian.net|7.19.0'
+
+            # 全部候选都不存在时返回None并记为未命中
+            page = FakeSelectorPage({})
+            assert await resolver.resolve(page, 'publish_button', candidates, timeout=100) is None
+            assert resolver.stats()['steps']['publish_button'] == {'hits': 0, 'misses': 1}
+
+        print("✅ 选择器竞速测试通过")
+        return True
+
+    except Exception as e:
+        print(f"❌ 选择器竞速测试失败：{e}")
+        return False
+
+
+class FakeEditor:
+    """模拟富文本编辑器，可指定是否处理合成粘贴事件"""
+
+    def __init__(self, keyboard, handles_paste):
+        self.keyboard = keyboard
+        self.handles_paste = handles_paste
+
+    async def click(self):
+        pass
+
+    async def evaluate(self, expression, arg=None):
+        if arg is not None:
+            if self.handles_paste:
+                self.keyboard.text = arg['text']
+            return self.handles_paste
+        return bool(self.keyboard.text.strip())
+
+
+class FakeKeyboard:
+    """模拟键盘，记录调用方式"""
+
+    def __init__(self):
+        self.text = ''
+        self.calls = []
+
+    async def press(self, key):
+        self.calls.append('press')
+        self.text = ''
+
+    async def insert_text(self, text):
+        self.calls.append('insert_text')
+        self.text = text
+
+    async def type(self, text):
+        self.calls.append('type')
+        self.text = text
+
+
+async def test_content_insertion_modes():
+    """测试内容一次性写入及回退"""
+    print("🧪 测试内容填写方式...")
+
+    config = {
+        'confluence_url': 'https://test.atlassian.net/wiki',
+        'space_key': 'TEST',
+        'username': 'test@test.com',
+        'api_token': 'test-token',
+        'page_title': '填写测试',
+        'page_template': 'technical-doc'
+    }
+
+    try:
+        for handles_paste, expected_mode in [(True, 'paste'), (False, 'insert')]:
+            creator = ConfluencePageCreator(config)
+            await creator.generate_page_content()
+            keyboard = FakeKeyboard()
+            creator.page = type('FakePage', (), {'keyboard': keyboard})()
+
+            await creator._insert_content(FakeEditor(keyboard, handles_paste))
+            assert creator.content_insertion['mode'] == expected_mode
+            assert keyboard.text == creator.generated_content['content']
+            assert 'type' not in keyboard.calls
+
+        try:
+            ConfluencePageCreator({**config, 'content_input_mode': 'telepathy'})
+            print("❌ 内容填写方式测试失败：应该拒绝无效的填写方式")
+            return False
+        except ValueError:
+            pass
+
+        print("✅ 内容填写方式测试通过")
+        return True
+
+    except Exception as e:
+        print(f"❌ 内容填写方式测试失败：{e}")
+        return False
+
+
+def test_storage_format_conversion():
+    """测试Markdown到storage格式的转换"""
+    print("🧪 测试storage格式转换...")
+
+    from confluence_page_creator.storage_format import iter_storage, markdown_to_storage
+
+    markdown = """# 标题
+
+普通段落，包含**加粗**、*斜体*和`a < b`代码。
+
+| 事项 | 负责人 |
+|------|--------|
+| 发布 | 张三 |
+
+- 一级
+  - 二级
+1. 第一步
+
+```json
+{"key": "]]>"}
+```
+"""
+
+    try:
+        storage = markdown_to_storage(markdown)
+        assert '<h1>标题</h1>' in storage
+        assert '<strong>加粗</strong>' in storage and '<em>斜体</em>' in storage
+        assert '<code>a &lt; b</code>' in storage
+        assert '<tr><th>事项</th><th>负责人</th></tr><tr><td>发布</td><td>张三</td></tr>' in storage
+        assert '<ul><li>一级<ul><li>二级</li></ul></li></ul><ol><li>第一步</li></ol>' in storage
+        assert '<ac:parameter ac:name="language">json</ac:parameter>' in storage
+        assert ']]]]><![CDATA[>' in storage
+
+        # 编辑器粘贴使用<pre>而非代码宏
+        assert '<pre><code class="language-json">' in markdown_to_storage(markdown, code_macros=False)
+
+        # 流式转换：输入为行生成器，逐片输出
+        lines = (f"## 小节{i}\n" for i in range(100000))
+        chunks = iter_storage(lines)
+        assert next(chunks) == '<h2>小节0</h2>'
+        assert sum(1 for _ in chunks) == 99999
+
+        print("✅ storage格式转换测试通过")
+        return True
+
+    except Exception as e:
+        print(f"❌ storage格式转换测试失败：{e}")
+        return False
+
+
+def test_template_registry():
+    """测试模板注册表的加载、缓存与失效"""
+    print("🧪 测试模板注册表...")
+
+    from confluence_page_creator.template_registry import TemplateRegistry
+
+    try:
+        with tempfile.TemporaryDirectory() as template_dir:
+            team_template = os.path.join(template_dir, 'team-weekly.md')
+            with open(team_template, 'w', encoding='utf-8') as f:
+                f.write("# {{ page_title }}\n\n负责人: {{ owner }}\n")
+
+            registry = TemplateRegistry([template_dir], check_interval=0)
+            assert 'team-weekly' in registry.names() and 'meeting-notes' in registry.names()
+            assert 'unknown-template' not in registry
+
+            variables = {'page_title': '周报', 'owner': '李四'}
+            assert registry.render('team-weekly', variables) == "# 周报\n\n负责人: 李四"
+
+            # 文件未变化时复用编译结果
+            compiled = registry.get('team-weekly')
+            assert registry.get('team-weekly') is compiled
+
+            # 修改文件后按mtime重新编译
+            with open(team_template, 'w', encoding='utf-8') as f:
+                f.write("# {{ page_title }} v2\n")
+            stat = os.stat(team_template)
+            os.utime(team_template, (stat.st_atime, stat.st_mtime + 10))
+            assert registry.render('team-weekly', variables) == "# 周报 v2"
+
+            # 缺少变量时报错
+            try:
+                registry.render('meeting-notes', {'page_title': '缺时间'})
+                return False
+            except ValueError:
+                pass
+
+        # 模板名按注册表校验
+        try:
+            ConfluencePageCreator({
+                'confluence_url': 'https://test.atlassian.net/wiki',
+                'space_key': 'TEST',
+                'username': 'test@test.com',
+                'api_token': 'test-token',
+                'page_title': '测试',
+                'page_template': 'no-such-template'
+            })
+            print("❌ 模板注册表测试失败：应该拒绝未知模板")
+            return False
+        except ValueError:
+            pass
+
+        print("✅ 模板注册表测试通过")
+        return True
+
+    except Exception as e:
+        print(f"❌ 模板注册表测试失败：{e}")
+        return False
+
+
+async def test_readiness_waits():
+    """测试就绪信号竞速与等待时间统计"""
+    print("🧪 测试就绪等待...")
+
+    config = {
+        'confluence_url': 'https://test.atlassian.net/wiki',
+        'space_key': 'TEST',
+        'username': 'test@test.com',
+        'api_token': 'test-token',
+        'page_title': '等待测试',
+        'wait_timeouts': {'publish': 1234}
+    }
+
+    async def fail_after(delay):
+        await asyncio.sleep(delay)
+        raise TimeoutError('timeout')
+
+    async def succeed_after(delay):
+        await asyncio.sleep(delay)
+        return 'ready'
+
+    try:
+        creator = ConfluencePageCreator(config)
+        assert creator._wait_timeout('publish') == 1234
+        assert creator._wait_timeout('editor') == 20000
+
+        # 失败的信号不影响另一个信号胜出
+        slow = asyncio.ensure_future(succeed_after(0.05))
+        failing = asyncio.ensure_future(fail_after(0.01))
+        async with creator._waiting('publish'):
+            winner = await creator._first_ready([failing, slow])
+        assert winner is slow and winner.result() == 'ready'
+
+        # 全部失败时抛出异常
+        try:
+            await creator._first_ready([asyncio.ensure_future(fail_after(0.01))])
+            return False
+        except Exception:
+            pass
+
+        # 只有发布请求本身的成功响应算作发布完成：草稿自动保存、子资源请求、4xx/429响应都不算
+        from types import SimpleNamespace
+        from confluence_page_creator.main import is_publish_response
+
+        def response(url, method='POST', body=None, status=200):
+            request = SimpleNamespace(method=method, post_data=json.dumps(body) if body else None)
+
+            async def read_json():
+                return {'id': '123'} if status == 200 else {}
+            return SimpleNamespace(url=url, request=request, status=status, ok=status < 400, json=read_json)
+
+        base = 'https://test.atlassian.net/wiki'
+        assert is_publish_response(response(f'{base}/rest/api/content', body={'status': 'current'}))
+        assert is_publish_response(response(f'{base}/api/v2/pages/42', method='PUT'))
+        assert not is_publish_response(response(f'{base}/rest/api/content', body={'status': 'draft'}))
+        assert not is_publish_response(response(f'{base}/api/v2/pages/42?status=draft', method='PUT'))
+        assert not is_publish_response(response(f'{base}/rest/api/content/42/label'))
+        assert not is_publish_response(response(f'{base}/rest/api/content', method='GET'))
+
+        await creator._read_published_page_id(response(f'{base}/rest/api/content'))
+        assert creator.published_page_id == '123'
+        for status in (400, 429):
+            try:
+                await creator._read_published_page_id(response(f'{base}/rest/api/content', status=status))
+                assert False, f"HTTP {status} 不应视为发布成功"
+            except AssertionError:
+                raise
+            except Exception:
+                pass
+
+        report = creator._timing_report(0.2)
+        assert 0.04 < report['waits']['publish'] < 0.2
+        assert abs(report['wait'] + report['work'] - 0.2) < 0.002
+
+        print("✅ 就绪等待测试通过")
+        return True
+
+    except Exception as e:
+        print(f"❌ 就绪等待测试失败：{e}")
+        return False
+
+
+async def test_trace_output():
+    """测试步骤追踪与JSON Lines输出"""
+    print("🧪 测试执行追踪...")
+
+    import json
+    from mock_confluence import MockConfluenceServer
+
+    try:
+        with tempfile.TemporaryDirectory() as trace_dir, MockConfluenceServer() as server:
+            trace_file = os.path.join(trace_dir, 'trace.jsonl')
+            config = {
+                'confluence_url': server.url,
+                'space_key': 'TEST',
+                'username': 'test@test.com',
+                'api_token': 'test-token',
+                'page_title': '追踪测试',
+                'backend': 'api',
+                'auto_confirm': True,
+                'job_id': 'job-42',
+                'page_index': False,
+                'trace_sink': trace_file
+            }
+
+            result = await ConfluencePageCreator(config).execute()
+            assert result['success'], result['message']
+            assert set(result['steps']) == {'initialize', 'generate_content', 'save_page', 'cleanup'}
+
+            with open(trace_file, 'r', encoding='utf-8') as f:
+                spans = [json.loads(line) for line in f]
+
+            assert [span['step'] for span in spans] == ['generate_content', 'initialize', 'save_page', 'cleanup']
+            for span in spans:
+                assert span['job_id'] == 'job-42' and span['outcome'] == 'ok' and span['retries'] == 0
+                assert span['end'] >= span['start']
+
+            # 失败的步骤记录为error
+            failing = ConfluencePageCreator({**config, 'confluence_url': 'http://127.0.0.1:9/wiki', 'timeout': 500})
+            result = await failing.execute()
+            assert not result['success']
+            assert any(span.step == 'save_page' and span.outcome == 'error' for span in failing.tracer.spans)
+
+        print("✅ 执行追踪测试通过")
+        return True
+
+    except Exception as e:
+        print(f"❌ 执行追踪测试失败：{e}")
+        return False
+
+
+def test_mock_confluence_ui():
+    """测试替身服务的网页界面：登录表单、创建按钮和编辑器"""
+    print("🧪 测试替身服务网页界面...")
+
+    import requests
+    from mock_confluence import MockConfluenceServer
+
+    try:
+        with MockConfluenceServer(username='test@test.com', api_token='test-token') as server:
+            session = requests.Session()
+
+            # 未登录时显示两步登录表单
+            page = session.get(f"{server.url}/spaces/TEST/overview").text
+            for selector in ['id="username"', 'id="password"', 'id="login-submit"']:
+                assert selector in page
+
+            assert session.post(f"{server.url}/login",
+                                json={'username': 'test@test.com', 'password': 'wrong'}).status_code == 401
+            assert session.post(f"{server.url}/login",
+                                json={'username': 'test@test.com', 'password': 'test-token'}).ok
+
+            page = session.get(f"{server.url}/spaces/TEST/overview").text
+            assert 'aria-label="Create"' in page and 'app-navigation-profile' in page
+
+            page = session.get(f"{server.url}/spaces/TEST/pages/create?parentId=7").text
+            for selector in ['aria-label="Title"', 'class="ProseMirror"', 'aria-label="Publish"']:
+                assert selector in page
+
+        print("✅ 替身服务网页界面测试通过")
+        return True
+
+    except Exception as e:
+        print(f"❌ 替身服务网页界面测试失败：{e}")
+        return False
+
+
+async def test_benchmark_report():
+    """测试基准测试的统计与报告"""
+    print("🧪 测试基准测试报告...")
+
+    from benchmark import percentile, run_benchmark
+
+    try:
+        assert percentile([1, 2, 3, 4], 50) == 2.5
+        assert percentile([5], 99) == 5
+        assert percentile(list(range(101)), 95) == 95
+
+        report = await run_benchmark(pages=5, backend='api', mode='batch', concurrency=2)
+        assert report['succeeded'] == 5 and report['failed'] == 0
+        assert report['pages_per_second'] > 0
+        for step in ['generate_content', 'save_page', 'page_total']:
+            stats = report['latency_ms'][step]
+            assert stats['count'] == 5 and stats['p50'] <= stats['p95'] <= stats['p99']
+
+        print(f"✅ 基准测试报告测试通过 ({report['pages_per_second']} 页/秒)")
+        return True
+
+    except Exception as e:
+        print(f"❌ 基准测试报告测试失败：{e}")
+        return False
+
+
+async def test_daemon_roundtrip():
+    """测试常驻进程的作业提交、统计与空闲退出"""
+    print("🧪 测试常驻进程...")
+
+    from confluence_page_creator.daemon import CreatorDaemon, send_request, resolve_config_paths
+    from mock_confluence import MockConfluenceServer
+
+    try:
+        with tempfile.TemporaryDirectory() as temp_dir, \
+                MockConfluenceServer(username='test@test.com', api_token='test-token') as server:
+            socket_path = os.path.join(temp_dir, 'daemon.sock')
+            daemon = CreatorDaemon(socket_path, workers=2, idle_timeout=0.5)
+            serving = asyncio.ensure_future(daemon.serve())
+            await daemon.wait_started()
+
+            config = {
+                'confluence_url': server.url,
+                'space_key': 'TEST',
+                'username': 'test@test.com',
+                'api_token': 'test-token',
+                'page_title': '常驻进程测试页面',
+                'page_template': 'technical-doc',
+                'backend': 'api',
+                'page_index': False
+            }
+            loop = asyncio.get_running_loop()
+            responses = await asyncio.gather(*[
+                loop.run_in_executor(None, send_request,
+                                     {'op': 'submit', 'config': {**config, 'page_title': f'页面{i}'}}, socket_path)
+                for i in range(3)
+            ])
+            assert all(response['ok'] and response['result']['success'] for response in responses)
+            assert len(server.store.pages) == 3
+
+            invalid = await loop.run_in_executor(None, send_request,
+                                                 {'op': 'submit', 'config': {'backend': 'api'}}, socket_path)
+            assert invalid['ok'] and not invalid['result']['success']
+
+            # 相对路径会按常驻进程的工作目录解析：客户端按配置文件目录转换为绝对路径，常驻进程拒绝相对路径
+            with open(os.path.join(temp_dir, 'notes.md'), 'w', encoding='utf-8') as f:
+                f.write('# 相对路径\n\n来自配置文件目录')
+            relative = {**config, 'page_title': '相对路径', 'content_file': 'notes.md',
+                        'attachments': ['notes.md', {'path': '~/x.log'}], 'trace_sink': '-'}
+            rejected = await loop.run_in_executor(None, send_request, {'op': 'submit', 'config': relative},
+                                                  socket_path)
+            assert not rejected['result']['success'] and 'content_file' in rejected['result']['message']
+            resolved = resolve_config_paths(relative, temp_dir)
+            assert resolved['content_file'] == os.path.join(temp_dir, 'notes.md') and resolved['trace_sink'] == '-'
+            assert resolved['attachments'] == [os.path.join(temp_dir, 'notes.md'),
+                                               {'path': os.path.expanduser('~/x.log')}]
+            assert relative['content_file'] == 'notes.md' and relative['attachments'][1] == {'path': '~/x.log'}
+            del resolved['attachments']
+            accepted = await loop.run_in_executor(None, send_request, {'op': 'submit', 'config': resolved},
+                                                  socket_path)
+            assert accepted['result']['success'], accepted['result']['message']
+            page = server.store.pages[accepted['result']['page_id']]
+            assert '来自配置文件目录' in page['body']['storage']['value']
+
+            health = await loop.run_in_executor(None, send_request, {'op': 'health'}, socket_path)
+            assert health['status'] == 'ok'
+            stats = await loop.run_in_executor(None, send_request, {'op': 'stats'}, socket_path)
+            assert stats['jobs_completed'] == 4 and stats['jobs_failed'] == 2
+            assert stats['queue_depth'] == 0 and stats['in_flight'] == 0
+
+            # 空闲超时后自动退出并清理套接字
+            await asyncio.wait_for(serving, timeout=5)
+            assert not os.path.exists(socket_path)
+
+        print("✅ 常驻进程测试通过")
+        return True
+
+    except Exception as e:
+        print(f"❌ 常驻进程测试失败：{e}")
+        return False
+
+
+async def test_request_filter():
+    """测试浏览器请求过滤规则与统计"""
+    print("🧪 测试请求过滤...")
+
+    from types import SimpleNamespace
+    from confluence_page_creator.request_filter import RequestFilter
+
+    class FakePage:
+        pass
+
+    class FakeRequest:
+        def __init__(self, url, resource_type, page=None):
+            self.url = url
+            self.resource_type = resource_type
+            if page is not None:
+                self.frame = SimpleNamespace(page=page)
+
+    class FakeRoute:
+        def __init__(self, url, resource_type, page=None):
+            self.request = FakeRequest(url, resource_type, page)
+            self.action = None
+
+        async def abort(self, error_code=None):
+            self.action = 'abort'
+
+        async def continue_(self):
+            self.action = 'continue'
+
+    try:
+        base = {'confluence_url': 'https://test.atlassian.net/wiki'}
+        assert RequestFilter.from_config({**base, 'request_filter': False}) is None
+        try:
+            RequestFilter.from_config({**base, 'request_filter': 'unknown'})
+            raise AssertionError('未知规则集应报错')
+        except ValueError:
+            pass
+
+        request_filter = RequestFilter.from_config({**base, 'request_filter': {
+            'block_url_patterns': [r'/rest/analytics/'],
+            'allow_url_patterns': [r'/wiki/logo\.png']
+        }})
+        assert request_filter.profile == 'confluence'
+
+        routes = [
+            FakeRoute('https://test.atlassian.net/wiki/spaces/TEST/overview', 'document'),
+            FakeRoute('https://test.atlassian.net/wiki/avatar.png', 'image'),
+            FakeRoute('https://test.atlassian.net/wiki/logo.png', 'image'),
+            FakeRoute('https://test.atlassian.net/fonts/charlie.woff2', 'font'),
+            FakeRoute('https://test.atlassian.net/gateway/api/gasv3/api/v1/batch', 'fetch'),
+            FakeRoute('https://test.atlassian.net/wiki/rest/analytics/event', 'xhr'),
+            FakeRoute('https://test.atlassian.net/wiki/rest/api/content', 'fetch'),
+            FakeRoute('https://test.atlassian.net/wiki/editor.js', 'script'),
+        ]
+        for route in routes:
+            await request_filter._handle_route(route)
+
+        assert [route.action for route in routes] == [
+            'continue', 'abort', 'continue', 'abort', 'abort', 'abort', 'continue', 'continue'
+        ]
+        stats = request_filter.stats()
+        assert stats['blocked'] == 4 and stats['allowed'] == 4
+        assert stats['blocked_by_type'] == {'image': 1, 'font': 1, 'fetch': 1, 'xhr': 1}
+        assert stats['bytes_saved_estimate'] > 0
+
+        # 只路由可能被拦截的URL：放行的业务请求不经过Python处理
+        pattern = request_filter.route_pattern()
+        assert pattern.search('https://test.atlassian.net/wiki/s/images/Logo.PNG?v=2')
+        assert pattern.search('https://test.atlassian.net/fonts/charlie.woff2')
+        assert pattern.search('https://test.atlassian.net/wiki/gateway/api/avatar/default')
+        assert not pattern.search('https://test.atlassian.net/wiki/rest/api/content')
+        assert not pattern.search('https://test.atlassian.net/wiki/editor.js')
+        assert RequestFilter.from_config({**base, 'request_filter': 'none'}).route_pattern() is None
+        assert RequestFilter.from_config({**base, 'request_filter': {
+            'block_resource_types': ['xhr']
+        }}).route_pattern() == '**/*'
+
+        # 共享上下文中按页面统计，复用的页面以作业开始时的统计为基准只报告增量
+        page, other_page = FakePage(), FakePage()
+        await request_filter._handle_route(FakeRoute('https://test.atlassian.net/a.png', 'image', page))
+        mark = request_filter.stats(page)
+        await request_filter._handle_route(FakeRoute('https://test.atlassian.net/b.png', 'image', page))
+        await request_filter._handle_route(FakeRoute('https://test.atlassian.net/c.woff2', 'font', other_page))
+        job_stats = request_filter.stats(page, since=mark)
+        assert job_stats['blocked'] == 1 and job_stats['blocked_by_type'] == {'image': 1}, job_stats
+        assert request_filter.stats(other_page)['blocked_by_type'] == {'font': 1}
+        assert request_filter.stats()['blocked'] == 7
+
+        print(f"✅ 请求过滤测试通过 (拦截 {stats['blocked']} 个，约节省 {stats['bytes_saved_estimate']} 字节)")
+        return True
+
+    except Exception as e:
+        print(f"❌ 请求过滤测试失败：{e}")
+        return False
+
+
+async def test_page_index_skip():
+    """测试内容哈希索引：内容未变化时跳过发布"""
+    print("🧪 测试页面索引...")
+
+    from mock_confluence import MockConfluenceServer
+    from confluence_page_creator.page_index import PageIndex, page_key
+
+    try:
+        with tempfile.TemporaryDirectory() as temp_dir, \
+                MockConfluenceServer(username='test@test.com', api_token='test-token') as server:
+            config = {
+                'confluence_url': server.url,
+                'space_key': 'TEST',
+                'username': 'test@test.com',
+                'api_token': 'test-token',
+                'page_title': '周报',
+                'page_template': 'project-update',
+                'parent_page_id': '42',
+                'backend': 'api',
+                'auto_confirm': True,
+                'page_index_path': os.path.join(temp_dir, 'pages.db')
+            }
+
+            first = await ConfluencePageCreator(config).execute()
+            assert first['success'] and not first['skipped']
+
+            # 再次运行：生成时间不同但内容相同，不发起任何请求
+            requests_before = server.request_count
+            second = await ConfluencePageCreator(config).execute()
+            assert second['success'] and second['skipped']
+            assert second['page_id'] == first['page_id'] and second['page_url'] == first['page_url']
+            assert server.request_count == requests_before
+            assert 'save_page' not in second['steps'] and 'initialize' not in second['steps']
+
+            # 内容变化后重新发布
+            changed = await ConfluencePageCreator({**config, 'tags': ['新增标签']}).execute()
+            assert changed['success'] and not changed['skipped']
+            assert len(server.store.pages) == 2
+
+            record = PageIndex(config['page_index_path']).lookup(page_key(config))
+            assert record['page_id'] == changed['page_id'] and record['version'] == 1
+
+            # 关闭索引时总是发布
+            forced = await ConfluencePageCreator({**config, 'page_index': False}).execute()
+            assert forced['success'] and not forced['skipped']
+
+        print("✅ 页面索引测试通过")
+        return True
+
+    except Exception as e:
+        print(f"❌ 页面索引测试失败：{e}")
+        return False
+
+
+async def test_incremental_update():
+    """测试按章节增量更新已有页面"""
+    print("🧪 测试增量更新...")
+
+    from mock_confluence import MockConfluenceServer
+
+    try:
+        try:
+            ConfluencePageCreator({
+                'confluence_url': 'https://test.atlassian.net/wiki', 'space_key': 'TEST', 'username': 'u',
+                'api_token': 't', 'page_title': '周报', 'update_existing': True
+            })
+            raise AssertionError('界面模式应拒绝增量更新')
+        except ValueError:
+            pass
+
+        with tempfile.TemporaryDirectory() as temp_dir, \
+                MockConfluenceServer(username='test@test.com', api_token='test-token') as server:
+            with open(os.path.join(temp_dir, 'weekly.md'), 'w', encoding='utf-8') as f:
+                f.write("# {{ page_title }}\n\n## 概览\n更新时间: {{ current_time }}\n\n"
+                        "## 状态\n{{ status }}\n\n## 说明\n固定内容\n")
+
+            config = {
+                'confluence_url': server.url,
+                'space_key': 'TEST',
+                'username': 'test@test.com',
+                'api_token': 'test-token',
+                'page_title': '周报',
+                'page_template': 'weekly',
+                'template_dir': temp_dir,
+                'template_vars': {'status': '进行中'},
+                'backend': 'api',
+                'auto_confirm': True,
+                'update_existing': True,
+                'page_index_path': os.path.join(temp_dir, 'pages.db')
+            }
+
+            created = await ConfluencePageCreator(config).execute()
+            assert created['success'] and created['update']['action'] == 'created'
+            page = server.store.pages[created['page_id']]
+            original_overview = page['body']['storage']['value'].split('<h2>状态')[0]
+
+            # Confluence保存后添加的local-id属性不视为变化；不走索引，按标题找到页面
+            page['body']['storage']['value'] = page['body']['storage']['value'].replace(
+                '<h2>说明', '<h2 local-id="a1b2">说明')
+            unchanged = await ConfluencePageCreator({**config, 'page_index': False}).execute()
+            assert unchanged['success'] and unchanged['page_id'] == created['page_id']
+            assert unchanged['update']['action'] == 'unchanged'
+            assert unchanged['message'] == '页面内容未变化，未修改'
+            assert page['version']['number'] == 1
+
+            # 只替换变化的章节，其余章节（含旧的更新时间）保留原始标记
+            updated = await ConfluencePageCreator({**config, 'template_vars': {'status': '已完成'}}).execute()
+            assert updated['success'] and updated['update']['action'] == 'updated'
+            assert updated['update']['changed_sections'] == ['h2:状态']
+            assert updated['update']['unchanged_sections'] == 3
+            assert page['version']['number'] == 2 and len(server.store.pages) == 1
+            body = page['body']['storage']['value']
+            assert body.startswith(original_overview)
+            assert '已完成' in body and '<h2 local-id="a1b2">说明' in body
+
+            # 索引记录的页面已在Confluence中删除：删除失效记录后重新创建
+            from confluence_page_creator.page_index import get_index, page_key
+            del server.store.pages[created['page_id']]
+            recreated = await ConfluencePageCreator({**config, 'template_vars': {'status': '重建'}}).execute()
+            assert recreated['success'] and recreated['update']['action'] == 'created'
+            assert recreated['page_id'] != created['page_id'] and len(server.store.pages) == 1
+            assert get_index(config['page_index_path']).lookup(page_key(config))['page_id'] == recreated['page_id']
+
+        # 服务端保存时为代码宏和表格添加属性（schema-version、macro-id、data-layout等），往返后不视为变化
+        with tempfile.TemporaryDirectory() as temp_dir, \
+                MockConfluenceServer(username='test@test.com', api_token='test-token',
+                                     server_attributes=True) as server:
+            with open(os.path.join(temp_dir, 'runbook.md'), 'w', encoding='utf-8') as f:
+                f.write("## 部署\n```bash\nmake deploy\n```\n\n## 主机\n| 名称 | 地址 |\n|---|---|\n"
+                        "| web | {{ host }} |\n\n## 状态\n{{ status }}\n")
+            config = {
+                'confluence_url': server.url, 'space_key': 'TEST', 'username': 'test@test.com',
+                'api_token': 'test-token', 'page_title': '运维手册', 'page_template': 'runbook',
+                'template_dir': temp_dir, 'template_vars': {'host': '10.0.0.1', 'status': '正常'},
+                'backend': 'api', 'auto_confirm': True, 'update_existing': True, 'page_index': False
+            }
+            created = await ConfluencePageCreator(config).execute()
+            page = server.store.pages[created['page_id']]
+            stored = page['body']['storage']['value']
+            assert 'ac:macro-id=' in stored and 'data-layout="default"' in stored
+
+            unchanged = await ConfluencePageCreator(config).execute()
+            assert unchanged['update']['action'] == 'unchanged', unchanged['update']
+            assert page['version']['number'] == 1
+
+            updated = await ConfluencePageCreator({**config, 'template_vars': {'host': '10.0.0.1',
+                                                                               'status': '维护中'}}).execute()
+            assert updated['update']['changed_sections'] == ['h2:状态'], updated['update']
+            # 未变化的章节保留服务端的原始标记
+            assert stored.split('<h2>状态')[0] in page['body']['storage']['value']
+
+        print("✅ 增量更新测试通过")
+        return True
+
+    except Exception as e:
+        print(f"❌ 增量更新测试失败：{e}")
+        return False
+
+
+async def test_pipelined_review():
+    """测试审核与后端准备并行、非阻塞输入及批量审核队列"""
+    print("🧪 测试流水线执行...")
+
+    import threading
+    from confluence_page_creator import main
+    from confluence_page_creator.batch import BatchRunner
+    from mock_confluence import MockConfluenceServer
+
+    class SlowBackend:
+        name = 'fake'
+
+        def __init__(self):
+            self.prepared = False
+            self.closed = False
+
+        async def prepare(self):
+            # 比审核输入（0.3s）稍慢，用户取消时准备工作一定仍在进行
+            await asyncio.sleep(0.4)
+            self.prepared = True
+
+        async def publish(self):
+            assert self.prepared
+            return {'page_id': '1', 'page_url': 'http://example/pages/1'}
+
+        async def close(self):
+            self.closed = True
+
+    answers = []
+    active = {'now': 0, 'max': 0}
+    lock = threading.Lock()
+
+    def slow_input(prompt=''):
+        with lock:
+            active['now'] += 1
+            active['max'] = max(active['max'], active['now'])
+        time.sleep(0.3)
+        with lock:
+            active['now'] -= 1
+        return answers.pop(0) if answers else 'y'
+
+    original_input = main.read_terminal_line
+    main.read_terminal_line = slow_input
+    try:
+        base = {
+            'confluence_url': 'https://test.atlassian.net/wiki', 'space_key': 'TEST', 'username': 'u',
+            'api_token': 't', 'page_title': '流水线测试', 'page_index': False
+        }
+
+        # 审核（0.3s）与后端准备（0.4s）并行，事件循环在等待输入时不被阻塞
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        creator = ConfluencePageCreator(base)
+        creator.backend = SlowBackend()
+        ticking = asyncio.ensure_future(ticker())
+        started = time.monotonic()
+        result = await creator.execute()
+        elapsed = time.monotonic() - started
+        ticking.cancel()
+        assert result['success'], result['message']
+        assert elapsed < 0.55, f'未并行执行: {elapsed:.2f}s'
+        assert ticks > 10
+
+        # 用户取消时停止仍在进行的准备工作
+        answers[:] = ['n']
+        creator = ConfluencePageCreator(base)
+        creator.backend = backend = SlowBackend()
+        result = await creator.execute()
+        assert not result['success'] and result['message'] == '用户取消操作'
+        assert backend.closed and not backend.prepared
+
+        # 批量模式逐个审核，通过的作业进入发布阶段
+        with MockConfluenceServer(username='test@test.com', api_token='test-token') as server:
+            answers[:] = ['y', 'n', 'y']
+            summary = await BatchRunner({
+                'concurrency': 3,
+                'defaults': {
+                    'confluence_url': server.url, 'space_key': 'TEST', 'username': 'test@test.com',
+                    'api_token': 'test-token', 'backend': 'api', 'auto_confirm': False, 'page_index': False
+                },
+                'jobs': [{'page_title': f'审核页面{i}'} for i in range(3)]
+            }).run()
+            assert summary['succeeded'] == 2 and summary['failed'] == 1
+            assert [job['message'] for job in summary['jobs']].count('用户取消操作') == 1
+            assert len(server.store.pages) == 2
+            assert active['max'] == 1
+
+        # 编辑内容后重新计算内容哈希
+        from confluence_page_creator.page_index import content_hash
+        edits = ['e', '', '# 新内容', 'END', 'y']
+        main.read_terminal_line = lambda: edits.pop(0)
+        creator = ConfluencePageCreator(base)
+        await creator.generate_page_content()
+        old_hash = creator.content_hash
+        assert await creator.user_confirmation_step()
+        assert creator.generated_content['content'] == '# 新内容'
+        assert creator.content_hash != old_hash
+        assert creator.content_hash == content_hash(base['page_title'], '# 新内容', creator.generated_content['tags'])
+
+        # 审核被取消时不留下阻塞进程退出的输入线程（标准输入保持打开、没有输入）
+        import subprocess
+        import sys
+        script = (
+            "import asyncio\n"
+            "from confluence_page_creator.main import ConfluencePageCreator\n"
+            f"creator = ConfluencePageCreator({base!r})\n"
+            "async def main():\n"
+            "    task = asyncio.ensure_future(creator._ainput())\n"
+            "    await asyncio.sleep(0.1)\n"
+            "    task.cancel()\n"
+            "asyncio.run(main())\n"
+        )
+        proc = subprocess.Popen([sys.executable, '-c', script], stdin=subprocess.PIPE,
+                                cwd=os.path.dirname(os.path.abspath(__file__)))
+        try:
+            assert proc.wait(timeout=10) == 0
+        finally:
+            proc.kill()
+            proc.stdin.close()
+
+        # 审核被拒绝时取消后端准备：等待登录检测中的取消不能被吞掉
+        class SlowPage:
+            async def wait_for_selector(self, *args, **kwargs):
+                await asyncio.sleep(10)
+
+        creator = ConfluencePageCreator(base)
+        creator.page = SlowPage()
+        task = asyncio.ensure_future(creator._need_login())
+        await asyncio.sleep(0.05)
+        task.cancel()
+        try:
+            await asyncio.wait_for(task, timeout=1)
+            raise AssertionError('取消应传递出登录检测')
+        except asyncio.CancelledError:
+            pass
+
+        print(f"✅ 流水线执行测试通过 (审核与准备并行耗时 {elapsed:.2f}s)")
+        return True
+
+    except Exception as e:
+        print(f"❌ 流水线执行测试失败：{e}")
+        return False
+
+    finally:
+        main.read_terminal_line = original_input
+
+
+async def test_retry_and_resume():
+    """测试瞬时故障重试与执行日志恢复"""
+    print("🧪 测试重试与恢复...")
+
+    from confluence_page_creator.retry import RetryPolicy, is_transient
+    from confluence_page_creator.journal import RunJournal
+    from confluence_page_creator.batch import BatchRunner
+    from confluence_page_creator.tracing import Tracer, retry_attempt
+    from confluence_page_creator.workflow import get_workflow, register_action
+    from confluence_page_creator.confluence_api import ConfluenceApiError
+    from mock_confluence import MockConfluenceServer
+
+    try:
+        policy = RetryPolicy(max_attempts=3, base_delay=0.001, max_delay=0.01)
+        calls = []
+
+        async def flaky():
+            calls.append(retry_attempt.get())
+            if len(calls) < 3:
+                raise ConfluenceApiError(503, '服务暂不可用')
+            return 'ok'
+
+        assert await policy.run(flaky) == 'ok' and calls == [0, 1, 2]
+
+        # 非瞬时错误不重试
+        async def rejected():
+            calls.append('rejected')
+            raise ConfluenceApiError(400, '参数错误')
+
+        calls.clear()
+        try:
+            await policy.run(rejected)
+            assert False, "应抛出异常"
+        except ConfluenceApiError:
+            assert calls == ['rejected']
+        assert is_transient(asyncio.TimeoutError()) and not is_transient(ValueError())
+        assert RetryPolicy.from_config({'retry': False}).max_attempts == 1
+
+        # 重试期间的span记录重试次数
+        tracer = Tracer('job')
+        async def traced():
+            async with tracer.span('save_page'):
+                if retry_attempt.get() == 0:
+                    raise ConnectionError('连接中断')
+        await policy.run(traced)
+        assert [span.retries for span in tracer.spans] == [0, 1]
+
+        with tempfile.TemporaryDirectory() as temp_dir, \
+                MockConfluenceServer(username='test@test.com', api_token='test-token') as server:
+            journal_path = os.path.join(temp_dir, 'run.jsonl')
+            defaults = {
+                'confluence_url': server.url,
+                'space_key': 'TEST',
+                'username': 'test@test.com',
+                'api_token': 'test-token',
+                'backend': 'api',
+                'page_index': False
+            }
+            first_job = {'id': 'a', 'page_title': '页面A'}
+
+            journal = RunJournal(journal_path)
+            summary = await BatchRunner({'defaults': defaults, 'jobs': [first_job]}, journal=journal).run()
+            journal.close()
+            assert summary['succeeded'] == 1 and summary['resumed'] == 0
+
+            # 每个完成的步骤落盘一条记录，作业结果最后写入
+            with open(journal_path, 'r', encoding='utf-8') as f:
+                records = [json.loads(line) for line in f]
+            assert records[-1]['event'] == 'job' and 'content' in [r['event'] for r in records]
+            assert {'publish', 'upload_attachments'} <= {r['step'] for r in records if r['event'] == 'step'}
+
+            # 模拟中断：日志末尾留下写了一半的记录
+            with open(journal_path, 'a', encoding='utf-8') as f:
+                f.write('{"event": "job", "job_')
+
+            journal = RunJournal(journal_path, resume=True)
+            assert journal.completed_result('a')['success']
+            manifest = {'defaults': defaults, 'jobs': [first_job, {'id': 'b', 'page_title': '页面B'}]}
+            summary = await BatchRunner(manifest, journal=journal).run()
+            journal.close()
+            assert summary['succeeded'] == 2 and summary['resumed'] == 1
+            assert len(server.store.pages) == 2
+
+            # 全部完成后再次恢复：不发起任何请求
+            requests_before = server.request_count
+            journal = RunJournal(journal_path, resume=True)
+            summary = await BatchRunner(manifest, journal=journal).run()
+            journal.close()
+            assert summary['resumed'] == 2 and server.request_count == requests_before
+
+            # 发布后的步骤失败：恢复时从失败的步骤继续，不重复发布
+            attempts = []
+
+            async def notify_once(creator):
+                attempts.append(creator.published['page_id'])
+                if len(attempts) == 1:
+                    raise ValueError('通知服务不可用')
+
+            register_action('notify_once', notify_once)
+            steps = [{'name': step.name, 'action': step.action, 'depends_on': step.depends_on, 'always': step.always}
+                     for step in get_workflow().steps]
+            steps.insert(-1, {'name': 'notify', 'action': 'notify_once', 'depends_on': ['publish']})
+            step_journal = os.path.join(temp_dir, 'steps.jsonl')
+            step_manifest = {'defaults': {**defaults, 'workflow': steps}, 'jobs': [{'id': 'c', 'page_title': '页面C'}]}
+
+            journal = RunJournal(step_journal)
+            summary = await BatchRunner(step_manifest, journal=journal).run()
+            journal.close()
+            assert summary['failed'] == 1 and len(server.store.pages) == 3
+
+            journal = RunJournal(step_journal, resume=True)
+            summary = await BatchRunner(step_manifest, journal=journal).run()
+            journal.close()
+            job = summary['jobs'][0]
+            assert job['success'], job['message']
+            assert len(server.store.pages) == 3 and attempts == [job['page_id']] * 2
+            outcomes = {name: step['outcome'] for name, step in job['workflow']['steps'].items()}
+            assert outcomes['publish'] == outcomes['prepare'] == 'resumed' and outcomes['notify'] == 'ok'
+
+            # 落盘在后台线程进行，同时到达的记录合并为一次fsync
+            from confluence_page_creator import journal as journal_module
+            fsync_calls = []
+            original_fsync = journal_module.os.fsync
+
+            def slow_fsync(fd):
+                fsync_calls.append(fd)
+                time.sleep(0.05)
+                original_fsync(fd)
+
+            journal_module.os.fsync = slow_fsync
+            try:
+                journal = RunJournal(os.path.join(temp_dir, 'group.jsonl'))
+                await asyncio.gather(*[asyncio.wrap_future(journal.job_done(str(i), {'success': True}))
+                                       for i in range(20)])
+                journal.close()
+            finally:
+                journal_module.os.fsync = original_fsync
+            assert 1 <= len(fsync_calls) < 20, len(fsync_calls)
+            journal = RunJournal(os.path.join(temp_dir, 'group.jsonl'), resume=True)
+            journal.close()
+            assert len(journal.jobs) == 20
+
+        print("✅ 重试与恢复测试通过")
+        return True
+
+    except Exception as e:
+        print(f"❌ 重试与恢复测试失败：{e}")
+        return False
+
+
+async def test_workflow_engine():
+    """测试声明式工作流：依赖调度、并发、关键路径和自定义步骤"""
+    print("🧪 测试工作流引擎...")
+
+    from confluence_page_creator.workflow import Workflow, get_workflow, register_action
+    from mock_confluence import MockConfluenceServer
+
+    class Target:
+        def __init__(self):
+            self.calls = []
+            self.cleaned = False
+
+        async def fetch(self):
+            await asyncio.sleep(0.1)
+            self.calls.append('fetch')
+
+        async def render(self):
+            await asyncio.sleep(0.05)
+            self.calls.append('render')
+
+        async def publish(self):
+            self.calls.append('publish')
+
+        async def reject(self):
+            return False
+
+        async def cleanup(self):
+            self.cleaned = True
+
+    try:
+        workflow = Workflow.from_list([
+            {'name': 'fetch', 'action': 'fetch'},
+            {'name': 'render', 'action': 'render'},
+            {'name': 'publish', 'action': 'publish', 'depends_on': ['fetch', 'render']},
+            {'name': 'cleanup', 'action': 'cleanup', 'always': True}
+        ])
+        target = Target()
+        started = time.monotonic()
+        report = await workflow.run(target)
+        assert time.monotonic() - started < 0.14, '互不依赖的步骤未并发执行'
+        assert target.calls == ['render', 'fetch', 'publish'] and target.cleaned
+        assert report.critical_path == ['fetch', 'publish'] and report.stopped_by is None
+        assert 0.09 < report.critical_path_latency < 0.14
+
+        # 步骤返回False时停止，后续步骤不执行，always步骤照常执行
+        stopping = Workflow.from_list([
+            {'name': 'review', 'action': 'reject'},
+            {'name': 'fetch', 'action': 'fetch'},
+            {'name': 'publish', 'action': 'publish', 'depends_on': ['review', 'fetch']},
+            {'name': 'cleanup', 'action': 'cleanup', 'always': True}
+        ])
+        target = Target()
+        report = await stopping.run(target)
+        assert report.stopped_by == 'review' and target.calls == [] and target.cleaned
+        assert 'publish' not in report.to_dict()['steps']
+
+        # 恢复运行：可恢复结果的已完成步骤跳过，其余已完成步骤只在依赖它的步骤都跳过时跳过
+        assert workflow.resumable(['fetch', 'render', 'cleanup'], lambda step: step.name == 'render') == {'render'}
+        assert workflow.resumable(['fetch', 'render', 'publish'], lambda step: step.name == 'publish') == \
+            {'fetch', 'render', 'publish'}
+        target = Target()
+        finished = []
+
+        async def on_step_done(step):
+            finished.append(step.name)
+
+        report = await workflow.run(target, skip={'fetch'}, on_step_done=on_step_done)
+        assert target.calls == ['render', 'publish'] and finished == ['render', 'publish']
+        assert report.to_dict()['steps']['fetch']['outcome'] == 'resumed'
+
+        for invalid in [
+            [{'name': 'a', 'action': 'x', 'depends_on': ['b']}, {'name': 'b', 'action': 'x', 'depends_on': ['a']}],
+            [{'name': 'a', 'action': 'x', 'depends_on': ['missing']}],
+            [{'name': 'a'}]
+        ]:
+            try:
+                Workflow.from_list(invalid)
+                assert False, f"应拒绝无效工作流: {invalid}"
+            except ValueError:
+                pass
+
+        # 在默认工作流中插入自定义步骤，无需修改execute()
+        labelled = []
+
+        async def apply_labels(creator):
+            await asyncio.sleep(0.01)
+            labelled.append(creator.published['page_id'])
+
+        register_action('apply_labels', apply_labels)
+        steps = [{'name': step.name, 'action': step.action, 'depends_on': step.depends_on, 'always': step.always}
+                 for step in get_workflow().steps]
+        steps.insert(-1, {'name': 'apply_labels', 'action': 'apply_labels', 'depends_on': ['publish']})
+
+        with MockConfluenceServer(username='test@test.com', api_token='test-token') as server:
+            result = await ConfluencePageCreator({
+                'confluence_url': server.url, 'space_key': 'TEST', 'username': 'test@test.com',
+                'api_token': 'test-token', 'page_title': '工作流测试', 'backend': 'api',
+                'auto_confirm': True, 'page_index': False, 'workflow': steps
+            }).execute()
+            assert result['success'], result['message']
+            assert labelled == [result['page_id']]
+            assert result['workflow']['critical_path'][-2:] == ['publish', 'apply_labels']
+
+        print(f"✅ 工作流引擎测试通过 (关键路径 {' → '.join(result['workflow']['critical_path'])})")
+        return True
+
+    except Exception as e:
+        print(f"❌ 工作流引擎测试失败：{e}")
+        return False
+
+
+async def test_sharded_batch():
+    """测试多进程分片：并发规划、登录锁、按清单顺序合并结果及恢复"""
+    print("🧪 测试多进程分片...")
+
+    from confluence_page_creator.shard import ShardedRunner, plan_shards, split_jobs, merge_stats
+    from confluence_page_creator.session_cache import SessionCache
+    from mock_confluence import MockConfluenceServer
+
+    try:
+        assert plan_shards(100, 4, 8) == (4, 8)
+        assert plan_shards(3, 4, 8) == (3, 1)
+        # 内存上限内保留尽可能多的并发槽位
+        workers, pages = plan_shards(100, 4, 8, max_memory_mb=2000, backend='ui')
+        assert workers * (300 + pages * 80) <= 2000 and workers * pages >= 8
+        try:
+            plan_shards(10, 2, 2, max_memory_mb=100, backend='ui')
+            assert False, "内存不足时应报错"
+        except ValueError:
+            pass
+
+        assert split_jobs(list(range(5)), 2) == [[0, 2, 4], [1, 3]]
+        assert merge_stats([{'hits': 1, 'cache_key': 'a', 'steps': {'x': {'hits': 1}}},
+                            {'hits': 2, 'cache_key': 'b', 'steps': {'x': {'hits': 3}}}]) == \
+            {'hits': 3, 'cache_key': 'a', 'steps': {'x': {'hits': 4}}}
+        # 瞬时值取平均并按进程列出，只有计数相加
+        merged = merge_stats([{'requests': 10, 'latency_ewma': 0.2, 'concurrency_limit': 4},
+                              {'requests': 5, 'latency_ewma': 0.4, 'concurrency_limit': 2}],
+                             ('latency_ewma', 'concurrency_limit'))
+        assert merged['requests'] == 15 and merged['latency_ewma'] == 0.3 and merged['concurrency_limit'] == 3
+        assert merged['per_worker'] == [{'latency_ewma': 0.2, 'concurrency_limit': 4},
+                                        {'latency_ewma': 0.4, 'concurrency_limit': 2}]
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            # 同一站点和用户的登录锁互斥
+            cache = SessionCache('https://test.atlassian.net/wiki', 'test@test.com', 'test-token', temp_dir)
+            first, second = cache.login_lock(), cache.login_lock()
+            assert first.try_acquire() and not second.try_acquire()
+            first.release()
+            assert second.try_acquire()
+            second.release()
+
+            with MockConfluenceServer(username='test@test.com', api_token='test-token') as server:
+                manifest = {
+                    'workers': 2,
+                    'concurrency': 2,
+                    'defaults': {
+                        'confluence_url': server.url, 'space_key': 'TEST', 'username': 'test@test.com',
+                        'api_token': 'test-token', 'backend': 'api', 'page_index': False,
+                        # 工作进程以spawn启动，不继承本进程对默认路径的替换
+                        'metadata_cache_path': TEST_METADATA_PATH
+                    },
+                    'jobs': [{'id': f'job-{i}', 'page_title': f'分片页面{i}'} for i in range(6)]
+                }
+                journal_path = os.path.join(temp_dir, 'shard.jsonl')
+                summary = await ShardedRunner(manifest, journal_path=journal_path).run()
+                assert summary['success'], summary['message']
+                assert summary['workers'] == 2 and summary['succeeded'] == 6
+                assert [job['job_id'] for job in summary['jobs']] == [f'job-{i}' for i in range(6)]
+                assert len(server.store.pages) == 6
+
+                # 恢复运行：已完成的作业不再执行，进程数变化也不影响
+                summary = await ShardedRunner({**manifest, 'workers': 3}, journal_path=journal_path,
+                                              resume=True).run()
+                assert summary['resumed'] == 6 and summary['workers'] == 0
+                assert len(server.store.pages) == 6
+
+                try:
+                    ShardedRunner({**manifest, 'defaults': {**manifest['defaults'], 'auto_confirm': False}})
+                    assert False, "多进程模式应拒绝交互审核"
+                except ValueError:
+                    pass
+
+        print("✅ 多进程分片测试通过")
+        return True
+
+    except Exception as e:
+        print(f"❌ 多进程分片测试失败：{e}")
+        return False
+
+
+async def test_attachment_upload():
+    """测试附件流式上传、并发上限和校验和跳过"""
+    print("🧪 测试附件上传...")
+
+    import hashlib
+    from confluence_page_creator.attachments import MultipartFile, parse_attachments
+    from mock_confluence import MockConfluenceServer
+
+    try:
+        with tempfile.TemporaryDirectory() as temp_dir, \
+                MockConfluenceServer(username='test@test.com', api_token='test-token') as server:
+            paths = []
+            for name, size in [('build.log', 3 * 1024 * 1024 + 17), ('diagram.png', 4096), ('empty.txt', 0)]:
+                path = os.path.join(temp_dir, name)
+                with open(path, 'wb') as f:
+                    f.write(os.urandom(size))
+                paths.append(path)
+
+            # 请求体长度已知，按块产出，拼接后与文件内容一致
+            body = MultipartFile(paths[0], '构建日志.log', {'comment': 'c'})
+            chunks = list(body)
+            assert sum(len(chunk) for chunk in chunks) == len(body) and len(chunks) > 3
+            assert max(len(chunk) for chunk in chunks) <= 1024 * 1024
+
+            try:
+                parse_attachments({'attachments': [os.path.join(temp_dir, 'missing.bin')]})
+                assert False, "应拒绝不存在的附件"
+            except ValueError:
+                pass
+
+            config = {
+                'confluence_url': server.url, 'space_key': 'TEST', 'username': 'test@test.com',
+                'api_token': 'test-token', 'page_title': '附件页面', 'backend': 'api',
+                'auto_confirm': True, 'page_index': False, 'update_existing': True,
+                'attachment_concurrency': 2,
+                'attachments': [paths[0], {'path': paths[1], 'name': '架构图.png', 'comment': '架构'}, paths[2]]
+            }
+            result = await ConfluencePageCreator(config).execute()
+            assert result['success'], result['message']
+            report = result['attachments']
+            assert report['uploaded'] == 3 and report['failed'] == 0
+            assert report['bytes_uploaded'] == sum(os.path.getsize(path) for path in paths)
+
+            stored = {item['title']: item for item in server.store.attachments[result['page_id']]}
+            with open(paths[0], 'rb') as f:
+                assert stored['build.log']['sha256'] == hashlib.sha256(f.read()).hexdigest()
+            assert stored['架构图.png']['metadata']['comment'].startswith('架构 sha256:')
+
+            # 再次运行：未变化的附件跳过，修改过的附件上传为新版本
+            with open(paths[1], 'wb') as f:
+                f.write(os.urandom(2048))
+            result = await ConfluencePageCreator(config).execute()
+            report = result['attachments']
+            assert report['unchanged'] == 2 and report['uploaded'] == 1
+            assert stored['架构图.png']['version']['number'] == 2
+            assert len(server.store.attachments[result['page_id']]) == 3
+
+        print(f"✅ 附件上传测试通过 ({report['throughput_mb_s']} MB/s)")
+        return True
+
+    except Exception as e:
+        print(f"❌ 附件上传测试失败：{e}")
+        return False
+
+
+async def test_page_tree():
+    """测试页面树：父页面ID传给子页面，兄弟页面并发创建，失败的父页面跳过子树"""
+    print("🧪 测试页面树...")
+
+    from confluence_page_creator.tree import TreeRunner, flatten_tree
+    from mock_confluence import MockConfluenceServer
+
+    try:
+        jobs, parents = flatten_tree([
+            {'page_title': 'A', 'children': [{'page_title': 'A1'}, {'page_title': 'A2', 'children': [{'page_title': 'A2a'}]}]},
+            {'id': 'b', 'page_title': 'B'}
+        ])
+        assert [job['id'] for job in jobs] == ['1', '1.1', '1.2', '1.2.1', 'b']
+        assert parents == [None, 0, 0, 2, None]
+
+        # 3层、13个节点，每个请求延迟0.1s：按层并发约0.3s，逐个创建约1.3s
+        tree = [{
+            'id': 'root',
+            'page_title': '文档首页',
+            'children': [
+                {'page_title': f'章节{i}', 'children': [{'page_title': f'章节{i}-{j}'} for j in range(2)]}
+                for i in range(4)
+            ]
+        }]
+        with MockConfluenceServer(username='test@test.com', api_token='test-token', latency=0.1) as server:
+            manifest = {
+                'concurrency': 8,
+                'defaults': {
+                    'confluence_url': server.url, 'space_key': 'TEST', 'username': 'test@test.com',
+                    'api_token': 'test-token', 'backend': 'api', 'page_index': False, 'parent_page_id': '42'
+                },
+                'tree': tree
+            }
+            summary = await TreeRunner(manifest).run()
+            assert summary['success'] and summary['succeeded'] == 13, summary['message']
+            elapsed = summary['elapsed']
+            assert elapsed < 0.8, f"兄弟页面未并发创建: {elapsed}s"
+
+            by_title = {page['title']: page for page in server.store.pages.values()}
+            assert by_title['文档首页']['ancestors'] == [{'id': '42'}]
+            assert by_title['章节2']['ancestors'] == [{'id': by_title['文档首页']['id']}]
+            assert by_title['章节2-1']['ancestors'] == [{'id': by_title['章节2']['id']}]
+            assert summary['jobs'][1]['job_id'] == 'root.1' and summary['jobs'][1]['depth'] == 1
+            assert summary['jobs'][2]['parent_job_id'] == 'root.1'
+
+            # 父页面失败时其子树不创建
+            server.latency = 0
+            broken = [{'page_title': '坏节点', 'page_template': 'no-such-template',
+                       'children': [{'page_title': '孤儿页面'}]}]
+            summary = await TreeRunner({**manifest, 'tree': broken}).run()
+            assert summary['failed'] == 2 and '父页面 1 未创建' in summary['jobs'][1]['message']
+            assert '孤儿页面' not in {page['title'] for page in server.store.pages.values()}
+
+        print(f"✅ 页面树测试通过 (13个页面耗时 {elapsed}s)")
+        return True
+
+    except Exception as e:
+        print(f"❌ 页面树测试失败：{e}")
+        return False
+
+
+async def test_traffic_control():
+    """测试流量控制：令牌桶限速、AIMD并发调整和Retry-After"""
+    print("🧪 测试流量控制...")
+
+    import time
+    from email.utils import formatdate
+    from confluence_page_creator.traffic import TrafficController, parse_retry_after
+    from mock_confluence import MockConfluenceServer
+
+    try:
+        assert parse_retry_after('3') == 3.0 and parse_retry_after('abc') is None
+        assert 55 < parse_retry_after(formatdate(time.time() + 60, usegmt=True)) <= 60
+
+        # 并发上限成为瓶颈且延迟正常时加性增加，被限流时乘性减少并暂停发送
+        controller = TrafficController(initial_concurrency=2, max_concurrency=4, latency_target=1.0)
+        for _ in range(10):
+            slots = int(controller.limit)
+            for _ in range(slots):
+                controller.acquire()
+            for _ in range(slots):
+                controller.release(0.01)
+        assert int(controller.limit) == 4, controller.limit
+        controller.acquire()
+        controller.release(0.01, status=429, retry_after=0.2)
+        assert int(controller.limit) == 2 and controller.counters['throttled'] == 1
+        started = time.monotonic()
+        await controller.acquire_async()
+        assert time.monotonic() - started >= 0.15, "未遵守Retry-After"
+        controller.release(0.01)
+
+        # 流式上传的耗时不计入平滑延迟，但429照常暂停发送
+        controller = TrafficController(initial_concurrency=4, latency_target=1.0)
+        for status in (200, 429):
+            with controller.request() as outcome:
+                outcome['sample_latency'] = False
+                outcome['status'] = status
+                time.sleep(0.02)
+        assert controller.latency_ewma is None and controller.counters['throttled'] == 1
+        assert int(controller.limit) == 2 and controller._paused_until > time.monotonic()
+        controller = TrafficController(initial_concurrency=4, latency_target=0.5)
+        controller.acquire()
+        controller.release(None)
+        controller.acquire()
+        controller.release(5.0)
+        assert int(controller.limit) == 2 and controller.latency_ewma == 5.0
+
+        # 令牌桶：每秒20个请求、突发1个时，6个请求至少需要0.25s
+        controller = TrafficController(rate=20, burst=1)
+        started = time.monotonic()
+        for _ in range(6):
+            with controller.request() as outcome:
+                outcome['status'] = 200
+        assert time.monotonic() - started >= 0.24
+
+        # 服务端返回429时整个站点暂停Retry-After秒，重试后创建成功
+        with MockConfluenceServer(username='test@test.com', api_token='test-token') as server:
+            server.throttle(2, retry_after=0.3)
+            config = {
+                'confluence_url': server.url, 'space_key': 'TEST', 'username': 'test@test.com',
+                'api_token': 'test-token', 'page_title': '限流页面', 'backend': 'api',
+                'auto_confirm': True, 'page_index': False,
+                'retry': {'max_attempts': 4, 'base_delay': 0.01}, 'traffic': {'rate': 50}
+            }
+            started = time.monotonic()
+            result = await ConfluencePageCreator(config).execute()
+            elapsed = time.monotonic() - started
+            assert result['success'], result['message']
+            assert result['traffic']['throttled'] == 2 and result['traffic']['rate'] == 50
+            assert elapsed >= 0.55, f"未等待Retry-After: {elapsed:.2f}s"
+            assert len(server.store.pages) == 1
+
+            first = ConfluencePageCreator(config)
+            creator = ConfluencePageCreator({**config, 'confluence_url': server.url + '/', 'traffic': {'rate': 1}})
+            assert creator.traffic is first.traffic and creator.traffic.rate == 50, "同一站点应共享流量控制器"
+            assert ConfluencePageCreator({**config, 'traffic': False}).traffic is None
+
+        # 界面模式点击触发的跳转（创建、登录）同样经流量控制，跳转被限流时抛出可重试的ThrottledError
+        from types import SimpleNamespace
+        from confluence_page_creator.traffic import ThrottledError
+
+        class FakePage:
+            main_frame = object()
+
+            def __init__(self):
+                self.listeners = []
+
+            def on(self, event, handler):
+                self.listeners.append(handler)
+
+            def remove_listener(self, event, handler):
+                self.listeners.remove(handler)
+
+        creator = ConfluencePageCreator({**config, 'backend': 'ui'})
+        creator.page = FakePage()
+        creator.traffic = TrafficController(initial_concurrency=4)
+        throttled_document = SimpleNamespace(
+            status=429, headers={'retry-after': '0.1'}, frame=creator.page.main_frame,
+            request=SimpleNamespace(is_navigation_request=lambda: True)
+        )
+        try:
+            async with creator._throttled_navigation():
+                for listener in creator.page.listeners:
+                    listener(throttled_document)
+                raise asyncio.TimeoutError()
+            raise AssertionError('跳转被限流时应抛出ThrottledError')
+        except ThrottledError as e:
+            assert e.status_code == 429 and e.retry_after == 0.1
+        assert creator.traffic.counters['throttled'] == 1 and int(creator.traffic.limit) == 2
+        assert not creator.page.listeners and creator.traffic.in_flight == 0
+
+        print(f"✅ 流量控制测试通过 (限流2次后 {elapsed:.2f}s 完成)")
+        return True
+
+    except Exception as e:
+        print(f"❌ 流量控制测试失败：{e}")
+        return False
+
+
+async def test_parent_path_lookup():
+    """测试按标题路径解析父页面：元数据缓存命中时不发起查询，TTL过期和显式清除后重新查询"""
+    print("🧪 测试父页面路径解析...")
+
+    from confluence_page_creator import cli
+    from confluence_page_creator.page_metadata import get_metadata_cache, split_title_path
+    from mock_confluence import MockConfluenceServer
+
+    try:
+        assert split_title_path('Engineering/CI\\/CD/ 2026 ') == ['Engineering', 'CI/CD', '2026']
+
+        with tempfile.TemporaryDirectory() as temp_dir, \
+                MockConfluenceServer(username='test@test.com', api_token='test-token') as server:
+            store = server.store
+            parent_id = None
+            for title in ['Engineering', 'Releases', '2026']:
+                parent_id = store.create_page({
+                    'title': title, 'space': {'key': 'TEST'}, 'body': {'storage': {'value': ''}},
+                    'ancestors': [{'id': parent_id}] if parent_id else []
+                })['id']
+
+            base = {
+                'confluence_url': server.url, 'space_key': 'TEST', 'username': 'test@test.com',
+                'api_token': 'test-token', 'backend': 'api', 'auto_confirm': True, 'page_index': False,
+                'parent_page_path': 'Engineering/Releases/2026',
+                'metadata_cache_path': os.path.join(temp_dir, 'metadata.db')
+            }
+
+            result = await ConfluencePageCreator({**base, 'page_title': '发布说明 1'}).execute()
+            assert result['success'], result['message']
+            assert result['parent_lookup'] == {'path': base['parent_page_path'], 'page_id': parent_id, 'cached': False}
+            assert store.pages[result['page_id']]['ancestors'] == [{'id': parent_id}]
+
+            # 同一空间的后续作业命中缓存，只有创建页面一个请求
+            before = server.request_count
+            result = await ConfluencePageCreator({**base, 'page_title': '发布说明 2'}).execute()
+            assert result['success'] and result['parent_lookup']['cached']
+            assert server.request_count - before == 1, server.request_count - before
+
+            # 新发布的页面写入缓存，可作为下一级路径
+            result = await ConfluencePageCreator({
+                **base, 'page_title': '附录', 'parent_page_path': 'Engineering/Releases/2026/发布说明 2'
+            }).execute()
+            assert result['success'] and result['parent_lookup']['cached']
+
+            # 批量审核前先解析父页面：内容未变化的作业按正确的索引键识别，不再请求审核
+            from confluence_page_creator import main
+            from confluence_page_creator.batch import BatchRunner
+            manifest = {
+                'defaults': {**base, 'auto_confirm': False, 'page_index': True,
+                             'page_index_path': os.path.join(temp_dir, 'pages.db')},
+                'jobs': [{'page_title': '批量发布说明'}]
+            }
+            original_input = main.read_terminal_line
+
+            def unexpected_review():
+                raise AssertionError('内容未变化的作业不应请求审核')
+            try:
+                main.read_terminal_line = lambda: 'y'
+                assert (await BatchRunner(manifest).run())['succeeded'] == 1
+                main.read_terminal_line = unexpected_review
+                summary = await BatchRunner(manifest).run()
+                assert summary['skipped'] == 1, summary['jobs']
+            finally:
+                main.read_terminal_line = original_input
+
+            # 祖先不符时报错
+            result = await ConfluencePageCreator({**base, 'page_title': 'x', 'parent_page_path': 'Other/2026'}).execute()
+            assert not result['success'] and '父页面路径不匹配' in result['message']
+
+            # TTL过期或显式清除后重新查询
+            result = await ConfluencePageCreator({**base, 'page_title': '发布说明 3', 'metadata_ttl': 0}).execute()
+            assert result['success'] and not result['parent_lookup']['cached']
+
+            # --page同时删除页面索引记录（父页面ID从清除前的缓存中取得），下次运行重新发布
+            from confluence_page_creator.page_index import get_index
+            config_file = os.path.join(temp_dir, 'config.yaml')
+            page_config = {**manifest['defaults'], 'page_title': '批量发布说明'}
+            with open(config_file, 'w', encoding='utf-8') as f:
+                yaml.safe_dump(page_config, f, allow_unicode=True)
+            index = get_index(page_config['page_index_path'])
+            assert index.lookup((server.url, 'TEST', parent_id, '批量发布说明'))
+            assert cli.main(['cache-clear', config_file, '--page']) == 0
+            assert index.lookup((server.url, 'TEST', parent_id, '批量发布说明')) is None
+            cache = get_metadata_cache(base['metadata_cache_path'])
+            assert cache.lookup_path(server.url, 'TEST', ['Engineering']) is None
+
+        print("✅ 父页面路径解析测试通过")
+        return True
+
+    except Exception as e:
+        print(f"❌ 父页面路径解析测试失败：{e}")
+        return False
+
+
+async def test_content_file_sharding():
+    """测试从文件读取内容、按需预览以及超长文档在标题处拆分为页面树"""
+    print("🧪 测试内容文件与文档拆分...")
+
+    from confluence_page_creator.main import render_page, run_single
+    from confluence_page_creator.content_source import ContentSource, preview_lines, shard_document, shard_manifest
+    from mock_confluence import MockConfluenceServer
+
+    try:
+        assert preview_lines('a\nb\nc\n', 2) == (['a', 'b'], 1)
+        assert preview_lines('a\nb', 5) == (['a', 'b'], 0)
+
+        with tempfile.TemporaryDirectory() as temp_dir, \
+                MockConfluenceServer(username='test@test.com', api_token='test-token') as server:
+            doc_file = os.path.join(temp_dir, 'handbook.md')
+            with open(doc_file, 'w', encoding='utf-8') as f:
+                f.write('# 员工手册\n\n本手册介绍团队规范。\n\n')
+                for i in range(1, 7):
+                    f.write(f'## 第{i}节\n\n' + f'第{i}节的内容。\n' * 60)
+                    if i == 2:
+                        # 代码块中的 # 不是标题
+                        f.write('```bash\n## 不是标题\n```\n')
+
+            # 开头的一级标题为文档标题，归入父页面；只在一级标题处拆分时没有可拆分的章节
+            preamble, shards = shard_document(ContentSource(doc_file), 2500, temp_dir, heading_level=1)
+            assert preamble.startswith('# 员工手册') and shards == []
+            preamble, shards = shard_document(ContentSource(doc_file), 2500, temp_dir)
+            assert preamble == '# 员工手册\n\n本手册介绍团队规范。\n\n' and len(shards) == 3
+
+            config = {
+                'confluence_url': server.url, 'space_key': 'TEST', 'username': 'test@test.com',
+                'api_token': 'test-token', 'page_title': '员工手册', 'backend': 'api',
+                'auto_confirm': True, 'page_index': False, 'parent_page_id': '42',
+                'content_file': doc_file
+            }
+
+            # 未超过拆分大小时整篇作为一个页面
+            page = render_page({**config, 'content_shard_size': 10 ** 6})
+            assert page['content'].startswith('# 员工手册') and page['tags'] == []
+            assert await run_single({**config, 'content_shard_size': 10 ** 6}) == 0
+            assert len(server.store.pages) == 1
+
+            # 每节约1KB，分片上限2500字节：每个子页面两节；附件只上传到父页面
+            attachment_file = os.path.join(temp_dir, 'handbook.pdf')
+            with open(attachment_file, 'wb') as f:
+                f.write(b'%PDF' * 100)
+            server.store.pages.clear()
+            assert await run_single({**config, 'page_title': '员工手册v2', 'content_shard_size': 2500,
+                                     'attachments': [attachment_file]}) == 0
+            pages = {page['title']: page for page in server.store.pages.values()}
+            assert len(pages) == 4, list(pages)
+            parent = pages['员工手册v2']
+            assert [len(items) for items in server.store.attachments.values()] == [1]
+            assert list(server.store.attachments) == [parent['id']]
+            assert parent['ancestors'] == [{'id': '42'}]
+            assert '员工手册v2 - 第3节' in parent['body']['storage']['value']
+            child = pages['员工手册v2 - 第1节']
+            assert child['ancestors'] == [{'id': parent['id']}]
+            assert '第2节' in child['body']['storage']['value'] and '不是标题' in child['body']['storage']['value']
+            assert '第3节' not in child['body']['storage']['value']
+
+            # 批量清单中的作业同样拆分，作业ID不变，子页面不继承defaults中的附件
+            manifest = {'defaults': {**config, 'content_shard_size': 2500, 'attachments': [attachment_file]},
+                        'jobs': [{'page_title': '员工手册v3'}, {'id': 'small', 'page_title': '短文档',
+                                                                  'content_shard_size': 0}]}
+            tree_manifest = shard_manifest(manifest, temp_dir)
+            assert [node['id'] for node in tree_manifest['tree']] == ['1', 'small']
+            children = tree_manifest['tree'][0]['children']
+            assert len(children) == 3 and all(child['attachments'] == [] for child in children)
+            assert 'children' not in tree_manifest['tree'][1]
+            assert shard_manifest({'defaults': config, 'jobs': [{'page_title': 'x'}]}, temp_dir)['jobs']
+
+            try:
+                render_page({**config, 'content_file': os.path.join(temp_dir, 'missing.md')})
+                assert False, "应拒绝不存在的内容文件"
+            except ValueError:
+                pass
+
+        print("✅ 内容文件与文档拆分测试通过")
+        return True
+
+    except Exception as e:
+        print(f"❌ 内容文件与文档拆分测试失败：{e}")
+        return False
+
+
+async def test_resource_recycling():
+    """测试浏览器资源回收：按作业数回收页面、上下文和浏览器，内存超出预算时逐级回收，不中断进行中的作业"""
+    print("🧪 测试浏览器资源回收...")
+
+    import subprocess
+    from confluence_page_creator.recycling import RecyclePolicy, ResourceManager, process_tree_rss
+
+    class FakePage:
+        def __init__(self, context):
+            self.context = context
+            self.closed = False
+
+        def set_default_timeout(self, timeout):
+            self.timeout = timeout
+
+        async def close(self):
+            self.closed = True
+
+    class FakeContext:
+        def __init__(self, browser, storage_state):
+            self.browser = browser
+            self.storage_state_value = storage_state or {'cookies': [{'name': 'session'}]}
+            self.closed = False
+
+        async def new_page(self):
+            assert not self.closed, "已关闭的上下文不能打开页面"
+            return FakePage(self)
+
+        async def storage_state(self):
+            return self.storage_state_value
+
+        async def close(self):
+            self.closed = True
+
+    class FakeBrowser:
+        def __init__(self):
+            self.closed = False
+            self.contexts = []
+
+        async def close(self):
+            self.closed = True
+
+    browsers = []
+
+    async def launch():
+        browsers.append(FakeBrowser())
+        return browsers[-1]
+
+    async def open_context(browser, storage_state):
+        browser.contexts.append(FakeContext(browser, storage_state))
+        return browser.contexts[-1]
+
+    try:
+        # 驱动和浏览器进程是当前进程的子孙进程
+        child = subprocess.Popen(['sleep', '5'])
+        try:
+            usage = process_tree_rss()
+            assert usage is None or (usage['processes'] >= 1 and usage['total_mb'] > 0), usage
+        finally:
+            child.kill()
+            child.wait()
+
+        assert RecyclePolicy.from_config({}).max_jobs_per_context == 200
+        assert RecyclePolicy.from_config({'recycle': False}).max_jobs_per_page is None
+        for bad in ({'recycle': {'max_jobs': 5}}, {'recycle': {'max_memory_mb': -1}}, {'recycle': 'on'}):
+            try:
+                RecyclePolicy.from_config(bad)
+                assert False, f"应拒绝无效的回收配置: {bad}"
+            except ValueError:
+                pass
+
+        # Page池大小2：页面每2个作业、上下文每4个作业、浏览器每8个作业回收一次
+        policy = RecyclePolicy(max_jobs_per_page=2, max_jobs_per_context=4, max_jobs_per_browser=8,
+                               memory_check_interval=0)
+        manager = ResourceManager(policy, launch=launch, measure=lambda: None)
+        browser = await launch()
+        context = await open_context(browser, None)
+        manager.adopt('session', browser, context, open_context, page_timeout=1000,
+                      pages=[await context.new_page()])
+        pool = asyncio.Queue()
+        pool.put_nowait(list(manager._slots)[0])
+        pool.put_nowait(await manager.open_page('session'))
+
+        async def job(delay):
+            page = await manager.checkout('session', await pool.get())
+            assert not page.closed and not manager.context_of(page).closed
+            await asyncio.sleep(delay)
+            # 回收只影响之后的作业，进行中作业的页面、上下文和浏览器保持可用
+            assert not page.closed and not manager.context_of(page).closed and not manager.browser_of(page).closed
+            pool.put_nowait(await manager.checkin(page))
+
+        await asyncio.gather(*(job(0.01 * (i % 3)) for i in range(16)))
+        stats = manager.stats()
+        assert stats['jobs'] == 16 and stats['in_flight'] == 0
+        assert stats['browsers_recycled'] == 1 and stats['contexts_recycled'] >= 2, stats
+        assert stats['pages_recycled'] >= 1 and stats['browsers'] == 1, stats
+        # 第一个浏览器的作业全部归还后关闭
+        assert len(browsers) == 2 and browsers[0].closed and not browsers[1].closed
+        # 新上下文沿用旧上下文的登录态
+        assert all(c.storage_state_value == {'cookies': [{'name': 'session'}]} for b in browsers for c in b.contexts)
+        # 已回收的上下文全部关闭，存活的页面都属于未关闭的上下文
+        for page in list(manager._slots):
+            assert not page.closed and not manager.context_of(page).closed
+        assert {event['kind'] for event in stats['events']} == {'page', 'context', 'browser'}
+        await manager.close()
+
+        # 内存超出预算：先回收上下文，回收后仍超出则重启浏览器，回落后不再回收
+        memory = {'total_mb': 900.0}
+        manager = ResourceManager(RecyclePolicy(max_memory_mb=500, memory_check_interval=0),
+                                  launch=launch, measure=lambda: dict(memory))
+        browser = await launch()
+        manager.adopt('session', browser, await open_context(browser, None), open_context)
+        for _ in range(2):
+            page = await manager.checkout('session')
+            await manager.checkin(page, keep=False)
+        assert manager.counters['contexts_recycled'] == 1 and manager.counters['browsers_recycled'] == 1
+        assert browser.closed and manager.stats()['peak_rss_mb'] == 900.0
+        memory['total_mb'] = 300.0
+        page = await manager.checkout('session')
+        await manager.checkin(page, keep=False)
+        assert manager.counters['contexts_recycled'] == 1 and manager.counters['browsers_recycled'] == 1
+        assert manager.stats()['events'][-1]['reason'] == 'memory'
+        await manager.close()
+        assert all(b.closed for b in browsers)
+
+        print("✅ 浏览器资源回收测试通过")
+        return True
+
+    except Exception as e:
+        print(f"❌ 浏览器资源回收测试失败：{e}")
+        return False
+
+
+def test_cli_fast_commands():
+    """测试render/validate子命令（不导入Playwright）"""
+    print("🧪 测试命令行子命令...")
+
+    import subprocess
+    import sys
+
+    script = (
+        "import sys\n"
+        "from confluence_page_creator import cli\n"
+        "code = cli.main(sys.argv[1:])\n"
+        "print('PLAYWRIGHT_LOADED' if 'playwright' in sys.modules else 'PLAYWRIGHT_SKIPPED')\n"
+        "sys.exit(code)\n"
+    )
+
+    def run(*args):
+        started = time.monotonic()
+        completed = subprocess.run([sys.executable, '-c', script, *args], capture_output=True, text=True,
+                                   cwd=os.path.dirname(os.path.abspath(__file__)))
+        return completed, time.monotonic() - started
+
+    try:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            # 只有模板相关字段的配置也可以渲染
+            render_config = os.path.join(temp_dir, 'render.yaml')
+            with open(render_config, 'w', encoding='utf-8') as f:
+                yaml.dump({'page_title': '周报', 'page_template': 'project-update'}, f, allow_unicode=True)
+
+            completed, elapsed = run('render', render_config, '--format', 'storage')
+            assert completed.returncode == 0, completed.stderr
+            assert '<h1>周报</h1>' in completed.stdout
+            assert 'PLAYWRIGHT_SKIPPED' in completed.stdout
+
+            completed, _ = run('validate', render_config)
+            assert completed.returncode == 1 and '缺少必需参数: confluence_url' in completed.stderr
+
+            completed, _ = run('validate', 'config-example.yaml')
+            assert completed.returncode == 0 and '配置有效' in completed.stdout
+            assert 'PLAYWRIGHT_SKIPPED' in completed.stdout
+
+            completed, _ = run('render', os.path.join(temp_dir, 'missing.yaml'))
+            assert completed.returncode == 1 and '配置文件不存在' in completed.stderr
+
+        print(f"✅ 命令行子命令测试通过 (render耗时 {elapsed * 1000:.0f}ms，含解释器启动)")
+        return True
+
+    except Exception as e:
+        print(f"❌ 命令行子命令测试失败：{e}")
+        return False
+
+
 def test_yaml_parsing():
     """测试YAML解析功能"""
     print("🧪 测试YAML解析功能...")
@@ -166,6 +2190,32 @@ async def run_all_tests():
         test_yaml_parsing,
         test_content_generation,
         test_template_types,
+        test_batch_manifest,
+        test_rest_api_backend,
+        test_session_cache,
+        test_selector_racing,
+        test_content_insertion_modes,
+        test_storage_format_conversion,
+        test_template_registry,
+        test_readiness_waits,
+        test_trace_output,
+        test_mock_confluence_ui,
+        test_benchmark_report,
+        test_daemon_roundtrip,
+        test_request_filter,
+        test_page_index_skip,
+        test_incremental_update,
+        test_pipelined_review,
+        test_cli_fast_commands,
+        test_retry_and_resume,
+        test_workflow_engine,
+        test_sharded_batch,
+        test_attachment_upload,
+        test_page_tree,
+        test_traffic_control,
+        test_parent_path_lookup,
+        test_content_file_sharding,
+        test_resource_recycling,
     ]
 
     passed = 0